@@ -1,33 +1,55 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
 from typing import Annotated, List
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
-from cashbacker.casbacker import categorizer
+from core.config import app_settings
 from db.db import get_session
 from exceptions import auth as auth_exceptions
 from exceptions import api as api_exceptions
 from models import base as models
 from schemas import base as schemas
+from services.antispoofing import antispoofing_service
 from services.auth import (ACCESS_TOKEN_EXPIRE_DAYS, create_access_token,
                            get_current_user)
-from services.cashback import can_choose_cashback, get_card_choose_cashback
+from services.cashback import (can_choose_cashback, get_card_choose_cashback,
+                              save_month_offers)
+from services.categories import (cached_categorizer,
+                                 iter_categories_with_scores)
 from services.db import (account_crud, category_limit_crud, cashback_crud,
-                         user_cashback_crud, user_crud)
+                         terminal_snapshot_crud, user_cashback_crud, user_crud)
 from services.external_integrations import (authenticate_user,
                                             create_or_update_accounts_in_db,
-                                            get_account_cashbacks,
-                                            get_accounts, get_user_by_photo,
-                                            update_user_transactions)
+                                            get_accounts)
 from services.gigachat import financial_analyst
-from services.validation import validate_photo
+from services.http_client import integrations_client
+from services.inference import readiness as models_readiness
+from services.resilience import resilient_client
+from services.terminal import terminal_response
+from services.transaction_sync import transaction_sync_scheduler
 
 
 router = APIRouter()
 
 
+@router.get(
+    '/ready/',
+    description='Готовность сервиса: все модели загружены',
+    response_model=schemas.Readiness
+)
+async def ready():
+    readiness: schemas.Readiness = await models_readiness()
+    if not readiness.ready:
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=readiness.dict()
+        )
+    return readiness
+
+
 @router.post(
     '/terminal',
     status_code=status.HTTP_200_OK,
@@ -38,71 +60,13 @@ async def terminal(
     db: AsyncSession = Depends(get_session)
 ) -> schemas.TerminalResponse:
     photo: bytes = await file_in.read()
-    # await asyncio.to_thread(validate_photo, image=photo)
-    photo_validation = True
+    photo_validation = await antispoofing_service.validate(photo)
     if not photo_validation:
         raise auth_exceptions.AntiSpoofingException()
 
-    user_info: schemas.User = await get_user_by_photo(photo, file_in.filename)
-
-    if user_info:
-
-        accounts: List[schemas.RawAccount] | None = await get_accounts(
-            user_info.gosuslugi_id)
-
-        if accounts:
-            cards = []
-            today = date.today()
-            month = date(year=today.year, month=today.month, day=1)
-
-            for account in accounts:
-                # Условие ниже нужно только для демонстрации на
-                # стенде. В боевом варианте должно отрабатывать только
-                # выражение в else
-                if account.bank == 'Центр-инвест':
-                    account_cashbacks = schemas.RawAccountCashbacks(
-                        month=month,
-                        cashbacks=[
-                            schemas.RawCashback(
-                                product_type='продукты питания',
-                                value=5
-                            ),
-                            schemas.RawCashback(
-                                product_type='одежда',
-                                value=7
-                            ),
-                            schemas.RawCashback(
-                                product_type='электроника',
-                                value=3
-                            )
-                        ]
-
-                    )
-                else:
-                    account_cashbacks = await get_account_cashbacks(
-                        account_number=account.number,
-                        month=month
-                    )
-                cashbacks: List[schemas.RawAccountCashbacks]
-                if account_cashbacks:
-                    cashbacks = account_cashbacks.cashbacks
-
-                account_card = [
-                    schemas.CardWithCashback(
-                        bank=account.bank,
-                        last_four_digits=card.card_number[-4:],
-                        cashbacks=cashbacks
-                    )
-                    for card in account.cards
-                ]
-
-                cards += account_card
-
-            return schemas.TerminalResponse(
-                name=user_info.first_name,
-                surname=user_info.surname,
-                cards=cards
-            )
+    response = await terminal_response(db, photo, file_in.filename)
+    if response:
+        return response
 
     raise auth_exceptions.EBSExceptin()
 
@@ -120,6 +84,9 @@ async def get_access_token(
         raise auth_exceptions.AuthError()
 
     user: models.User = await user_crud.get_or_create(db, user_info)
+    await user_crud.touch(
+        db, user, now=datetime.now(timezone.utc), min_interval=timedelta(0)
+    )
 
     user_id: int = user.id
 
@@ -130,6 +97,8 @@ async def get_access_token(
         month = date(year=today.year, month=today.month, day=1)
 
         await create_or_update_accounts_in_db(db, accounts, user_id, month)
+        # транзакции новых счетов подтянет фоновая синхронизация
+        transaction_sync_scheduler.notify()
 
     access_token_expires = timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
     access_token = create_access_token(
@@ -206,8 +175,8 @@ async def get_cashback_for_choose(
         and can_choose_cashback(account_bank)
         and not month_cashbacks
     ):
-        # если уже формировали кэшбеки, их и возвращаем, чтобы
-        # не было дублей
+        # кэшбеки на месяц обычно уже посчитаны ночным предрасчётом
+        # (services.cashback_precompute), их и возвращаем
         not_accepted_cashbacks = await user_cashback_crud.filter_by(
             db=db,
             with_cashbacks=True,
@@ -230,37 +199,13 @@ async def get_cashback_for_choose(
                 can_choose_cashback=can_choose_cashback(account_bank)
             )
 
-        # Если еще не формировали кэшбеки, то формируем
-        raw_cashbacks = await get_card_choose_cashback(
+        # Счёт появился после предрасчёта - считаем на месте
+        cashbacks = await get_card_choose_cashback(
             db=db, account=account, month=month
         )
-        cashbacks: List[schemas.Cashback] = []
-        for cashback in raw_cashbacks:
-            cashback_in_db: models.Cashback = await cashback_crud.get_or_create(
-                db=db,
-                obj_in=schemas.CashbackCreate.create_from_raw_cashback(
-                    cashback)
-            )
-            cashback_in_db_id = cashback_in_db.id
-            cashback_in_db_product_type = cashback_in_db.product_type
-
-            # создавать кешбек конкретного пользователя
-            await user_cashback_crud.get_or_create(
-                db=db,
-                obj_in=schemas.UserCashbackCreate(
-                    account_id=account_id,
-                    cashback_id=cashback_in_db_id,
-                    month=month,
-                    status=False,
-                    value=cashback.value
-                )
-            )
-            cashbacks.append(
-                schemas.Cashback(
-                    product_type=cashback_in_db_product_type,
-                    value=cashback.value
-                )
-            )
+        await save_month_offers(
+            db=db, month=month, offers={account_id: cashbacks}
+        )
 
         return schemas.CashbacksForChoose(
             account_number=account_number,
@@ -325,6 +270,10 @@ async def choose_card_cashback(
         except:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
 
+        today = date.today()
+        if month == date(year=today.year, month=today.month, day=1):
+            await terminal_snapshot_crud.rebuild(db, account.user_id, month)
+
         return month_cashback.cashback
 
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
@@ -340,11 +289,7 @@ async def get_transactions(
     current_user: Annotated[schemas.FullUser, Depends(get_current_user)],
     db: AsyncSession = Depends(get_session),
 ) -> List[schemas.AccountWithTransactions]:
-    await update_user_transactions(
-        db=db,
-        user_id=current_user.id
-    )
-
+    # транзакции обновляет services.transaction_sync, здесь только чтение
     today = date.today()
     month = date(year=today.year, month=today.month, day=1)
 
@@ -359,13 +304,75 @@ async def get_transactions(
     status_code=status.HTTP_200_OK,
     response_model=schemas.CategoryName
 )
-async def get_category(transaction: schemas.TransactionName):
-    category_lst = await categorizer.get_topics_name([transaction.name])
+async def get_category(
+    transaction: schemas.TransactionName,
+    db: AsyncSession = Depends(get_session)
+):
+    category_lst = await cached_categorizer.get_topics_name(
+        db=db, product_names=[transaction.name]
+    )
     return schemas.CategoryName(
         name=category_lst[0]
     )
 
 
+@router.post(
+    '/get_categories/',
+    description='Массовое определение категорий с top-k оценками модели',
+    status_code=status.HTTP_200_OK,
+    response_model=List[schemas.CategoryWithScores]
+)
+async def get_categories(transactions: schemas.TransactionNames):
+    names = transactions.names
+    if len(names) > app_settings.categorize_bulk_max_names:
+        raise api_exceptions.TooManyNamesException()
+
+    results = iter_categories_with_scores(names, transactions.top_k)
+
+    if len(names) <= app_settings.categorize_stream_threshold:
+        categories: List[schemas.CategoryWithScores] = []
+        async for chunk in results:
+            categories += chunk
+        return categories
+
+    # большой ответ отдаём потоком, по мере готовности батчей
+    async def stream():
+        yield b'['
+        first = True
+        async for chunk in results:
+            for category in chunk:
+                yield (b'' if first else b',') + category.json(
+                    ensure_ascii=False
+                ).encode()
+                first = False
+        yield b']'
+
+    return StreamingResponse(stream(), media_type='application/json')
+
+
+@router.get(
+    '/get_category/stats/',
+    description='Статистика попаданий в кэш категорий',
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.CategoryCacheStats
+)
+async def get_category_stats() -> schemas.CategoryCacheStats:
+    return cached_categorizer.stats()
+
+
+@router.get(
+    '/integrations/stats/',
+    description='Статистика пула соединений внешних интеграций',
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.IntegrationsStats
+)
+async def get_integrations_stats() -> schemas.IntegrationsStats:
+    return schemas.IntegrationsStats(
+        **integrations_client.stats(),
+        resilience=resilient_client.stats()
+    )
+
+
 @router.get(
     '/giga_chat/',
     status_code=status.HTTP_200_OK,
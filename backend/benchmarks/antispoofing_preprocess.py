@@ -0,0 +1,107 @@
+"""
+    Подготовка фото для модели антиспуфинга: декодирование JPEG сразу в
+    уменьшенном масштабе в буфер батча (decode_into) против прежнего
+    пути через tensorflow (decode_tf) и полного декодирования PIL без
+    draft. Фото синтетические (градиент с шумом), размеров типичных
+    камер терминалов и телефонов.
+
+    Запуск из папки backend:
+        python -m benchmarks.antispoofing_preprocess
+        python -m benchmarks.antispoofing_preprocess --sizes 1280x960 4032x3024 --batch 16
+"""
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+from PIL import Image
+
+from services.image_preprocessing import (IMG_SHAPE, batch_buffer, decode_into,
+                                          decode_tf)
+
+
+def make_jpeg(width: int, height: int, rng: np.random.Generator) -> bytes:
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([
+        np.broadcast_to(x, (height, width)),
+        np.broadcast_to(y, (height, width)),
+        (x + y) / 2
+    ], axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape).astype(np.float32)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def decode_full(image: bytes, out: np.ndarray) -> np.ndarray:
+    # то же без draft и с промежуточными массивами
+    with Image.open(io.BytesIO(image)) as img:
+        img = img.convert('RGB').resize(IMG_SHAPE[1::-1], Image.BILINEAR)
+        out[...] = np.asarray(img).astype(np.float32) / 127.5 - 1
+    return out
+
+
+def measure(decode, images, batch_size: int, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            began = time.perf_counter()
+            batch = batch_buffer(len(chunk))
+            for i, image in enumerate(chunk):
+                decode(image, batch[i])
+            timings.append((time.perf_counter() - began) * 1000 / len(chunk))
+    return np.percentile(timings, 50), np.percentile(timings, 99), batch.copy()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--sizes', nargs='+', default=['640x480', '1280x960', '1920x1080', '4032x3024']
+    )
+    parser.add_argument('--images', type=int, default=16)
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    decoders = {'pil_draft': decode_into, 'pil_full': decode_full}
+    try:
+        import tensorflow  # noqa: F401
+        decoders['tf'] = decode_tf
+    except ImportError:
+        pass
+    reference = 'tf' if 'tf' in decoders else 'pil_full'
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for size in args.sizes:
+        width, height = map(int, size.split('x'))
+        images = [make_jpeg(width, height, rng) for _ in range(args.images)]
+        row = {
+            'size': size,
+            'jpeg_kb': sum(map(len, images)) / len(images) / 1024
+        }
+        outputs = {}
+        for name, decode in decoders.items():
+            p50, p99, outputs[name] = measure(decode, images, args.batch, args.repeats)
+            row[f'{name}_p50_ms'] = p50
+            row[f'{name}_p99_ms'] = p99
+        row['speedup'] = row[f'{reference}_p50_ms'] / row['pil_draft_p50_ms']
+        diff = np.abs(outputs['pil_draft'] - outputs[reference])
+        row['mean_abs_diff'] = float(diff.mean())
+        row['max_abs_diff'] = float(diff.max())
+        results.append(row)
+
+    print(json.dumps({
+        'reference': reference,
+        'batch': args.batch,
+        'results': results
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
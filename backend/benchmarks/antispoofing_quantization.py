@@ -0,0 +1,142 @@
+"""
+    Сравнение float-модели антиспуфинга (keras) и int8-модели (TFLite,
+    services.antispoofing_export) на локальном наборе фото: задержка,
+    пиковая память и доля совпавших решений (оценка выше порога) с
+    float-моделью. Каждая модель запускается в отдельном процессе,
+    чтобы пиковая память (ru_maxrss) не смешивалась.
+
+    Запуск из папки backend:
+        python -m benchmarks.antispoofing_quantization --images /data/terminal_photos
+        python -m benchmarks.antispoofing_quantization --images ... --tflite other.tflite --batch-size 8
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from services.antispoofing import THRESHOLD
+from services.antispoofing_runtime import TFLITE_MODEL_PATH
+from services.image_preprocessing import IMG_SHAPE, decode_into, list_images
+
+
+def load_backend(backend: str, tflite_path: str):
+    if backend == 'tflite':
+        from services.antispoofing_runtime import TFLiteAntiSpoofingModel
+        return TFLiteAntiSpoofingModel(tflite_path)
+
+    import tensorflow as tf
+
+    from services.antispoofing_model import load_inference_model
+    model = load_inference_model()
+    return lambda images: model.call(tf.convert_to_tensor(images))
+
+
+def load_images(paths) -> np.ndarray:
+    images = np.empty((len(paths), *IMG_SHAPE), dtype=np.float32)
+    for path, out in zip(paths, images):
+        with open(path, 'rb') as f:
+            decode_into(f.read(), out)
+    return images
+
+
+def run_backend(backend: str, paths, tflite_path: str, batch_size: int,
+                repeats: int) -> dict:
+    images = load_images(paths)
+
+    start = time.perf_counter()
+    model = load_backend(backend, tflite_path)
+    load_time = time.perf_counter() - start
+
+    batches = [
+        images[start:start + batch_size]
+        for start in range(0, len(images), batch_size)
+    ]
+    scores = np.concatenate([np.asarray(model(batch))[:, 0] for batch in batches])
+    timings = []
+    for _ in range(repeats):
+        for batch in batches:
+            start = time.perf_counter()
+            np.asarray(model(batch))
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'backend': backend,
+        'load_time_sec': load_time,
+        'batch_p50_ms': statistics.median(timings),
+        'batch_p99_ms': float(np.percentile(timings, 99)),
+        'images_per_sec': batch_size / (statistics.median(timings) / 1000),
+        # ru_maxrss в килобайтах на linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'scores': scores.tolist()
+    }
+
+
+def compare(paths, reference: dict, candidate: dict) -> dict:
+    float_scores = np.asarray(reference['scores'])
+    int8_scores = np.asarray(candidate['scores'])
+    same = (float_scores > THRESHOLD) == (int8_scores > THRESHOLD)
+    return {
+        'images': len(paths),
+        'agreement': float(same.mean()),
+        'mean_abs_diff': float(np.abs(float_scores - int8_scores).mean()),
+        'max_abs_diff': float(np.abs(float_scores - int8_scores).max()),
+        'disagreement_examples': [
+            {'path': path, 'float': float(a), 'int8': float(b)}
+            for path, a, b, ok in zip(paths, float_scores, int8_scores, same)
+            if not ok
+        ][:20]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', required=True)
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--tflite', default=TFLITE_MODEL_PATH)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--backend', choices=['keras', 'tflite'])
+    args = parser.parse_args()
+
+    paths = list_images(args.images, args.limit)
+    if not paths:
+        parser.error(f'No images found in {args.images}')
+
+    if args.backend:
+        result = run_backend(
+            args.backend, paths, args.tflite, args.batch_size, args.repeats
+        )
+        print(json.dumps(result))
+        return
+
+    report = {}
+    for backend in ('keras', 'tflite'):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.antispoofing_quantization',
+             '--backend', backend, '--images', args.images,
+             '--tflite', args.tflite, '--batch-size', str(args.batch_size),
+             '--repeats', str(args.repeats)]
+            + (['--limit', str(args.limit)] if args.limit else []),
+            check=True, capture_output=True, text=True
+        ).stdout
+        # последняя строка вывода - результат, выше могут быть логи TF
+        report[backend] = json.loads(output.strip().splitlines()[-1])
+
+    print(json.dumps({
+        'batch_size': args.batch_size,
+        'tflite_size_mb': os.path.getsize(args.tflite) / 2 ** 20,
+        **{
+            backend: {k: v for k, v in result.items() if k != 'scores'}
+            for backend, result in report.items()
+        },
+        **compare(paths, report['keras'], report['tflite'])
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+    Бенчмарк пропускной способности категоризатора.
+
+    Для каждой доли русских названий и каждого размера батча меряет
+    names/sec и p50/p99 задержки этапов Categorizer.tokenize_text,
+    Categorizer.preprocess_sentences и Categorizer.get_topics_name.
+    Результат пишется в JSON, чтобы сравнивать коммиты между собой.
+
+    Запуск из папки backend:
+        python -m benchmarks.categorizer
+        python -m benchmarks.categorizer --batch-sizes 1 64 1024 --ru-shares 0.8
+        python -m benchmarks.categorizer --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.corpus import generate_corpus
+from cashbacker.runtime import MAX_LENGTH
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'results')
+DEFAULT_BATCH_SIZES = [1, 4, 16, 64, 256, 1024, 4096]
+DEFAULT_RU_SHARES = [1.0, 0.8, 0.5, 0.0]
+# ограничение на число названий в одной точке замера
+NAMES_PER_POINT = 16384
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def summarize(timings: list, batch_size: int) -> dict:
+    timings_ms = np.array(timings) * 1000
+    p50 = float(np.percentile(timings_ms, 50))
+    return {
+        'repeats': len(timings),
+        'p50_ms': p50,
+        'p99_ms': float(np.percentile(timings_ms, 99)),
+        'names_per_sec': batch_size / (p50 / 1000) if p50 else math.inf
+    }
+
+
+def run(categorizer, batch_sizes, ru_shares, max_repeats) -> list:
+    loop = asyncio.new_event_loop()
+    stages = {
+        'tokenize_text': lambda names, _: loop.run_until_complete(
+            categorizer.tokenize_text(names)
+        ),
+        'preprocess_sentences': lambda _, sentences: (
+            categorizer.preprocess_sentences(sentences, MAX_LENGTH)
+        ),
+        'get_topics_name': lambda names, _: loop.run_until_complete(
+            categorizer.get_topics_name(names)
+        ),
+    }
+    results = []
+    for ru_share in ru_shares:
+        for batch_size in batch_sizes:
+            repeats = max(3, min(max_repeats, NAMES_PER_POINT // batch_size))
+            # новый seed на каждый повтор, чтобы не мерить один и тот же батч
+            batches = [
+                generate_corpus(batch_size, ru_share=ru_share, seed=seed)
+                for seed in range(repeats)
+            ]
+            sentences = [categorizer.clean_sentences(names) for names in batches]
+            for stage, func in stages.items():
+                func(batches[0], sentences[0])  # прогрев
+                timings = []
+                for names, cleaned in zip(batches, sentences):
+                    start = time.perf_counter()
+                    func(names, cleaned)
+                    timings.append(time.perf_counter() - start)
+                result = {
+                    'stage': stage,
+                    'ru_share': ru_share,
+                    'batch_size': batch_size,
+                    **summarize(timings, batch_size)
+                }
+                print(json.dumps(result))
+                results.append(result)
+    loop.close()
+    return results
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def key(result):
+        return result['stage'], result['ru_share'], result['batch_size']
+
+    old_results = {key(result): result for result in old['results']}
+    print(f"{'stage':<22}{'ru':>5}{'batch':>7}{'old/s':>12}{'new/s':>12}{'change':>9}")
+    for result in new['results']:
+        previous = old_results.get(key(result))
+        if not previous:
+            continue
+        change = result['names_per_sec'] / previous['names_per_sec'] - 1
+        print(
+            f"{result['stage']:<22}{result['ru_share']:>5}{result['batch_size']:>7}"
+            f"{previous['names_per_sec']:>12.1f}{result['names_per_sec']:>12.1f}"
+            f"{change:>+9.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                        default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--ru-shares', type=float, nargs='+',
+                        default=DEFAULT_RU_SHARES)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--output')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    from cashbacker.casbacker import categorizer
+
+    categorizer.load()
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'backend': categorizer.backend,
+        'results': run(
+            categorizer, args.batch_sizes, args.ru_shares, args.repeats
+        )
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f'categorizer-{commit}.json')
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Saved {output}')
+
+
+if __name__ == '__main__':
+    main()
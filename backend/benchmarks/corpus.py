@@ -0,0 +1,55 @@
+"""
+    Синтетический корпус названий товаров для бенчмарков.
+    Названия собираются из шаблонов, поэтому корпус воспроизводим
+    при одинаковом seed и не требует реальных транзакций.
+"""
+import random
+from typing import List
+
+RU_PRODUCTS = [
+    'Молоко', 'Кефир', 'Хлеб белый', 'Батон нарезной', 'Сыр российский',
+    'Масло сливочное', 'Яйца куриные', 'Гречка', 'Рис длиннозерный',
+    'Макароны', 'Сок яблочный', 'Вода минеральная', 'Чай черный',
+    'Кофе молотый', 'Шоколад молочный', 'Чипсы', 'Сухарики', 'Кетчуп',
+    'Майонез', 'Соль', 'Перец черный', 'Футболка мужская', 'Джинсы',
+    'Кроссовки', 'Носки', 'Средство для мытья посуды', 'Порошок стиральный',
+    'Губка для посуды', 'Наушники беспроводные', 'Зарядное устройство',
+    'Кабель USB', 'Корм для рыб', 'Фильтр для аквариума', 'Масло моторное',
+    'Свечи зажигания', 'Тормозные колодки', 'Учебник по математике',
+    'Тетрадь в клетку', 'Игровая приставка', 'Геймпад'
+]
+EN_PRODUCTS = [
+    'Milk', 'Orange juice', 'Sparkling water', 'Green tea', 'Ground coffee',
+    'Dark chocolate', 'Potato chips', 'Tomato ketchup', 'Cotton T-shirt',
+    'Running shoes', 'Denim jeans', 'Dish soap', 'Laundry detergent',
+    'Wireless headphones', 'USB-C cable', 'Phone charger', 'Fish food',
+    'Aquarium filter', 'Motor oil', 'Brake pads', 'Spark plugs',
+    'Math textbook', 'Notebook', 'Game console', 'Gamepad'
+]
+RU_BRANDS = ['Простоквашино', 'Домик в деревне', 'Красная цена', 'Ашан',
+             'Дикси', 'Вкусвилл', 'Global Village']
+EN_BRANDS = ['Coca-Cola', 'Pepsi', 'Lays', 'Heinz', 'Nike', 'Adidas',
+             'Samsung', 'Xiaomi', 'Tetra', 'Castrol', 'Sony']
+SIZES = ['0.5л', '1л', '1.5 л', '200г', '500 г', '1кг', '3,2%', 'XL',
+         '42', '10 шт', '2x', '']
+
+
+def product_name(rng: random.Random, russian: bool) -> str:
+    if russian:
+        parts = [rng.choice(RU_PRODUCTS)]
+        if rng.random() < 0.6:
+            parts.append(rng.choice(RU_BRANDS + EN_BRANDS))
+    else:
+        parts = [rng.choice(EN_BRANDS), rng.choice(EN_PRODUCTS)]
+    parts.append(rng.choice(SIZES))
+    return ' '.join(part for part in parts if part)
+
+
+def generate_corpus(
+    size: int, ru_share: float = 0.8, seed: int = 42
+) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        product_name(rng, russian=rng.random() < ru_share)
+        for _ in range(size)
+    ]
@@ -0,0 +1,56 @@
+"""
+    Сравнение выбора языка: langdetect на каждую строку (как было
+    раньше в Categorizer.tokenize_text) против route_language.
+
+    Запуск из папки backend:
+        python -m benchmarks.language_router --size 5000 --ru-share 0.8
+"""
+import argparse
+import json
+import time
+
+from benchmarks.corpus import generate_corpus
+from cashbacker.language import (detect_language, route_language,
+                                 script_language)
+
+
+def measure(func, names):
+    start = time.perf_counter()
+    result = [func(name) for name in names]
+    elapsed = time.perf_counter() - start
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=5000)
+    parser.add_argument('--ru-share', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    names = generate_corpus(args.size, ru_share=args.ru_share, seed=args.seed)
+
+    baseline, baseline_time = measure(detect_language, names)
+    routed, routed_time = measure(route_language, names)
+
+    fallback = sum(script_language(name) is None for name in names)
+    agreement = sum(a == b for a, b in zip(baseline, routed)) / len(names)
+    disagreements = [
+        {'name': name, 'langdetect': a, 'router': b}
+        for name, a, b in zip(names, baseline, routed) if a != b
+    ]
+
+    print(json.dumps({
+        'size': len(names),
+        'ru_share': args.ru_share,
+        'langdetect_names_per_sec': len(names) / baseline_time,
+        'router_names_per_sec': len(names) / routed_time,
+        'speedup': baseline_time / routed_time,
+        'fallback_share': fallback / len(names),
+        'agreement': agreement,
+        'disagreement_examples': disagreements[:20]
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+    Сравнение задержки и памяти модели категорий: keras против TFLite.
+    Каждый бэкенд запускается в отдельном процессе, чтобы пиковая
+    память (ru_maxrss) не смешивалась.
+
+    Запуск из папки backend (после python -m cashbacker.export):
+        python -m benchmarks.topic_runtime --batch-sizes 1 8 64 256
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from cashbacker.runtime import (CURRENT_DIR, MAX_LENGTH, TFLITE_MODEL_PATH,
+                                pad_sequences)
+
+
+def load_backend(backend: str):
+    if backend == 'tflite':
+        from cashbacker.runtime import TFLiteTopicModel
+        return TFLiteTopicModel(TFLITE_MODEL_PATH)
+
+    import tensorflow_addons as tfa
+    from keras.models import load_model
+    return load_model(
+        os.path.join(CURRENT_DIR, 'model_LSTM.h5'),
+        custom_objects={'Addons>F1Score': tfa.metrics.F1Score}
+    )
+
+
+def run_backend(backend: str, batch_sizes, repeats: int) -> dict:
+    start = time.perf_counter()
+    model = load_backend(backend)
+    load_time = time.perf_counter() - start
+
+    # размер словаря не важен для задержки, берём случайные индексы
+    rng = np.random.default_rng(0)
+    results = {}
+    for batch_size in batch_sizes:
+        lengths = rng.integers(1, MAX_LENGTH, size=batch_size)
+        tokens = pad_sequences(
+            [list(rng.integers(1, 1000, size=length)) for length in lengths],
+            MAX_LENGTH
+        )
+        np.asarray(model(tokens))  # прогрев
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            np.asarray(model(tokens))
+            timings.append((time.perf_counter() - start) * 1000)
+        results[batch_size] = {
+            'p50_ms': statistics.median(timings),
+            'max_ms': max(timings),
+            'names_per_sec': batch_size / (statistics.median(timings) / 1000)
+        }
+    return {
+        'backend': backend,
+        'load_time_sec': load_time,
+        # ru_maxrss в килобайтах на linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'batches': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                        default=[1, 8, 64, 256, 1024])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--backend', choices=['keras', 'tflite'])
+    args = parser.parse_args()
+
+    if args.backend:
+        result = run_backend(args.backend, args.batch_sizes, args.repeats)
+        print(json.dumps(result))
+        return
+
+    report = []
+    for backend in ('keras', 'tflite'):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.topic_runtime',
+             '--backend', backend, '--repeats', str(args.repeats),
+             '--batch-sizes', *map(str, args.batch_sizes)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        # последняя строка вывода - результат, выше могут быть логи TF
+        report.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
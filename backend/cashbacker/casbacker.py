@@ -1,39 +1,60 @@
 import asyncio
 import os
+import threading
 from typing import List
 from collections import Counter
 
 import pandas as pd
 import numpy as np
 
-import nltk
-from nltk.corpus import stopwords
 from string import punctuation
-import spacy
-from langdetect import detect
 
-from keras.preprocessing.sequence import pad_sequences
-from keras.models import load_model
 import pickle
 
-import tensorflow_addons as tfa
+from cashbacker.aggregation import SPENDING_TOPICS, monthly_matrix, pad_history
+from cashbacker.language import route_language
+from cashbacker.runtime import (MAX_LENGTH, TFLITE_MODEL_PATH,
+                                TOKENIZER_JSON_PATH, LiteTokenizer,
+                                TFLiteTopicModel, pad_sequences)
+from core.batching import MicroBatcher
+from core.config import app_settings
+from core.registry import model_registry
 
-from sklearn.preprocessing import StandardScaler
+STOPWORDS_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), 'data', 'stopwords'
+)
 
 
-nltk.download('stopwords')
+def load_stopwords(language: str) -> List[str]:
+    """
+        Стоп-слова из локальной копии корпуса nltk stopwords,
+        чтобы не скачивать его при старте
+    """
+    with open(os.path.join(STOPWORDS_DIR, language), encoding='utf-8') as f:
+        return [word for word in f.read().splitlines() if word]
 
-nlp_eng = spacy.load('en_core_web_sm', disable=['ner', 'parser'])
-nlp_rus = spacy.load('ru_core_news_sm', disable=['ner', 'parser'])
 
-stop_words_rus = stopwords.words('russian')
-stop_words_eng = stopwords.words('english')
+def load_spacy(name: str):
+    import spacy
+
+    return spacy.load(name, disable=['ner', 'parser'])
+
+
+model_registry.register('nlp_eng', lambda: load_spacy('en_core_web_sm'))
+model_registry.register('nlp_rus', lambda: load_spacy('ru_core_news_sm'))
+
+stop_words_rus = load_stopwords('russian')
+stop_words_eng = load_stopwords('english')
 stop_words = stop_words_rus + stop_words_eng + ['каждый день',
                                                 'каждый', 'день', 'красная цена', 'красная', 'цена',
                                                 'верный', 'дикси', 'моя', 'моя цена', 'окей', 'то, что надо!',
                                                 'smart', 'spar', 'ашан']
 
 best_look_back = 22
+# число категорий с кэшбеком и проценты за первое и последнее место
+CASHBACK_TOP = 5
+MAX_PERCENT = 10
+MIN_PERCENT = 3
 
 CATEGORIES = ['автозапчасти', 'видеоигры', 'напитки', 'продукты питания', 'закуски и приправы', 'аквариум',
     'одежда', 'уборка', 'электроника', 'образование']
@@ -49,50 +70,117 @@ def get_n_most_frequent_strings(strings: List[str], n: int = 3) -> List[str]:
 
 
 class Categorizer:
-    def __init__(self):
+    def __init__(
+        self,
+        batch_size: int = 256,
+        n_process: int = 1,
+        backend: str = 'keras'
+    ):
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.backend = backend
+        self._topic_model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def load(self) -> 'Categorizer':
+        with self._lock:
+            if self._topic_model is None:
+                self._topic_model, self._tokenizer = self._load_artifacts()
+        return self
+
+    def _load_artifacts(self):
+        if self.backend == 'tflite':
+            # экспортированные cashbacker.export артефакты, без keras
+            return (
+                TFLiteTopicModel(TFLITE_MODEL_PATH),
+                LiteTokenizer.load(TOKENIZER_JSON_PATH)
+            )
+
+        from keras.models import load_model
+        import tensorflow_addons as tfa
+
         current_dir = os.path.dirname(os.path.realpath(__file__))
         model_path = os.path.join(current_dir, 'model_LSTM.h5')
         tokenizer_path = os.path.join(current_dir, 'tokenizer_ LSTM.pkl')
-        
-        self.topic_model = load_model(model_path,
-                                      custom_objects={'Addons>F1Score': tfa.metrics.F1Score})
+
+        topic_model = load_model(model_path,
+                                 custom_objects={'Addons>F1Score': tfa.metrics.F1Score})
         with open(tokenizer_path, 'rb') as f:
-            self.tokenizer = pickle.load(f)
+            tokenizer = pickle.load(f)
+        return topic_model, tokenizer
+
+    @property
+    def topic_model(self):
+        if self._topic_model is None:
+            self.load()
+        return self._topic_model
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self.load()
+        return self._tokenizer
 
     def preprocess_sentences(self, sentences, max_length):
         sequences = self.tokenizer.texts_to_sequences(sentences)
-        padded_sequences = pad_sequences(sequences, maxlen=max_length, padding='post', truncating='post')
+        padded_sequences = pad_sequences(sequences, maxlen=max_length)
         return padded_sequences
 
-    async def tokenize_text(self, products):
-
-        all_sentence = []
-
-        for value in products:
-            lang = detect(value)
+    def clean_doc(self, doc) -> str:
+        lemmas = [token.lemma_ for token in doc if token.is_alpha
+                  and token.text not in punctuation and token.text.lower() not in stop_words]
+        return " ".join(lemmas)
+
+    def clean_sentences(self, products: List[str]) -> List[str]:
+        """
+            Очистка и лемматизация названий товаров батчами.
+            Повторяющиеся названия обрабатываются один раз, названия
+            группируются по языку и прогоняются через nlp.pipe.
+            Порядок результата совпадает с порядком products.
+        """
+        unique_products = list(dict.fromkeys(products))
+
+        groups = {'en': [], 'ru': []}
+        for value in unique_products:
+            groups[route_language(value)].append(value)
+
+        cleaned: dict = {}
+        for lang, values in groups.items():
+            if not values:
+                continue
+            nlp = model_registry.get('nlp_eng' if lang == 'en' else 'nlp_rus')
+            docs = nlp.pipe(
+                values, batch_size=self.batch_size, n_process=self.n_process
+            )
+            for value, doc in zip(values, docs):
+                cleaned[value] = self.clean_doc(doc)
+
+        return [cleaned[value] for value in products]
+
+    def tokenize(self, products: List[str]) -> np.ndarray:
+        all_sentence = self.clean_sentences(products)
+        return self.preprocess_sentences(all_sentence, MAX_LENGTH)
 
-            if lang == 'en':
-                doc = nlp_eng(value)
-                lemmas = [token.lemma_ for token in doc if token.is_alpha
-                          and token.text not in punctuation and token.text.lower() not in stop_words]
-                cleaned_sentence = " ".join(lemmas)
-                all_sentence.append(cleaned_sentence)
-            else:
-                doc = nlp_rus(value)
-                lemmas = [token.lemma_ for token in doc if token.is_alpha
-                          and token.text not in punctuation and token.text.lower() not in stop_words]
-                cleaned_sentence = " ".join(lemmas)
-                all_sentence.append(cleaned_sentence)
-            await asyncio.sleep(0)
-
-        padded_sequences = self.preprocess_sentences(all_sentence, 29)
+    async def tokenize_text(self, products):
+        padded_sequences = self.tokenize(products)
+        await asyncio.sleep(0)
 
         return padded_sequences
 
-    async def get_topics_name(self, product_names: list) -> list:
-        tokens = await self.tokenize_text(product_names)
+    def predict_scores(self, product_names: List[str]) -> np.ndarray:
+        """
+            Синхронный расчёт softmax-оценок (N x len(CATEGORIES)) для
+            батча названий. Выполняется в потоке очереди инференса
+            (categorizer_queue)
+        """
+        tokens = self.tokenize(product_names)
         model = self.topic_model
-        predictions = np.argmax(model(tokens), axis=1)
+        return np.asarray(model(tokens))
+
+    @staticmethod
+    def topics_from_scores(scores: np.ndarray) -> List[str]:
+        predictions = np.argmax(scores, axis=-1).reshape(-1)
         dictionary = {
             "topic": CATEGORIES,
             "label": [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]}
@@ -104,13 +192,36 @@ class Categorizer:
             topics.append(topic)
         return topics
 
+    def predict_topics(self, product_names: List[str]) -> List[str]:
+        return self.topics_from_scores(self.predict_scores(product_names))
+
+    async def get_topics_name(self, product_names: list) -> list:
+        topics = self.predict_topics(product_names)
+        await asyncio.sleep(0)
+        return topics
+
 
 class Cashbacker:
 
     def __init__(self):
-        current_dir = os.path.dirname(os.path.realpath(__file__))
-        model_path = os.path.join(current_dir, 'spendings.h5')
-        self.cashback_model = load_model(model_path)
+        self._cashback_model = None
+        self._lock = threading.Lock()
+
+    def load(self) -> 'Cashbacker':
+        from keras.models import load_model
+
+        with self._lock:
+            if self._cashback_model is None:
+                current_dir = os.path.dirname(os.path.realpath(__file__))
+                model_path = os.path.join(current_dir, 'spendings.h5')
+                self._cashback_model = load_model(model_path)
+        return self
+
+    @property
+    def cashback_model(self):
+        if self._cashback_model is None:
+            self.load()
+        return self._cashback_model
 
     def add_time_features(self, df):
         df['date'] = pd.to_datetime(df['date'])
@@ -148,42 +259,110 @@ class Cashbacker:
 
         return data_grouped[topics]
 
-    def cashbaks_for_user(self, data: pd.DataFrame) -> pd.DataFrame:
-        categories = pd.DataFrame()
-        topics = ['автозапчасти', 'аквариум', 'видеоигры', 'закуски и приправы', 'напитки', 'образование',
-                  'одежда', 'продукты питания', 'уборка', 'электроника']
-
-        df = self.get_dataframe(data)
-
-        scaler = StandardScaler().fit(df.values)
-        final_scaled_train = scaler.transform(df.values)
+    def get_history(self, data: pd.DataFrame) -> np.ndarray:
+        """
+            Траты по месяцам без дополнения истории
+        """
+        return monthly_matrix(
+            data['date'], data['topic'], data['price'], data['client']
+        )
+
+    def get_matrix(self, data: pd.DataFrame) -> np.ndarray:
+        """
+            То же, что get_dataframe(data).values, но на NumPy и
+            без изменения data
+        """
+        return pad_history(self.get_history(data), best_look_back)
+
+    @staticmethod
+    def scale_matrices(matrices: List[np.ndarray]):
+        """
+            StandardScaler для каждого пользователя по всей его истории.
+            Возвращает последние best_look_back месяцев в масштабе
+            (N, best_look_back, категории) и параметры (N, категории)
+            для обратного преобразования
+        """
+        mean = np.stack([matrix.mean(axis=0) for matrix in matrices])
+        scale = np.stack([matrix.std(axis=0) for matrix in matrices])
+        # как в StandardScaler: постоянный признак не масштабируется
+        scale[scale == 0] = 1
+        windows = np.stack([matrix[-best_look_back:] for matrix in matrices])
+        return (windows - mean[:, None]) / scale[:, None], mean, scale
+
+    @staticmethod
+    def offer_percents(predictions: np.ndarray):
+        """
+            Топ-5 категорий по прогнозу для каждой строки predictions
+            и проценты кэшбека: 10 за первое место, 3 за пятое,
+            между ними - пропорционально прогнозу
+        """
+        order = np.argsort(-predictions, axis=1, kind='stable')[:, :CASHBACK_TOP]
+        top = np.take_along_axis(predictions, order, axis=1)
+
+        max_val = top[:, :1]
+        min_val = top[:, -1:]
+        span = max_val - min_val
+        proportion = np.divide(
+            top - min_val, span, out=np.zeros_like(top), where=span > 0
+        )
+        percents = np.round(
+            MIN_PERCENT + proportion * (MAX_PERCENT - MIN_PERCENT)
+        )
+        percents[:, 0] = MAX_PERCENT
+        percents[:, -1] = MIN_PERCENT
+        return order, percents
+
+    def cashbacks_for_matrices(self, matrices: List[np.ndarray]) -> List[pd.DataFrame]:
+        """
+            Кэшбеки по матрицам трат пользователей (месяцы x категории,
+            не меньше best_look_back месяцев, см. get_matrix) за один
+            проход модели
+        """
+        if len(matrices) == 0:
+            return []
+
+        scaled, mean, scale = self.scale_matrices(
+            [np.asarray(matrix, dtype=np.float64) for matrix in matrices]
+        )
+        predictions = np.asarray(self.cashback_model(scaled))
+        predictions_original = predictions * scale + mean
+
+        order, percents = self.offer_percents(predictions_original)
+        topics = np.array(SPENDING_TOPICS, dtype=object)
+        return [
+            pd.DataFrame({'topics': topics[user_order], 'percent': user_percents})
+            for user_order, user_percents in zip(order, percents)
+        ]
+
+    def cashbacks_for_users(self, data: List[pd.DataFrame]) -> List[pd.DataFrame]:
+        """
+            Кэшбеки для нескольких пользователей, data - транзакции
+            каждого в формате cashbaks_for_user
+        """
+        return self.cashbacks_for_matrices(
+            [self.get_matrix(user_data) for user_data in data]
+        )
 
-        x_test = final_scaled_train[-best_look_back:].reshape(1, best_look_back, -1)
-
-        model = self.cashback_model
-        predictions = model(x_test)
-        predictions_original = scaler.inverse_transform(predictions)
-
-        for index in range(len(topics)):
-            categories.loc[index, 'topics'] = topics[index]
-            categories.loc[index, 'predictions'] = predictions_original[0][index]
-
-        top = categories.sort_values(by='predictions', ascending=False).head(5).reset_index(drop=True)
-
-        top.loc[0, 'percent'] = 10
-        top.loc[4, 'percent'] = 3
-
-        min_val = top.loc[4, 'predictions']
-        max_val = top.loc[0, 'predictions']
-
-        # Рассчёт пропорциональных значений для 2, 3 и 4 мест
-        for i in range(1, 4):
-            proportion = (top.loc[i, 'predictions'] - min_val) / (max_val - min_val)
-            top.loc[i, 'percent'] = round(3 + proportion * (10 - 3))
-
-        cashbacks = top[['topics', 'percent']]
-
-        return cashbacks
+    def cashbaks_for_user(self, data: pd.DataFrame) -> pd.DataFrame:
+        return self.cashbacks_for_users([data])[0]
 
 cashbacker = Cashbacker()
-categorizer = Categorizer()
+categorizer = Categorizer(
+    batch_size=app_settings.spacy_batch_size,
+    n_process=app_settings.spacy_n_process,
+    backend=app_settings.categorizer_backend
+)
+
+# Модели загружаются при первом обращении или на warmup при старте
+model_registry.register('categorizer', categorizer.load)
+model_registry.register('cashbacker', cashbacker.load)
+
+# Все вызовы категоризатора из API идут через эту очередь: запросы
+# разных корутин склеиваются в батчи и считаются вне event loop.
+# Результат для каждого названия - строка softmax-оценок модели
+categorizer_queue = MicroBatcher(
+    categorizer.predict_scores,
+    max_batch_size=app_settings.categorizer_batch_size,
+    max_wait=app_settings.categorizer_batch_wait_ms / 1000,
+    name='categorizer'
+)
@@ -0,0 +1,69 @@
+"""
+    Экспорт модели категорий в TFLite для облегчённого рантайма.
+
+    Запуск из папки backend:
+        python -m cashbacker.export
+    Создаёт рядом с исходной моделью model_LSTM.tflite и
+    topic_tokenizer.json. Для работы нужны keras и tensorflow_addons,
+    рантайму после экспорта они не нужны.
+"""
+import argparse
+import json
+import os
+import pickle
+
+import tensorflow as tf
+import tensorflow_addons as tfa
+from keras.models import load_model
+
+from cashbacker.runtime import (CURRENT_DIR, MAX_LENGTH, TFLITE_MODEL_PATH,
+                                TOKENIZER_JSON_PATH, LiteTokenizer)
+
+KERAS_MODEL_PATH = os.path.join(CURRENT_DIR, 'model_LSTM.h5')
+KERAS_TOKENIZER_PATH = os.path.join(CURRENT_DIR, 'tokenizer_ LSTM.pkl')
+
+
+def export_model(model_path: str, output_path: str) -> None:
+    model = load_model(
+        model_path, custom_objects={'Addons>F1Score': tfa.metrics.F1Score}
+    )
+    # батч оставляем динамическим, длина входа фиксирована
+    input_spec = tf.TensorSpec(
+        [None, MAX_LENGTH], dtype=model.inputs[0].dtype
+    )
+    concrete_func = tf.function(
+        lambda tokens: model(tokens, training=False)
+    ).get_concrete_function(input_spec)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions(
+        [concrete_func], model
+    )
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS
+    ]
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def export_tokenizer(tokenizer_path: str, output_path: str) -> None:
+    with open(tokenizer_path, 'rb') as f:
+        tokenizer = pickle.load(f)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(LiteTokenizer.keras_config(tokenizer), f, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=KERAS_MODEL_PATH)
+    parser.add_argument('--tokenizer', default=KERAS_TOKENIZER_PATH)
+    parser.add_argument('--model-output', default=TFLITE_MODEL_PATH)
+    parser.add_argument('--tokenizer-output', default=TOKENIZER_JSON_PATH)
+    args = parser.parse_args()
+
+    export_model(args.model, args.model_output)
+    export_tokenizer(args.tokenizer, args.tokenizer_output)
+    print(f'Saved {args.model_output} and {args.tokenizer_output}')
+
+
+if __name__ == '__main__':
+    main()
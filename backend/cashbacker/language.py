@@ -0,0 +1,61 @@
+from langdetect import DetectorFactory, detect
+from langdetect.lang_detect_exception import LangDetectException
+
+# langdetect недетерминирован без фиксированного seed
+DetectorFactory.seed = 0
+
+# доля букв одного алфавита, начиная с которой язык определяется
+# без статистического детектора
+SCRIPT_THRESHOLD = 0.8
+
+
+def script_counts(text: str) -> tuple:
+    """
+        Количество кириллических и латинских букв в строке
+    """
+    cyrillic = 0
+    latin = 0
+    for char in text:
+        if not char.isalpha():
+            continue
+        if '\u0400' <= char <= '\u04ff':
+            cyrillic += 1
+        elif char.isascii():
+            latin += 1
+    return cyrillic, latin
+
+
+def detect_language(text: str) -> str:
+    """
+        Статистическое определение языка через langdetect,
+        так же, как это делалось раньше для каждой строки
+    """
+    try:
+        return 'en' if detect(text) == 'en' else 'ru'
+    except LangDetectException:
+        # в строке нет букв, например "0.5 л" или артикул
+        return 'ru'
+
+
+def script_language(text: str, threshold: float = SCRIPT_THRESHOLD) -> str | None:
+    """
+        Язык по доле кириллицы и латиницы или None,
+        если строка неоднозначна
+    """
+    cyrillic, latin = script_counts(text)
+    total = cyrillic + latin
+    if total:
+        if cyrillic / total >= threshold:
+            return 'ru'
+        if latin / total >= threshold:
+            return 'en'
+    return None
+
+
+def route_language(text: str, threshold: float = SCRIPT_THRESHOLD) -> str:
+    """
+        Выбор spaCy-пайплайна ('en' или 'ru') для названия товара.
+        Решение принимается по алфавиту, langdetect вызывается
+        только для неоднозначных строк.
+    """
+    return script_language(text, threshold) or detect_language(text)
@@ -0,0 +1,108 @@
+"""
+    Облегчённый CPU-рантайм для модели категорий.
+
+    Работает с артефактами, которые создаёт cashbacker.export:
+    TFLite-моделью и JSON-описанием токенизатора. Keras и
+    tensorflow_addons здесь не импортируются.
+"""
+import json
+import os
+from typing import List
+
+import numpy as np
+
+from core.tflite import TFLiteModel
+
+# длина входной последовательности модели категорий
+MAX_LENGTH = 29
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+TFLITE_MODEL_PATH = os.path.join(CURRENT_DIR, 'model_LSTM.tflite')
+TOKENIZER_JSON_PATH = os.path.join(CURRENT_DIR, 'topic_tokenizer.json')
+
+
+def pad_sequences(
+    sequences: List[List[int]], maxlen: int, value: int = 0
+) -> np.ndarray:
+    """
+        Аналог keras pad_sequences(padding='post', truncating='post')
+    """
+    padded = np.full((len(sequences), maxlen), value, dtype='int32')
+    for index, sequence in enumerate(sequences):
+        sequence = sequence[:maxlen]
+        padded[index, :len(sequence)] = sequence
+    return padded
+
+
+class LiteTokenizer:
+    """
+        Повторяет texts_to_sequences keras Tokenizer
+        по экспортированному словарю
+    """
+
+    def __init__(
+        self,
+        word_index: dict,
+        num_words: int | None = None,
+        oov_token: str | None = None,
+        filters: str = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n',
+        lower: bool = True,
+        split: str = ' '
+    ):
+        self.word_index = word_index
+        self.num_words = num_words
+        self.oov_token = oov_token
+        self.lower = lower
+        self.split = split
+        self._translate_map = str.maketrans({char: split for char in filters})
+
+    @classmethod
+    def from_keras(cls, tokenizer) -> 'LiteTokenizer':
+        return cls(**cls.keras_config(tokenizer))
+
+    @staticmethod
+    def keras_config(tokenizer) -> dict:
+        return {
+            'word_index': tokenizer.word_index,
+            'num_words': tokenizer.num_words,
+            'oov_token': tokenizer.oov_token,
+            'filters': tokenizer.filters,
+            'lower': tokenizer.lower,
+            'split': tokenizer.split
+        }
+
+    @classmethod
+    def load(cls, path: str) -> 'LiteTokenizer':
+        with open(path, encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+    def text_to_word_sequence(self, text: str) -> List[str]:
+        if self.lower:
+            text = text.lower()
+        text = text.translate(self._translate_map)
+        return [word for word in text.split(self.split) if word]
+
+    def texts_to_sequences(self, texts: List[str]) -> List[List[int]]:
+        oov_index = self.word_index.get(self.oov_token)
+        sequences = []
+        for text in texts:
+            sequence = []
+            for word in self.text_to_word_sequence(text):
+                index = self.word_index.get(word)
+                if index is not None:
+                    if self.num_words and index >= self.num_words:
+                        if oov_index is not None:
+                            sequence.append(oov_index)
+                    else:
+                        sequence.append(index)
+                elif self.oov_token is not None:
+                    sequence.append(oov_index)
+            sequences.append(sequence)
+        return sequences
+
+
+class TFLiteTopicModel(TFLiteModel):
+    """
+        Модель категорий на TFLite. Вызывается так же, как keras-модель:
+        model(tokens) -> вероятности классов
+    """
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatcherOverloaded(Exception):
+    """
+        Очередь MicroBatcher заполнена
+    """
+
+
+class MicroBatcher:
+    """
+        Очередь инференса с динамическим микробатчингом.
+
+        Корутины кладут элементы в очередь и получают future с
+        результатом. Фоновая задача собирает элементы в батчи не больше
+        max_batch_size, ожидая добор не дольше max_wait секунд, и
+        выполняет batch_fn в отдельном потоке, не блокируя event loop.
+        batch_fn принимает список элементов и возвращает список
+        результатов той же длины. Если задан max_queue_size, то при
+        переполнении очереди submit сразу падает с BatcherOverloaded.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 256,
+        max_wait: float = 0.01,
+        name: str = 'batcher',
+        max_queue_size: int = 0
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=name
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task and not self._task.done():
+            return
+        # очередь и задача привязаны к event loop, поэтому при смене
+        # цикла (например, в тестах) пересоздаём их
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._task = loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._queue = None
+        self._loop = None
+
+    async def submit(self, item: Any) -> Any:
+        results = await self.submit_many([item])
+        return results[0]
+
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        if not items:
+            return []
+        self.start()
+        if (
+            self.max_queue_size
+            and self._queue.qsize() + len(items) > self.max_queue_size
+        ):
+            raise BatcherOverloaded(f'{self.name}: queue is full')
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._queue.put_nowait((item, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # сначала забираем всё, что уже лежит в очереди
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(
+                    await asyncio.wait_for(self._queue.get(), timeout)
+                )
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            # запросы, которые уже отменили, в модель не отправляем
+            batch = [
+                (item, future) for item, future in batch
+                if not future.done()
+            ]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = await self._loop.run_in_executor(
+                    self._executor, self.batch_fn, items
+                )
+            except Exception as e:
+                logger.exception('%s: batch of %s failed', self.name, len(items))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            if len(results) < len(batch):
+                # иначе оставшиеся запросы ждали бы результата вечно
+                logger.error(
+                    '%s: %s results for batch of %s',
+                    self.name, len(results), len(batch)
+                )
+                error = RuntimeError(
+                    f'{self.name}: batch_fn returned {len(results)} '
+                    f'results for {len(batch)} items'
+                )
+                for _, future in batch[len(results):]:
+                    if not future.done():
+                        future.set_exception(error)
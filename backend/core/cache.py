@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List
+
+
+class LRUCache:
+    """
+        Простой in-process LRU-кэш с ограничением по размеру,
+        необязательным временем жизни записей (ttl, секунды)
+        и счётчиками попаданий/промахов
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float | None = None,
+        timer: Callable[[], float] = time.monotonic
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        # ключ -> (момент устаревания или None, значение)
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data and not self._expire(key)
+
+    def _expire(self, key: Hashable) -> bool:
+        expires_at = self._data[key][0]
+        if expires_at is not None and expires_at <= self._timer():
+            del self._data[key]
+            return True
+        return False
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key in self._data and not self._expire(key):
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key][1]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = self._timer() + self.ttl if self.ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self:
+            return default
+        return self._data.pop(key)[1]
+
+    def keys(self) -> List[Hashable]:
+        return list(self._data)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
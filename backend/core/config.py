@@ -22,7 +22,190 @@ class AppSettings(BaseSettings):
     )
     giga_chat_token: str = os.getenv('GIGACHAT_TOKEN')
     echo: bool = os.getenv('ECHO', 'True') == 'True'
-    
+    # размер батча и число процессов для nlp.pipe в категоризаторе
+    spacy_batch_size: int = int(os.getenv('SPACY_BATCH_SIZE', '256'))
+    spacy_n_process: int = int(os.getenv('SPACY_N_PROCESS', '1'))
+    # keras или tflite (см. cashbacker.export)
+    categorizer_backend: str = os.getenv('CATEGORIZER_BACKEND', 'keras')
+    # кэш категорий: версия модели входит в ключ, при смене модели
+    # старые записи перестают использоваться
+    categorizer_model_version: str = os.getenv(
+        'CATEGORIZER_MODEL_VERSION', 'lstm-1'
+    )
+    category_cache_size: int = int(os.getenv('CATEGORY_CACHE_SIZE', '50000'))
+    # микробатчинг запросов к категоризатору
+    categorizer_batch_size: int = int(
+        os.getenv('CATEGORIZER_BATCH_SIZE', '256')
+    )
+    categorizer_batch_wait_ms: int = int(
+        os.getenv('CATEGORIZER_BATCH_WAIT_MS', '10')
+    )
+
+    # inline - категории определяются при загрузке транзакций,
+    # deferred - транзакции сохраняются без категории, а категории
+    # проставляет фоновый воркер
+    transactions_categorization_mode: str = os.getenv(
+        'TRANSACTIONS_CATEGORIZATION_MODE', 'inline'
+    )
+    categorization_batch_size: int = int(
+        os.getenv('CATEGORIZATION_BATCH_SIZE', '1000')
+    )
+    categorization_poll_interval: float = float(
+        os.getenv('CATEGORIZATION_POLL_INTERVAL', '5')
+    )
+    # массовая категоризация: лимит названий и порог потоковой выдачи
+    categorize_bulk_max_names: int = int(
+        os.getenv('CATEGORIZE_BULK_MAX_NAMES', '5000')
+    )
+    categorize_stream_threshold: int = int(
+        os.getenv('CATEGORIZE_STREAM_THRESHOLD', '500')
+    )
+    # модели, загружаемые на старте; сервис готов (/ready/) после загрузки
+    # (через запятую)
+    warmup_models: str = os.getenv(
+        'WARMUP_MODELS', 'nlp_eng,nlp_rus,categorizer,cashbacker,antispoofing'
+    )
+    # ночной предрасчёт кэшбеков на выбор (services.cashback_precompute)
+    cashback_precompute_enabled: bool = os.getenv(
+        'CASHBACK_PRECOMPUTE_ENABLED', 'False'
+    ) == 'True'
+    cashback_precompute_hour: int = int(
+        os.getenv('CASHBACK_PRECOMPUTE_HOUR', '3')
+    )
+    cashback_precompute_batch_size: int = int(
+        os.getenv('CASHBACK_PRECOMPUTE_BATCH_SIZE', '200')
+    )
+    # кэш прогнозов кэшбека: версия модели входит в ключ
+    cashback_model_version: str = os.getenv(
+        'CASHBACK_MODEL_VERSION', 'spendings-1'
+    )
+    forecast_cache_size: int = int(os.getenv('FORECAST_CACHE_SIZE', '10000'))
+    forecast_cache_ttl: float = float(
+        os.getenv('FORECAST_CACHE_TTL', '86400')
+    )
+    # Unix-сокет общего сервера моделей (services.model_server);
+    # пусто - модели загружаются в каждом воркере
+    model_server_socket: str = os.getenv('MODEL_SERVER_SOCKET', '')
+    model_server_timeout: float = float(
+        os.getenv('MODEL_SERVER_TIMEOUT', '30')
+    )
+    # при недоступном сервере считать модели в воркере
+    model_server_fallback: bool = os.getenv(
+        'MODEL_SERVER_FALLBACK', 'True'
+    ) == 'True'
+    # проверка фото на терминале (services.antispoofing)
+    antispoofing_enabled: bool = os.getenv(
+        'ANTISPOOFING_ENABLED', 'True'
+    ) == 'True'
+    antispoofing_batch_size: int = int(
+        os.getenv('ANTISPOOFING_BATCH_SIZE', '16')
+    )
+    antispoofing_batch_wait_ms: int = int(
+        os.getenv('ANTISPOOFING_BATCH_WAIT_MS', '5')
+    )
+    antispoofing_queue_size: int = int(
+        os.getenv('ANTISPOOFING_QUEUE_SIZE', '64')
+    )
+    antispoofing_deadline_ms: int = int(
+        os.getenv('ANTISPOOFING_DEADLINE_MS', '800')
+    )
+    # open - при сбое или превышении дедлайна фото считается живым,
+    # closed - отклоняется
+    antispoofing_failure_policy: str = os.getenv(
+        'ANTISPOOFING_FAILURE_POLICY', 'closed'
+    )
+    # pil - декодирование JPEG сразу в уменьшенном масштабе,
+    # tf - прежний путь через tensorflow (services.image_preprocessing)
+    antispoofing_decoder: str = os.getenv('ANTISPOOFING_DECODER', 'pil')
+    # общий бюджет внешних вызовов /terminal (services.terminal)
+    terminal_deadline_ms: int = int(
+        os.getenv('TERMINAL_DEADLINE_MS', '3000')
+    )
+    # пул соединений внешних интеграций (services.http_client)
+    integrations_pool_size: int = int(
+        os.getenv('INTEGRATIONS_POOL_SIZE', '100')
+    )
+    integrations_limit_per_upstream: int = int(
+        os.getenv('INTEGRATIONS_LIMIT_PER_UPSTREAM', '20')
+    )
+    integrations_keepalive_sec: float = float(
+        os.getenv('INTEGRATIONS_KEEPALIVE_SEC', '30')
+    )
+    integrations_dns_ttl_sec: int = int(
+        os.getenv('INTEGRATIONS_DNS_TTL_SEC', '300')
+    )
+    integrations_connect_timeout: float = float(
+        os.getenv('INTEGRATIONS_CONNECT_TIMEOUT', '3')
+    )
+    integrations_read_timeout: float = float(
+        os.getenv('INTEGRATIONS_READ_TIMEOUT', '10')
+    )
+    # устойчивость вызовов (services.resilience): таймауты попытки по
+    # сервисам, повторы идемпотентных запросов, circuit breaker и
+    # hedged-запросы к НСПК и банкам (0 - выключены)
+    integrations_timeouts: str = os.getenv(
+        'INTEGRATIONS_TIMEOUTS', 'gosuslugi=5,ebs=3,nspk=2,bank=3'
+    )
+    integrations_retries: int = int(os.getenv('INTEGRATIONS_RETRIES', '2'))
+    integrations_backoff_ms: int = int(
+        os.getenv('INTEGRATIONS_BACKOFF_MS', '100')
+    )
+    integrations_breaker_failures: int = int(
+        os.getenv('INTEGRATIONS_BREAKER_FAILURES', '5')
+    )
+    integrations_breaker_reset_sec: float = float(
+        os.getenv('INTEGRATIONS_BREAKER_RESET_SEC', '30')
+    )
+    integrations_hedge_delay_ms: int = int(
+        os.getenv('INTEGRATIONS_HEDGE_DELAY_MS', '0')
+    )
+    # одновременных запросов кэшбеков к банкам при входе
+    login_sync_concurrency: int = int(
+        os.getenv('LOGIN_SYNC_CONCURRENCY', '8')
+    )
+    # снимок терминала старше этого обновляется в фоне после ответа
+    terminal_snapshot_max_age_sec: int = int(
+        os.getenv('TERMINAL_SNAPSHOT_MAX_AGE_SEC', '900')
+    )
+    # keras - float-модель, tflite - int8 (services.antispoofing_export)
+    antispoofing_backend: str = os.getenv('ANTISPOOFING_BACKEND', 'keras')
+    # путь к .tflite, по умолчанию services/mobilenetv2/antispoofing_int8.tflite
+    antispoofing_tflite_model: str = os.getenv('ANTISPOOFING_TFLITE_MODEL', '')
+    antispoofing_tflite_threads: int = int(
+        os.getenv('ANTISPOOFING_TFLITE_THREADS', '0')
+    )
+    # фоновая синхронизация транзакций (services.transaction_sync):
+    # счета пользователей, заходивших за ACTIVE_DAYS, обновляются, если
+    # данные старше FRESHNESS_MIN
+    transaction_sync_enabled: bool = os.getenv(
+        'TRANSACTION_SYNC_ENABLED', 'True'
+    ) == 'True'
+    transaction_sync_freshness_min: int = int(
+        os.getenv('TRANSACTION_SYNC_FRESHNESS_MIN', '30')
+    )
+    transaction_sync_active_days: int = int(
+        os.getenv('TRANSACTION_SYNC_ACTIVE_DAYS', '7')
+    )
+    transaction_sync_concurrency: int = int(
+        os.getenv('TRANSACTION_SYNC_CONCURRENCY', '4')
+    )
+    transaction_sync_batch_size: int = int(
+        os.getenv('TRANSACTION_SYNC_BATCH_SIZE', '100')
+    )
+    transaction_sync_interval_sec: float = float(
+        os.getenv('TRANSACTION_SYNC_INTERVAL_SEC', '60')
+    )
+    transaction_sync_jitter_sec: float = float(
+        os.getenv('TRANSACTION_SYNC_JITTER_SEC', '5')
+    )
+    # пауза перед повтором после неудачной синхронизации счёта:
+    # удваивается с каждой неудачей до RETRY_MAX_SEC
+    transaction_sync_retry_base_sec: float = float(
+        os.getenv('TRANSACTION_SYNC_RETRY_BASE_SEC', '60')
+    )
+    transaction_sync_retry_max_sec: float = float(
+        os.getenv('TRANSACTION_SYNC_RETRY_MAX_SEC', '3600')
+    )
 
     class Config:
         env_file = os.path.join(BASE_DIR, '.env')
@@ -0,0 +1,23 @@
+import time
+from typing import Callable
+
+
+class Deadline:
+    """
+        Общий бюджет времени запроса, который делится между этапами.
+
+        stage(share) - время на этап: доля share от всего бюджета, но
+        не больше, чем осталось до дедлайна. Время, не израсходованное
+        ранними этапами, достаётся последнему (remaining()).
+    """
+
+    def __init__(self, seconds: float, timer: Callable[[], float] = time.monotonic):
+        self.seconds = seconds
+        self._timer = timer
+        self._expires_at = timer() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - self._timer())
+
+    def stage(self, share: float) -> float:
+        return min(self.remaining(), self.seconds * share)
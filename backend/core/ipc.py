@@ -0,0 +1,41 @@
+"""
+    Протокол обмена с сервером моделей (services.model_server):
+    сообщение - 4 байта длины (big-endian) и JSON.
+"""
+import asyncio
+import struct
+from typing import Any
+
+import orjson
+
+HEADER = struct.Struct('>I')
+# защита от битых заголовков: больше этого сообщения не бывают
+MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+
+class MessageTooLarge(Exception):
+    pass
+
+
+def encode_message(message: Any) -> bytes:
+    body = orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY)
+    if len(body) > MAX_MESSAGE_SIZE:
+        raise MessageTooLarge(len(body))
+    return HEADER.pack(len(body)) + body
+
+
+async def read_message(reader: asyncio.StreamReader) -> Any:
+    """
+        Читает одно сообщение. На закрытом соединении -
+        asyncio.IncompleteReadError
+    """
+    header = await reader.readexactly(HEADER.size)
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise MessageTooLarge(size)
+    return orjson.loads(await reader.readexactly(size))
+
+
+async def write_message(writer: asyncio.StreamWriter, message: Any) -> None:
+    writer.write(encode_message(message))
+    await writer.drain()
@@ -0,0 +1,70 @@
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+        Реестр тяжёлых артефактов (spaCy, keras-модели, клиенты).
+
+        При регистрации ничего не загружается: артефакт создаётся при
+        первом get() или на этапе warmup(). Загрузчик можно передать
+        функцией или строкой 'module:attr', тогда модуль импортируется
+        только при загрузке.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any] | str] = {}
+        self._models: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self.load_times: Dict[str, float] = {}
+        self.ready = False
+
+    def register(self, name: str, loader: Callable[[], Any] | str) -> None:
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str) -> Any:
+        if name in self._models:
+            return self._models[name]
+        with self._locks[name]:
+            if name not in self._models:
+                start = time.perf_counter()
+                self._models[name] = self._resolve(self._loaders[name])()
+                self.load_times[name] = time.perf_counter() - start
+                logger.info(
+                    'Model %s loaded in %.2fs', name, self.load_times[name]
+                )
+        return self._models[name]
+
+    def warmup(self, names: Iterable[str] | None = None) -> Dict[str, float]:
+        """
+            Загружает перечисленные (по умолчанию все) артефакты и
+            после этого помечает реестр готовым
+        """
+        if names is None:
+            names = list(self._loaders)
+        for name in names:
+            self.get(name)
+        self.ready = True
+        return dict(self.load_times)
+
+    def status(self) -> Dict[str, bool]:
+        return {name: self.is_loaded(name) for name in self._loaders}
+
+    @staticmethod
+    def _resolve(loader: Callable[[], Any] | str) -> Callable[[], Any]:
+        if callable(loader):
+            return loader
+        module_name, attr = loader.split(':')
+        return getattr(importlib.import_module(module_name), attr)
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,45 @@
+"""
+    Общая обёртка над TFLite-интерпретатором для моделей сервиса
+    (категории - cashbacker.runtime, антиспуфинг -
+    services.antispoofing_runtime). Keras здесь не импортируется.
+"""
+import numpy as np
+
+
+def load_interpreter(model_path: str, num_threads: int | None = None):
+    """
+        TFLite-интерпретатор: tflite_runtime, если установлен,
+        иначе интерпретатор из tensorflow
+    """
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        from tensorflow.lite import Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+class TFLiteModel:
+    """
+        Модель с одним входом и одним выходом и динамическим размером
+        батча: model(inputs) -> выход модели. Тензоры перераспределяются
+        только при смене размера батча
+    """
+
+    def __init__(self, model_path: str, num_threads: int | None = None):
+        self.interpreter = load_interpreter(model_path, num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+
+    def __call__(self, inputs: np.ndarray) -> np.ndarray:
+        inputs = np.asarray(inputs, dtype=self._input['dtype'])
+        if self._batch_size != len(inputs):
+            self.interpreter.resize_tensor_input(
+                self._input['index'], inputs.shape
+            )
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(inputs)
+        self.interpreter.set_tensor(self._input['index'], inputs)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output['index'])
@@ -41,3 +41,59 @@ class CashbackAlreadyChoosenException(HTTPException):
             detail=detail,
             headers=headers
         )
+
+
+class TooManyNamesException(HTTPException):
+    def __init__(
+        self,
+        status_code: int = status.HTTP_400_BAD_REQUEST,
+        detail: str = 'Слишком много названий в одном запросе',
+        headers: dict = {"WWW-Authenticate": "Bearer"}
+    ) -> None:
+        super().__init__(
+            status_code=status_code,
+            detail=detail,
+            headers=headers
+        )
+
+
+class UpstreamTimeoutException(HTTPException):
+    def __init__(
+        self,
+        status_code: int = status.HTTP_504_GATEWAY_TIMEOUT,
+        detail: str = 'Внешний сервис не ответил вовремя',
+        headers: dict = {"WWW-Authenticate": "Bearer"}
+    ) -> None:
+        super().__init__(
+            status_code=status_code,
+            detail=detail,
+            headers=headers
+        )
+
+
+class UpstreamUnavailableException(HTTPException):
+    def __init__(
+        self,
+        status_code: int = status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail: str = 'Внешний сервис недоступен',
+        headers: dict = {"WWW-Authenticate": "Bearer"}
+    ) -> None:
+        super().__init__(
+            status_code=status_code,
+            detail=detail,
+            headers=headers
+        )
+
+
+class TransactionsNotSyncedException(HTTPException):
+    def __init__(
+        self,
+        status_code: int = status.HTTP_409_CONFLICT,
+        detail: str = 'Транзакции счёта ещё не загружены, повторите позже',
+        headers: dict = {"WWW-Authenticate": "Bearer"}
+    ) -> None:
+        super().__init__(
+            status_code=status_code,
+            detail=detail,
+            headers=headers
+        )
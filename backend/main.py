@@ -1,3 +1,6 @@
+import asyncio
+import logging
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,6 +8,15 @@ from fastapi.responses import ORJSONResponse
 
 from api.v1 import base as api
 from core.config import app_settings
+from core.registry import model_registry
+from services.cashback_precompute import cashback_precompute_scheduler
+from services.categorization_worker import categorization_worker
+from services.http_client import integrations_client
+from services.model_client import model_client
+from services.terminal import snapshot_refresher
+from services.transaction_sync import transaction_sync_scheduler
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=app_settings.app_title,
@@ -25,6 +37,46 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+
+
+async def warmup_models():
+    if model_client.enabled:
+        # модели загружает services.model_server
+        return
+    try:
+        load_times = await asyncio.to_thread(
+            model_registry.warmup,
+            [name for name in app_settings.warmup_models.split(',') if name]
+        )
+        logger.info('Models are ready: %s', load_times)
+    except Exception:
+        logger.exception('Models warmup failed')
+
+
+@app.on_event('startup')
+async def startup_event():
+    # модели грузятся в фоне, воркер сразу принимает соединения,
+    # а /ready/ отвечает 200 только после прогрева
+    app.state.warmup_task = asyncio.create_task(warmup_models())
+    await integrations_client.start()
+    if app_settings.transactions_categorization_mode == 'deferred':
+        categorization_worker.start()
+    if app_settings.cashback_precompute_enabled:
+        cashback_precompute_scheduler.start()
+    if app_settings.transaction_sync_enabled:
+        transaction_sync_scheduler.start()
+
+
+@app.on_event('shutdown')
+async def shutdown_event():
+    await categorization_worker.stop()
+    await cashback_precompute_scheduler.stop()
+    await transaction_sync_scheduler.stop()
+    await snapshot_refresher.stop()
+    await model_client.close()
+    await integrations_client.close()
+
+
 if __name__ == "__main__":
     uvicorn.run(
         'main:app',
@@ -1,4 +1,6 @@
-from sqlalchemy import Boolean, Column, Date, ForeignKey, Integer, String
+from sqlalchemy import (BigInteger, Boolean, Column, Date, ForeignKey,
+                        Integer, String)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.schema import UniqueConstraint
 from sqlalchemy.types import TIMESTAMP
@@ -14,6 +16,9 @@ class User(Base):
     surname = Column(String(100), nullable=False)
     gosuslugi_id = Column(String(16), unique=True)
     ebs = Column(Boolean)
+    # последний запрос пользователя, по нему фоновая синхронизация
+    # выбирает, чьи счета обновлять в первую очередь
+    last_active_at = Column(type_=TIMESTAMP(timezone=True), index=True)
     accounts = relationship('Account', back_populates='user')
     limits = relationship('CategotyLimit', back_populates='user')
 
@@ -31,6 +36,9 @@ class Account(Base):
     transactions = relationship('Transaction', back_populates='account')
     last_transation_time = Column(type_=TIMESTAMP(timezone=True)) # для обновления транзакций только с определенной даты
     transations_update_time = Column(type_=TIMESTAMP(timezone=True)) # для обновления транзакций только с определенной даты
+    sync_lag_seconds = Column(Integer) # насколько устарели транзакции к последней синхронизации
+    sync_failures = Column(Integer, default=0) # неудачных синхронизаций подряд
+    sync_retry_at = Column(type_=TIMESTAMP(timezone=True)) # не синхронизировать раньше (после неудачи)
 
 
 class Card(Base):
@@ -96,3 +104,52 @@ class CategotyLimit(Base):
             'user_id', 'category'
         ),
     )
+
+
+class CategoryCache(Base):
+    __tablename__ = 'category_cache'
+    __mapper_args__ = {"eager_defaults": True}
+    id = Column(Integer, primary_key=True)
+    name = Column(String(300), nullable=False) # нормализованное название товара
+    model_version = Column(String(50), nullable=False)
+    category = Column(String(100), nullable=False)
+    __table_args__ = (
+        UniqueConstraint(
+            'name', 'model_version'
+        ),
+    )
+
+
+class AccountMonthSpending(Base):
+    """
+        Траты по счёту за месяц в разрезе категорий. Обновляется вместе
+        с сохранением транзакций, транзакции без категории не учитываются
+    """
+    __tablename__ = 'account_month_spendings'
+    __mapper_args__ = {"eager_defaults": True}
+    id = Column(Integer, primary_key=True)
+    account_id = Column(Integer, ForeignKey('accounts.id'), nullable=False)
+    month = Column(Date, nullable=False) # первое число месяца (UTC)
+    category = Column(String(100), nullable=False)
+    total = Column(BigInteger, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+    __table_args__ = (
+        UniqueConstraint(
+            'account_id', 'month', 'category'
+        ),
+    )
+
+
+class TerminalSnapshot(Base):
+    """
+        Готовый ответ терминала для пользователя: карты и кэшбеки на
+        месяц (список schemas.CardWithCashback). Пересобирается при
+        синхронизации счетов на входе и при выборе кэшбека
+    """
+    __tablename__ = 'terminal_snapshots'
+    __mapper_args__ = {"eager_defaults": True}
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, unique=True)
+    month = Column(Date, nullable=False)
+    cards = Column(JSONB, nullable=False)
+    updated_at = Column(type_=TIMESTAMP(timezone=True), nullable=False)
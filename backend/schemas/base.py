@@ -1,7 +1,7 @@
 from datetime import date, datetime
-from typing import List
+from typing import Dict, List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, conint, root_validator
 
 
 class Token(BaseModel):
@@ -73,6 +73,8 @@ class AccountUpdate(BaseModel):
     id: int
     last_transation_time: datetime | None = None
     transations_update_time: datetime | None = None
+    sync_lag_seconds: int | None = None
+    sync_failures: int | None = None
 
 
 class CashbackCreate(BaseModel):
@@ -104,16 +106,30 @@ class Transaction(BaseModel):
     time: datetime
     name: str
     value: int
-    category: str
+    category: str | None # None - категория ещё не определена
 
     class Config:
         orm_mode = True
 
+
+class TransactionInfo(Transaction):
+    pending: bool = False
+
+    @root_validator(skip_on_failure=True)
+    def set_pending(cls, values):
+        values['pending'] = values.get('category') is None
+        return values
+
 class TransactionCreate(Transaction):
     bank_id: int
     account_id: int
 
 
+class TransactionCategory(BaseModel):
+    id: int
+    category: str
+
+
 class Cashback(RawCashback):
     pass
 
@@ -132,6 +148,18 @@ class CashbacksForChoose(BaseModel):
     cashbacks: List[Cashback]
 
 
+class CashbackPrecomputeProgress(BaseModel):
+    month: date
+    total: int = 0
+    computed: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+    @property
+    def processed(self) -> int:
+        return self.computed + self.skipped + self.failed
+
+
 class AccountWithCardsAndCashbacks(CashbacksForChoose):
     cards: List[Card]
 
@@ -139,7 +167,7 @@ class AccountWithCardsAndCashbacks(CashbacksForChoose):
 class AccountWithTransactions(BaseModel):
     account_number: str
     bank: str
-    transactions: List[Transaction]
+    transactions: List[TransactionInfo]
 
 
 class CardWithCashback(BaseModel):
@@ -162,6 +190,16 @@ class TerminalResponse(BaseModel):
     cards: List[CardWithCashback]
 
 
+class TerminalSnapshot(BaseModel):
+    user_id: int
+    month: date
+    cards: List[CardWithCashback]
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
 class TransactionName(BaseModel):
     name: str
 
@@ -170,6 +208,63 @@ class CategoryName(BaseModel):
     name: str
 
 
+class TransactionNames(BaseModel):
+    names: List[str]
+    top_k: conint(ge=1, le=10) = 3
+
+
+class CategoryScore(BaseModel):
+    category: str
+    score: float
+
+
+class CategoryWithScores(BaseModel):
+    name: str
+    category: str
+    scores: List[CategoryScore]
+
+
+class CategoryCacheCreate(BaseModel):
+    name: str
+    model_version: str
+    category: str
+
+
+class AccountMonthSpendingCreate(BaseModel):
+    account_id: int
+    month: date
+    category: str
+    total: int
+    count: int
+
+
+class CategoryCacheStats(BaseModel):
+    memory_hits: int
+    db_hits: int
+    misses: int
+    hit_rate: float
+    memory_size: int
+
+
+class UpstreamStats(BaseModel):
+    requests: int
+    in_flight: int
+    errors: int
+    timeouts: int
+
+
+class IntegrationsStats(BaseModel):
+    pool_size: int
+    limit_per_upstream: int
+    connections_created: int
+    connections_reused: int
+    dns_cache_hits: int
+    dns_cache_misses: int
+    upstreams: Dict[str, UpstreamStats]
+    # состояние circuit breaker и счётчики исходов по сервисам
+    resilience: Dict[str, Dict[str, int | str]]
+
+
 class RawLimit(BaseModel):
     category: str
     value: int
@@ -206,4 +301,9 @@ class UpdateLimit(Limit):
     
 
 class GigaChatAnswer(BaseModel):
-    answer: str
\ No newline at end of file
+    answer: str
+
+
+class Readiness(BaseModel):
+    ready: bool
+    models: dict
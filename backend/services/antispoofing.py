@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from core.config import app_settings
+from services.inference import antispoofing_score
+
+logger = logging.getLogger(__name__)
+
+# оценка модели выше порога - живое лицо
+THRESHOLD = 0.5
+
+
+class AntiSpoofingService:
+    """
+        Проверка фото с терминала на подделку.
+
+        Фото считаются батчами (services.validation.antispoofing_queue,
+        в процессе или на сервере моделей). На каждый запрос есть
+        дедлайн; если модель не успела, очередь переполнена или
+        инференс упал, результат определяет политика: fail_open -
+        пропустить, иначе - отклонить.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        deadline: float = 0.8,
+        fail_open: bool = False,
+        score_fn: Callable[[bytes], Awaitable[float | None]] = antispoofing_score
+    ):
+        self.enabled = enabled
+        self.deadline = deadline
+        self.fail_open = fail_open
+        self.score_fn = score_fn
+        self.passed = 0
+        self.rejected = 0
+        self.failures = 0
+
+    async def validate(self, image: bytes) -> bool:
+        if not self.enabled:
+            return True
+        try:
+            score = await asyncio.wait_for(self.score_fn(image), self.deadline)
+        except Exception as e:
+            # дедлайн (TimeoutError), переполнение очереди
+            # (BatcherOverloaded), недоступный сервер моделей или ошибка
+            # самой модели
+            self.failures += 1
+            logger.warning(
+                'Anti-spoofing check failed (%r), fail-%s',
+                e, 'open' if self.fail_open else 'closed'
+            )
+            return self.fail_open
+
+        # фото, которое не удалось декодировать, не проходит проверку
+        if score is not None and score > THRESHOLD:
+            self.passed += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def stats(self) -> dict:
+        return {
+            'passed': self.passed,
+            'rejected': self.rejected,
+            'failures': self.failures
+        }
+
+
+antispoofing_service = AntiSpoofingService(
+    enabled=app_settings.antispoofing_enabled,
+    deadline=app_settings.antispoofing_deadline_ms / 1000,
+    fail_open=app_settings.antispoofing_failure_policy == 'open'
+)
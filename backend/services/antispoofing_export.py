@@ -0,0 +1,66 @@
+"""
+    Экспорт модели антиспуфинга в TFLite с int8-квантизацией после
+    обучения (веса и активации int8, вход и выход остаются float32,
+    поэтому подготовка фото не меняется).
+
+    Запуск из папки backend:
+        python -m services.antispoofing_export --images /data/terminal_photos
+    Фото из папки служат калибровочной выборкой для диапазонов
+    активаций: чем ближе они к реальным фото с терминалов, тем точнее
+    модель. Результат - services/mobilenetv2/antispoofing_int8.tflite,
+    включается через ANTISPOOFING_BACKEND=tflite. Сравнить с float-
+    моделью: python -m benchmarks.antispoofing_quantization.
+"""
+import argparse
+from typing import Iterator, List
+
+import numpy as np
+import tensorflow as tf
+
+from services.antispoofing_model import load_inference_model
+from services.antispoofing_runtime import TFLITE_MODEL_PATH
+from services.image_preprocessing import IMG_SHAPE, decode_into, list_images
+
+
+def representative_dataset(paths: List[str]) -> Iterator[List[np.ndarray]]:
+    for path in paths:
+        with open(path, 'rb') as f:
+            image = decode_into(f.read(), np.empty(IMG_SHAPE, dtype=np.float32))
+        yield [image[np.newaxis]]
+
+
+def export_model(paths: List[str], output_path: str) -> None:
+    model = load_inference_model()
+    input_spec = tf.TensorSpec([None, *IMG_SHAPE], dtype=tf.float32)
+    concrete_func = tf.function(
+        lambda images: model.call(images)
+    ).get_concrete_function(input_spec)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions(
+        [concrete_func], model
+    )
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = lambda: representative_dataset(paths)
+    converter.target_spec.supported_ops = [
+        tf.lite.OpsSet.TFLITE_BUILTINS_INT8
+    ]
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', required=True)
+    parser.add_argument('--samples', type=int, default=300)
+    parser.add_argument('--output', default=TFLITE_MODEL_PATH)
+    args = parser.parse_args()
+
+    paths = list_images(args.images, args.samples)
+    if not paths:
+        parser.error(f'No images found in {args.images}')
+    export_model(paths, args.output)
+    print(f'Saved {args.output} ({len(paths)} calibration images)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+    Квантизованная (int8) модель антиспуфинга на TFLite.
+
+    Модель создаёт services.antispoofing_export, tensorflow и keras
+    здесь не импортируются.
+"""
+import os
+
+import numpy as np
+
+from core.config import app_settings
+from core.tflite import TFLiteModel
+
+TFLITE_MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    'mobilenetv2', 'antispoofing_int8.tflite'
+)
+
+
+class TFLiteAntiSpoofingModel(TFLiteModel):
+    """
+        call(images) -> оценки (batch, 1), как у RevisitResNet50Inference
+    """
+
+    def call(self, images: np.ndarray) -> np.ndarray:
+        return self(images)
+
+
+def load_tflite_model() -> TFLiteAntiSpoofingModel:
+    return TFLiteAntiSpoofingModel(
+        app_settings.antispoofing_tflite_model or TFLITE_MODEL_PATH,
+        num_threads=app_settings.antispoofing_tflite_threads or None
+    )
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
 from fastapi import Depends
@@ -17,6 +17,8 @@ from services.db import user_crud
 SECRET_KEY = app_settings.secret_key
 ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_DAYS = 7
+# как часто обновлять users.last_active_at (очередь services.transaction_sync)
+ACTIVITY_TOUCH_INTERVAL = timedelta(minutes=5)
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/api/v1/auth')
@@ -49,6 +51,12 @@ async def get_current_user(
     )
     if user_in_db is None:
         raise CredentialException
+    await user_crud.touch(
+        db=db,
+        user=user_in_db,
+        now=datetime.now(timezone.utc),
+        min_interval=ACTIVITY_TOUCH_INTERVAL
+    )
     return schemas.FullUser(
         id=user_in_db.id,
         first_name=user_in_db.first_name,
@@ -1,54 +1,88 @@
-import asyncio
-from datetime import date, datetime
-from typing import List
+from datetime import date
+from typing import Dict, List
 
 from dateutil.relativedelta import relativedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-import pandas as pd
 
-from cashbacker.casbacker import cashbacker
+from exceptions import api as api_exceptions
 from models import base as models
 from schemas import base as schemas
+from services.forecasts import forecast_cache
+from services.spendings import spendings_dataframe
+
+# банки, в которых клиент сам выбирает категории кэшбека
+CHOOSE_CASHBACK_BANKS = ('Центр-инвест',)
 
 
 def can_choose_cashback(bank: str) -> bool:
-    if bank == 'Центр-инвест':
+    if bank in CHOOSE_CASHBACK_BANKS:
         return True
 
     return False
 
 
+def history_start(month: date) -> date:
+    """
+        С какого месяца брать траты для прогноза на month (2 года)
+    """
+    return month - relativedelta(years=2)
+
+
 async def get_card_choose_cashback(
         db: AsyncSession, account: models.Account, month: date
     ) -> List[schemas.Cashback]:
-    from services.db import transaction_crud
+    from services.db import spending_crud
     from services.external_integrations import update_account_transactions
 
-    await update_account_transactions(
-        db=db,
-        account=account
-    )
-
-    start_time = datetime.combine(
-        month, datetime.min.time()
-    ) - relativedelta(year=2)
+    # траты из базы: транзакции обновляет services.transaction_sync.
+    # Счёт, который ещё ни разу не синхронизировался (сразу после входа),
+    # синхронизируем здесь: иначе прогноз по пустым тратам сохранился бы
+    # в предложениях на весь месяц
+    if account.transations_update_time is None:
+        if not await update_account_transactions(db=db, account=account):
+            raise api_exceptions.TransactionsNotSyncedException()
 
-    transactions: List[models.Transaction] = await transaction_crud \
-        .get_user_transactions_from(
-            db=db, account_id=account.id, start_time=start_time
+    spendings: List[models.AccountMonthSpending] = await spending_crud \
+        .get_accounts_spendings(
+            db=db, account_ids=[account.id], start_month=history_start(month)
         )
-    df = pd.DataFrame([(d.time, 'клиент', d.category, d.value) for d in transactions], 
-                  columns=['date', 'client', 'topic', 'price'])
-    
-    cashbacks = await asyncio.to_thread(
-        cashbacker.cashbaks_for_user, data=df
+    cashbacks = await forecast_cache.get_cashbacks(
+        month=month, spendings={account.id: spendings_dataframe(spendings)}
     )
 
-    return [
-        schemas.Cashback(
-            product_type=row['topics'],
-            value=row['percent']
-        )
-        for _, row in cashbacks.iterrows()
-    ]
+    return cashbacks[account.id]
 
+
+async def save_month_offers(
+    db: AsyncSession,
+    month: date,
+    offers: Dict[int, List[schemas.Cashback]]
+) -> None:
+    """
+        Сохраняет кэшбеки на выбор (status=False) по счетам:
+        offers - {account_id: кэшбеки}. Уже сохранённые не меняются
+    """
+    from services.db import cashback_crud, user_cashback_crud
+
+    cashback_ids: Dict[str, int] = await cashback_crud.bulk_get_or_create(
+        db=db,
+        product_types=[
+            cashback.product_type
+            for cashbacks in offers.values()
+            for cashback in cashbacks
+        ]
+    )
+    await user_cashback_crud.bulk_create(
+        db=db,
+        objs_in=[
+            schemas.UserCashbackCreate(
+                account_id=account_id,
+                cashback_id=cashback_ids[cashback.product_type],
+                month=month,
+                status=False,
+                value=cashback.value
+            )
+            for account_id, cashbacks in offers.items()
+            for cashback in cashbacks
+        ]
+    )
@@ -0,0 +1,222 @@
+"""
+    Предрасчёт кэшбеков на выбор для всех счетов, где клиент сам
+    выбирает категории (can_choose_cashback).
+
+    Кэшбеки сохраняются как UserCashback(status=False), и
+    /get_cashback_for_choose/ просто читает их из базы. Прогноз строится
+    по сохранённым помесячным тратам, банк при этом не опрашивается.
+    Счета, у которых кэшбеки на месяц уже есть, пропускаются, поэтому
+    прерванный запуск можно просто повторить.
+
+    Запуск из папки backend:
+        python -m services.cashback_precompute
+        python -m services.cashback_precompute --month 2024-05 --batch-size 500
+"""
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import List
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import app_settings
+from db.db import async_session, engine
+from models import base as models
+from schemas import base as schemas
+from services.cashback import history_start, save_month_offers
+from services.db import account_crud, spending_crud, user_cashback_crud
+from services.forecasts import forecast_cache
+from services.spendings import spendings_dataframe
+
+logger = logging.getLogger(__name__)
+
+# ключ pg_advisory_lock: при нескольких воркерах gunicorn
+# предрасчёт выполняет только один процесс
+PRECOMPUTE_LOCK_KEY = 20230012
+
+
+def month_start(day: date) -> date:
+    return date(year=day.year, month=day.month, day=1)
+
+
+def next_month(today: date | None = None) -> date:
+    return month_start(today or date.today()) + relativedelta(months=1)
+
+
+async def precompute_batch(
+    db: AsyncSession,
+    accounts: List[models.Account],
+    month: date,
+    progress: schemas.CashbackPrecomputeProgress
+) -> None:
+    account_ids = [account.id for account in accounts]
+    ready = await user_cashback_crud.get_accounts_with_offers(
+        db=db, account_ids=account_ids, month=month
+    )
+    progress.skipped += len(ready)
+    account_ids = [
+        account_id for account_id in account_ids if account_id not in ready
+    ]
+    if not account_ids:
+        return
+
+    spendings: List[models.AccountMonthSpending] = await spending_crud \
+        .get_accounts_spendings(
+            db=db, account_ids=account_ids, start_month=history_start(month)
+        )
+    account_spendings = defaultdict(list)
+    for spending in spendings:
+        account_spendings[spending.account_id].append(spending)
+
+    try:
+        cashbacks = await forecast_cache.get_cashbacks(
+            month=month,
+            spendings={
+                account_id: spendings_dataframe(account_spendings[account_id])
+                for account_id in account_ids
+            }
+        )
+    except Exception:
+        logger.exception('Cashback forecast failed for accounts %s', account_ids)
+        progress.failed += len(account_ids)
+        return
+
+    await save_month_offers(
+        db=db,
+        month=month,
+        offers=cashbacks
+    )
+    progress.computed += len(account_ids)
+
+
+async def precompute_cashbacks(
+    month: date | None = None,
+    batch_size: int = app_settings.cashback_precompute_batch_size
+) -> schemas.CashbackPrecomputeProgress:
+    """
+        Считает и сохраняет кэшбеки на month (по умолчанию следующий
+        месяц) для всех счетов с выбором кэшбека
+    """
+    month = month_start(month) if month else next_month()
+    progress = schemas.CashbackPrecomputeProgress(month=month)
+
+    async with engine.connect() as lock_connection:
+        locked = await lock_connection.scalar(
+            select(func.pg_try_advisory_lock(PRECOMPUTE_LOCK_KEY))
+        )
+        if not locked:
+            logger.info('Cashback precompute is already running, skipping')
+            return progress
+
+        try:
+            async with async_session() as db:
+                progress.total = await account_crud \
+                    .count_choose_cashback_accounts(db=db)
+                logger.info(
+                    'Cashback precompute for %s: %s accounts',
+                    month, progress.total
+                )
+                last_id = 0
+                while True:
+                    accounts: List[models.Account] = await account_crud \
+                        .get_choose_cashback_accounts(
+                            db=db, after_id=last_id, limit=batch_size
+                        )
+                    if not accounts:
+                        break
+                    last_id = accounts[-1].id
+                    await precompute_batch(
+                        db=db, accounts=accounts, month=month,
+                        progress=progress
+                    )
+                    logger.info(
+                        'Cashback precompute for %s: %s/%s accounts '
+                        '(computed %s, skipped %s, failed %s)',
+                        month, progress.processed, progress.total,
+                        progress.computed, progress.skipped, progress.failed
+                    )
+        finally:
+            await lock_connection.scalar(
+                select(func.pg_advisory_unlock(PRECOMPUTE_LOCK_KEY))
+            )
+
+    return progress
+
+
+class CashbackPrecomputeScheduler:
+    """
+        Ежедневно в hour часов считает кэшбеки на текущий месяц (для
+        счетов, у которых их ещё нет) и на следующий
+    """
+
+    def __init__(self, hour: int = 3, batch_size: int = 200):
+        self.hour = hour
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def seconds_until_run(self, now: datetime | None = None) -> float:
+        now = now or datetime.now()
+        run_at = now.replace(hour=self.hour, minute=0, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        return (run_at - now).total_seconds()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.seconds_until_run())
+            today = date.today()
+            for month in (month_start(today), next_month(today)):
+                try:
+                    await precompute_cashbacks(
+                        month=month, batch_size=self.batch_size
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception('Cashback precompute for %s failed', month)
+
+
+cashback_precompute_scheduler = CashbackPrecomputeScheduler(
+    hour=app_settings.cashback_precompute_hour,
+    batch_size=app_settings.cashback_precompute_batch_size
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--month', type=lambda value: datetime.strptime(value, '%Y-%m').date(),
+        help='месяц в формате YYYY-MM, по умолчанию следующий'
+    )
+    parser.add_argument(
+        '--batch-size', type=int,
+        default=app_settings.cashback_precompute_batch_size
+    )
+    args = parser.parse_args()
+
+    progress = asyncio.run(
+        precompute_cashbacks(month=args.month, batch_size=args.batch_size)
+    )
+    print(progress.json())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import asyncio
+from typing import AsyncIterator, Dict, List
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cashbacker.casbacker import CATEGORIES, Categorizer
+from core.cache import LRUCache
+from core.config import app_settings
+from schemas import base as schemas
+from services.db import category_cache_crud
+from services.inference import category_scores
+
+
+def normalize_name(name: str) -> str:
+    return ' '.join(name.lower().split())[:300]
+
+
+class CachedCategorizer:
+    """
+        Двухуровневый кэш перед категоризатором:
+        in-process LRU -> таблица category_cache -> модель.
+        В модель попадают только промахи обоих уровней.
+    """
+
+    def __init__(self, model_version: str, maxsize: int):
+        self.model_version = model_version
+        self.memory = LRUCache(maxsize=maxsize)
+        self.db_hits = 0
+        self.misses = 0
+
+    async def get_topics_name(
+        self, db: AsyncSession, product_names: List[str], commit: bool = True
+    ) -> List[str]:
+        """
+            commit=False - новые записи кэша сохранятся вместе с
+            транзакцией вызывающего
+        """
+        # нормализованное имя -> исходное название первого вхождения
+        names: Dict[str, str] = {}
+        for product_name in product_names:
+            names.setdefault(normalize_name(product_name), product_name)
+
+        topics: Dict[str, str] = {}
+        for name in names:
+            topic = self.memory.get(name)
+            if topic is not None:
+                topics[name] = topic
+
+        db_names = [name for name in names if name not in topics]
+        if db_names:
+            cached = await category_cache_crud.bulk_get(
+                db=db, names=db_names, model_version=self.model_version
+            )
+            for row in cached:
+                topics[row.name] = row.category
+                self.memory.set(row.name, row.category)
+            self.db_hits += len(cached)
+
+        missed = [name for name in names if name not in topics]
+        if missed:
+            self.misses += len(missed)
+            scores = await category_scores(
+                [names[name] for name in missed]
+            )
+            predicted = Categorizer.topics_from_scores(np.stack(scores))
+            for name, topic in zip(missed, predicted):
+                topics[name] = topic
+                self.memory.set(name, topic)
+            await category_cache_crud.bulk_create(
+                db=db,
+                objs_in=[
+                    schemas.CategoryCacheCreate(
+                        name=name,
+                        model_version=self.model_version,
+                        category=topics[name]
+                    )
+                    for name in missed
+                ],
+                commit=commit
+            )
+
+        return [
+            topics[normalize_name(product_name)]
+            for product_name in product_names
+        ]
+
+    def stats(self) -> schemas.CategoryCacheStats:
+        memory_hits = self.memory.hits
+        total = memory_hits + self.db_hits + self.misses
+        return schemas.CategoryCacheStats(
+            memory_hits=memory_hits,
+            db_hits=self.db_hits,
+            misses=self.misses,
+            hit_rate=(memory_hits + self.db_hits) / total if total else 0.0,
+            memory_size=len(self.memory)
+        )
+
+
+def top_k_scores(
+    scores: np.ndarray, top_k: int
+) -> List[schemas.CategoryScore]:
+    indexes = np.argsort(scores)[::-1][:top_k]
+    return [
+        schemas.CategoryScore(
+            category=CATEGORIES[index],
+            score=float(scores[index])
+        )
+        for index in indexes
+    ]
+
+
+async def iter_categories_with_scores(
+    product_names: List[str], top_k: int
+) -> AsyncIterator[List[schemas.CategoryWithScores]]:
+    """
+        Категории с top-k оценками для списка названий.
+        Все части списка сразу ставятся в очередь инференса и
+        считаются одним проходом, а результаты отдаются по частям
+        в исходном порядке, как только готова очередная часть.
+    """
+    chunk_size = app_settings.categorizer_batch_size
+    chunks = [
+        product_names[index:index + chunk_size]
+        for index in range(0, len(product_names), chunk_size)
+    ]
+    tasks = [
+        asyncio.ensure_future(category_scores(chunk))
+        for chunk in chunks
+    ]
+    try:
+        for chunk, task in zip(chunks, tasks):
+            scores = await task
+            yield [
+                schemas.CategoryWithScores(
+                    name=name,
+                    category=CATEGORIES[int(np.argmax(row))],
+                    scores=top_k_scores(row, top_k)
+                )
+                for name, row in zip(chunk, scores)
+            ]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+cached_categorizer = CachedCategorizer(
+    model_version=app_settings.categorizer_model_version,
+    maxsize=app_settings.category_cache_size
+)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import List
+
+from core.config import app_settings
+from db.db import async_session
+from models import base as models
+from schemas import base as schemas
+from services.categories import cached_categorizer
+from services.db import transaction_crud
+from services.forecasts import forecast_cache
+
+logger = logging.getLogger(__name__)
+
+
+class CategorizationWorker:
+    """
+        Фоновая категоризация транзакций, сохранённых с category = NULL.
+
+        Забирает ожидающие транзакции большими батчами, определяет
+        категории через кэш и очередь инференса и обновляет строки
+        одним запросом. Несколько воркеров (gunicorn) не мешают друг
+        другу: строки выбираются с FOR UPDATE SKIP LOCKED.
+    """
+
+    def __init__(self, batch_size: int = 1000, poll_interval: float = 5):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._event: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def notify(self) -> None:
+        """
+            Разбудить воркер после сохранения новых транзакций
+        """
+        if self._event:
+            self._event.set()
+
+    async def run_once(self) -> int:
+        async with async_session() as db:
+            transactions: List[models.Transaction] = await transaction_crud \
+                .get_pending(db=db, limit=self.batch_size)
+            if not transactions:
+                return 0
+
+            # у кэша категорий свои коммиты, поэтому отдельная сессия,
+            # чтобы не снять блокировку с выбранных строк
+            async with async_session() as cache_db:
+                categories = await cached_categorizer.get_topics_name(
+                    db=cache_db,
+                    product_names=[
+                        transaction.name for transaction in transactions
+                    ]
+                )
+
+            await transaction_crud.bulk_update_categories(
+                db=db,
+                categories=[
+                    schemas.TransactionCategory(
+                        id=transaction.id, category=category
+                    )
+                    for transaction, category in zip(transactions, categories)
+                ]
+            )
+        for account_id in {transaction.account_id for transaction in transactions}:
+            forecast_cache.invalidate(account_id)
+        return len(transactions)
+
+    async def _run(self) -> None:
+        while True:
+            self._event.clear()
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Transactions categorization failed')
+                processed = 0
+
+            if processed:
+                logger.info('Categorized %s transactions', processed)
+            # полный батч - скорее всего есть ещё, продолжаем сразу
+            if processed == self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(
+                    self._event.wait(), timeout=self.poll_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+
+
+categorization_worker = CategorizationWorker(
+    batch_size=app_settings.categorization_batch_size,
+    poll_interval=app_settings.categorization_poll_interval
+)
@@ -1,9 +1,11 @@
-from datetime import date, datetime
-from typing import Generic, List, Type, TypeVar
+from datetime import date, datetime, timedelta
+from typing import Dict, Generic, List, Set, Type, TypeVar
 
 from dateutil import relativedelta
 from pydantic import BaseModel
-from sqlalchemy import delete, select
+from sqlalchemy import (Date, bindparam, delete, func, literal_column,
+                        select, update)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError, MultipleResultsFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -12,7 +14,11 @@ from db.db import Base
 from exceptions import db as exceptions
 from models import base as models
 from schemas import base as schemas
-from .cashback import can_choose_cashback
+from .cashback import CHOOSE_CASHBACK_BANKS, can_choose_cashback
+from .spendings import aggregate_spendings
+
+# строк в одном INSERT ... VALUES (лимит параметров asyncpg - 32767)
+INSERT_CHUNK_SIZE = 1000
 
 
 class Repository:
@@ -155,6 +161,24 @@ class RepositoryUser(RepositoryDB[models.User, schemas.User, schemas.User]):
 
         return user
 
+    async def touch(
+        self,
+        db: AsyncSession,
+        user: models.User,
+        now: datetime,
+        min_interval: timedelta
+    ) -> None:
+        """
+            Отметка активности пользователя; пишется не чаще min_interval
+        """
+        if user.last_active_at and now - user.last_active_at < min_interval:
+            return
+        statement = update(self._model) \
+            .where(self._model.id == user.id) \
+            .values(last_active_at=now)
+        await db.execute(statement)
+        await db.commit()
+
 
 class RepositoryAccount(RepositoryDB[models.Account, schemas.AccountCreate, schemas.AccountUpdate]):
     async def get_user_accounts(
@@ -246,7 +270,7 @@ class RepositoryAccount(RepositoryDB[models.Account, schemas.AccountCreate, sche
                 account_number=account.number,
                 bank=account.bank,
                 transactions=[
-                    schemas.Transaction.from_orm(transaction)
+                    schemas.TransactionInfo.from_orm(transaction)
                     for transaction in account_transactions
                 ]
             )
@@ -255,8 +279,124 @@ class RepositoryAccount(RepositoryDB[models.Account, schemas.AccountCreate, sche
         return result
 
 
+    async def bulk_upsert(
+        self,
+        db: AsyncSession,
+        objs_in: List[schemas.AccountCreate]
+    ) -> Dict[str, int]:
+        """
+            id счетов по номеру, одним INSERT ... ON CONFLICT. Без commit:
+            вызывается внутри общей транзакции синхронизации
+        """
+        if not objs_in:
+            return {}
+        statement = insert(self._model) \
+            .values([obj.dict() for obj in objs_in])
+        statement = statement \
+            .on_conflict_do_update(
+                index_elements=['number'],
+                set_={
+                    'bank': statement.excluded.bank,
+                    'user_id': statement.excluded.user_id
+                }
+            ) \
+            .returning(self._model.number, self._model.id)
+        results = await db.execute(statement)
+        return dict(results.all())
+
+    async def get_stale_accounts(
+        self,
+        db: AsyncSession,
+        now: datetime,
+        synced_before: datetime,
+        active_since: datetime,
+        limit: int
+    ) -> List[int]:
+        """
+            id счетов пользователей, активных после active_since, которые
+            не синхронизировались после synced_before. Счета, у которых
+            после неудачной синхронизации не истекла пауза (sync_retry_at),
+            пропускаются. Сначала счета недавно активных пользователей,
+            среди них - самые устаревшие
+        """
+        statement = select(self._model.id) \
+            .join(models.User, models.User.id == self._model.user_id) \
+            .filter(models.User.last_active_at >= active_since) \
+            .filter(
+                (self._model.transations_update_time == None)
+                | (self._model.transations_update_time < synced_before)
+            ) \
+            .filter(
+                (self._model.sync_retry_at == None)
+                | (self._model.sync_retry_at <= now)
+            ) \
+            .order_by(
+                models.User.last_active_at.desc(),
+                self._model.transations_update_time.asc().nulls_first()
+            ) \
+            .limit(limit)
+        results = await db.execute(statement=statement)
+        return results.scalars().all()
+
+    async def record_sync_failure(
+        self,
+        db: AsyncSession,
+        account_id: int,
+        failures: int,
+        retry_at: datetime
+    ) -> None:
+        """
+            Неудачная синхронизация: счёт не берётся в работу до retry_at
+        """
+        statement = update(self._model) \
+            .where(self._model.id == account_id) \
+            .values(sync_failures=failures, sync_retry_at=retry_at)
+        await db.execute(statement)
+        await db.commit()
+
+    async def get_choose_cashback_accounts(
+        self,
+        db: AsyncSession,
+        after_id: int,
+        limit: int
+    ) -> List[models.Account]:
+        """
+            Счета, где клиент выбирает кэшбек, по возрастанию id
+            начиная после after_id
+        """
+        statement = select(self._model) \
+            .filter(self._model.bank.in_(CHOOSE_CASHBACK_BANKS)) \
+            .filter(self._model.id > after_id) \
+            .order_by(self._model.id) \
+            .limit(limit)
+        results = await db.execute(statement=statement)
+        return results.scalars().all()
+
+    async def count_choose_cashback_accounts(self, db: AsyncSession) -> int:
+        statement = select(func.count(self._model.id)) \
+            .filter(self._model.bank.in_(CHOOSE_CASHBACK_BANKS))
+        results = await db.execute(statement=statement)
+        return results.scalar_one()
+
+
 class RepositoryCard(RepositoryDB[models.Card, schemas.CardCreate, schemas.CardCreate]):
-    pass
+    async def bulk_upsert(
+        self,
+        db: AsyncSession,
+        objs_in: List[schemas.CardCreate]
+    ) -> None:
+        """
+            Без commit, см. RepositoryAccount.bulk_upsert
+        """
+        if not objs_in:
+            return
+        statement = insert(self._model) \
+            .values([obj.dict() for obj in objs_in])
+        statement = statement.on_conflict_do_update(
+            index_elements=['card_number'],
+            set_={'account_id': statement.excluded.account_id}
+        )
+        await db.execute(statement)
 
 
 class RepositoryCashback(
@@ -277,6 +417,29 @@ class RepositoryCashback(
         results = await db.execute(statement=statement)
         return results.scalars().all()
 
+    async def bulk_get_or_create(
+        self, db: AsyncSession, product_types: List[str], commit: bool = True
+    ) -> Dict[str, int]:
+        """
+            id кэшбеков по product_type, недостающие создаются
+        """
+        product_types = sorted(set(product_types))
+        if not product_types:
+            return {}
+        statement = insert(self._model) \
+            .values([
+                {'product_type': product_type}
+                for product_type in product_types
+            ]) \
+            .on_conflict_do_nothing(index_elements=['product_type'])
+        await db.execute(statement)
+        statement = select(self._model.product_type, self._model.id) \
+            .filter(self._model.product_type.in_(product_types))
+        results = dict((await db.execute(statement=statement)).all())
+        if commit:
+            await db.commit()
+        return results
+
 
 class RepositoryUserCashback(
     RepositoryDB[models.UserCashback,
@@ -296,11 +459,96 @@ class RepositoryUserCashback(
         lst = results.scalars().all()
         return lst
 
+    async def bulk_create(
+        self,
+        db: AsyncSession,
+        objs_in: List[schemas.UserCashbackCreate]
+    ) -> None:
+        if not objs_in:
+            return
+        statement = insert(self._model) \
+            .values([obj.dict() for obj in objs_in]) \
+            .on_conflict_do_nothing(
+                index_elements=['account_id', 'cashback_id', 'month']
+            )
+        await db.execute(statement)
+        await db.commit()
+
+    async def bulk_upsert(
+        self,
+        db: AsyncSession,
+        objs_in: List[schemas.UserCashbackCreate]
+    ) -> None:
+        """
+            Кэшбеки, которые сообщил банк: значение и статус берутся из
+            objs_in. Без commit, см. RepositoryAccount.bulk_upsert
+        """
+        if not objs_in:
+            return
+        statement = insert(self._model) \
+            .values([obj.dict() for obj in objs_in])
+        statement = statement.on_conflict_do_update(
+            index_elements=['account_id', 'cashback_id', 'month'],
+            set_={
+                'value': statement.excluded.value,
+                'status': statement.excluded.status
+            }
+        )
+        await db.execute(statement)
+
+    async def get_accounts_with_offers(
+        self,
+        db: AsyncSession,
+        account_ids: List[int],
+        month: date
+    ) -> Set[int]:
+        """
+            Счета из account_ids, у которых уже есть кэшбеки на month
+        """
+        statement = select(self._model.account_id) \
+            .filter(self._model.account_id.in_(account_ids)) \
+            .filter(self._model.month == month) \
+            .distinct()
+        results = await db.execute(statement=statement)
+        return set(results.scalars().all())
+
 
 class RepositoryTransaction(
     RepositoryDB[models.Transaction,
                  schemas.TransactionCreate, schemas.TransactionCreate]
 ):
+    async def bulk_create(
+        self,
+        db: AsyncSession,
+        objs_in: List[schemas.TransactionCreate]
+    ) -> int:
+        """
+            Сохраняет транзакции (уже сохранённые bank_id пропускаются)
+            и в той же транзакции БД прибавляет их к помесячным агрегатам.
+            Возвращает число новых транзакций
+        """
+        table = self._model.__table__
+        inserted = []
+        for start in range(0, len(objs_in), INSERT_CHUNK_SIZE):
+            statement = insert(table) \
+                .values([
+                    obj.dict()
+                    for obj in objs_in[start:start + INSERT_CHUNK_SIZE]
+                ]) \
+                .on_conflict_do_nothing(index_elements=['bank_id']) \
+                .returning(
+                    table.c.account_id, table.c.time,
+                    table.c.category, table.c.value
+                )
+            results = await db.execute(statement)
+            inserted += results.all()
+
+        await spending_crud.add_spendings(
+            db=db, spendings=aggregate_spendings(inserted)
+        )
+        await db.commit()
+        return len(inserted)
+
     async def get_user_transactions_from(
         self,
         db: AsyncSession,
@@ -314,6 +562,69 @@ class RepositoryTransaction(
         lst = results.scalars().all()
         return lst
 
+    async def get_pending(
+        self,
+        db: AsyncSession,
+        limit: int
+    ) -> List[models.Transaction]:
+        """
+            Транзакции без категории. Строки блокируются до конца
+            транзакции, занятые другим воркером пропускаются
+        """
+        statement = select(self._model) \
+            .filter(self._model.category.is_(None)) \
+            .order_by(self._model.id) \
+            .limit(limit) \
+            .with_for_update(skip_locked=True)
+        results = await db.execute(statement=statement)
+        return results.scalars().all()
+
+    async def bulk_update_categories(
+        self,
+        db: AsyncSession,
+        categories: List[schemas.TransactionCategory]
+    ) -> None:
+        if not categories:
+            return
+        table = self._model.__table__
+        # в агрегаты попадают только строки, у которых ещё не было категории
+        statement = select(
+            table.c.id, table.c.account_id, table.c.time, table.c.value
+        ) \
+            .filter(table.c.id.in_([item.id for item in categories])) \
+            .filter(table.c.category.is_(None))
+        results = await db.execute(statement)
+        pending = {row.id: row for row in results.all()}
+        categories = [item for item in categories if item.id in pending]
+        if not categories:
+            await db.commit()
+            return
+
+        statement = update(table) \
+            .where(table.c.id == bindparam('transaction_id')) \
+            .values(category=bindparam('category'))
+        await db.execute(
+            statement,
+            [
+                {
+                    'transaction_id': item.id,
+                    'category': item.category
+                }
+                for item in categories
+            ]
+        )
+        await spending_crud.add_spendings(
+            db=db,
+            spendings=aggregate_spendings(
+                (
+                    pending[item.id].account_id, pending[item.id].time,
+                    item.category, pending[item.id].value
+                )
+                for item in categories
+            )
+        )
+        await db.commit()
+
 
 class RepositoryCategoryLimit(
     RepositoryDB[models.CategotyLimit,
@@ -348,6 +659,209 @@ class RepositoryCategoryLimit(
         return obj
 
 
+class RepositoryCategoryCache(
+    RepositoryDB[models.CategoryCache,
+                 schemas.CategoryCacheCreate, schemas.CategoryCacheCreate]
+):
+    async def bulk_get(
+        self, db: AsyncSession, names: List[str], model_version: str
+    ) -> List[models.CategoryCache]:
+        statement = select(self._model) \
+            .filter(self._model.name.in_(names)) \
+            .filter(self._model.model_version == model_version)
+        results = await db.execute(statement=statement)
+        return results.scalars().all()
+
+    async def bulk_create(
+        self,
+        db: AsyncSession,
+        objs_in: List[schemas.CategoryCacheCreate],
+        commit: bool = True
+    ) -> None:
+        if not objs_in:
+            return
+        statement = insert(self._model) \
+            .values([obj.dict() for obj in objs_in]) \
+            .on_conflict_do_nothing(index_elements=['name', 'model_version'])
+        await db.execute(statement)
+        if commit:
+            await db.commit()
+
+
+class RepositoryAccountMonthSpending(
+    RepositoryDB[models.AccountMonthSpending,
+                 schemas.AccountMonthSpendingCreate,
+                 schemas.AccountMonthSpendingCreate]
+):
+    async def add_spendings(
+        self,
+        db: AsyncSession,
+        spendings: List[schemas.AccountMonthSpendingCreate]
+    ) -> None:
+        """
+            Прибавляет суммы и количества к агрегатам. Без commit:
+            выполняется в транзакции, сохраняющей сами транзакции
+        """
+        table = self._model.__table__
+        for start in range(0, len(spendings), INSERT_CHUNK_SIZE):
+            statement = insert(table).values([
+                spending.dict()
+                for spending in spendings[start:start + INSERT_CHUNK_SIZE]
+            ])
+            statement = statement.on_conflict_do_update(
+                index_elements=['account_id', 'month', 'category'],
+                set_={
+                    'total': table.c.total + statement.excluded.total,
+                    'count': table.c.count + statement.excluded.count
+                }
+            )
+            await db.execute(statement)
+
+    async def get_accounts_spendings(
+        self,
+        db: AsyncSession,
+        account_ids: List[int],
+        start_month: date
+    ) -> List[models.AccountMonthSpending]:
+        statement = select(self._model) \
+            .filter(self._model.account_id.in_(account_ids)) \
+            .filter(self._model.month >= start_month) \
+            .order_by(self._model.account_id, self._model.month)
+        results = await db.execute(statement=statement)
+        return results.scalars().all()
+
+    async def get_user_month_spendings(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        month: date
+    ) -> Dict[str, int]:
+        """
+            Траты пользователя за месяц по всем счетам: {категория: сумма}
+        """
+        statement = select(self._model.category, func.sum(self._model.total)) \
+            .join(models.Account, models.Account.id == self._model.account_id) \
+            .filter(models.Account.user_id == user_id) \
+            .filter(self._model.month == month) \
+            .group_by(self._model.category)
+        results = await db.execute(statement=statement)
+        return {category: int(total) for category, total in results.all()}
+
+    async def rebuild(
+        self,
+        db: AsyncSession,
+        account_ids: List[int] | None = None
+    ) -> int:
+        """
+            Пересчитывает агрегаты по таблице transactions
+            (для всех счетов или только для account_ids)
+        """
+        transactions = models.Transaction.__table__
+        # литералы, а не параметры: иначе выражение в SELECT и GROUP BY
+        # для PostgreSQL разное
+        month = func.date_trunc(
+            literal_column("'month'"),
+            func.timezone(literal_column("'UTC'"), transactions.c.time)
+        ).cast(Date)
+        source = select(
+            transactions.c.account_id,
+            month,
+            transactions.c.category,
+            func.sum(transactions.c.value),
+            func.count()
+        ) \
+            .filter(transactions.c.category.is_not(None)) \
+            .filter(transactions.c.time.is_not(None)) \
+            .group_by(transactions.c.account_id, month, transactions.c.category)
+        clear = delete(self._model)
+        if account_ids is not None:
+            source = source.filter(transactions.c.account_id.in_(account_ids))
+            clear = clear.where(self._model.account_id.in_(account_ids))
+
+        await db.execute(clear)
+        results = await db.execute(
+            insert(self._model).from_select(
+                ['account_id', 'month', 'category', 'total', 'count'], source
+            )
+        )
+        await db.commit()
+        return results.rowcount
+
+
+class RepositoryTerminalSnapshot(
+    RepositoryDB[models.TerminalSnapshot,
+                 schemas.TerminalSnapshot, schemas.TerminalSnapshot]
+):
+    async def get_by_gosuslugi_id(
+        self, db: AsyncSession, gosuslugi_id: str
+    ) -> models.TerminalSnapshot | None:
+        statement = select(self._model) \
+            .join(models.User, models.User.id == self._model.user_id) \
+            .filter(models.User.gosuslugi_id == gosuslugi_id)
+        results = await db.execute(statement=statement)
+        return results.scalar_one_or_none()
+
+    @staticmethod
+    def build_cards(
+        accounts: List[models.Account],
+        user_cashbacks: List[models.UserCashback]
+    ) -> List[schemas.CardWithCashback]:
+        """
+            Карты пользователя с выбранными (status=True) кэшбеками
+            счёта; у счёта без кэшбеков - None
+        """
+        account_cashbacks: Dict[int, List[schemas.Cashback]] = {}
+        for user_cashback in user_cashbacks:
+            account_cashbacks.setdefault(user_cashback.account_id, []).append(
+                schemas.Cashback(
+                    product_type=user_cashback.cashback.product_type,
+                    value=user_cashback.value
+                )
+            )
+        return [
+            schemas.CardWithCashback(
+                bank=account.bank,
+                last_four_digits=card.card_number[-4:],
+                cashbacks=account_cashbacks.get(account.id)
+            )
+            for account in sorted(accounts, key=lambda x: x.id)
+            for card in sorted(account.cards, key=lambda x: x.id)
+        ]
+
+    async def rebuild(
+        self, db: AsyncSession, user_id: int, month: date, commit: bool = True
+    ) -> List[schemas.CardWithCashback]:
+        statement = select(models.Account) \
+            .filter(models.Account.user_id == user_id) \
+            .options(selectinload(models.Account.cards))
+        accounts = (await db.execute(statement=statement)).scalars().all()
+
+        statement = select(models.UserCashback) \
+            .filter(
+                models.UserCashback.account_id.in_(
+                    [account.id for account in accounts]
+                ),
+                models.UserCashback.month == month,
+                models.UserCashback.status == True
+            ) \
+            .options(selectinload(models.UserCashback.cashback))
+        user_cashbacks = (await db.execute(statement=statement)).scalars().all()
+
+        cards = self.build_cards(accounts, user_cashbacks)
+        values = {
+            'month': month,
+            'cards': [card.dict() for card in cards],
+            'updated_at': func.now()
+        }
+        statement = insert(self._model) \
+            .values(user_id=user_id, **values) \
+            .on_conflict_do_update(index_elements=['user_id'], set_=values)
+        await db.execute(statement)
+        if commit:
+            await db.commit()
+        return cards
+
+
 user_crud = RepositoryUser(models.User)
 account_crud = RepositoryAccount(models.Account)
 card_crud = RepositoryCard(models.Card)
@@ -355,3 +869,6 @@ cashback_crud = RepositoryCashback(models.Cashback)
 user_cashback_crud = RepositoryUserCashback(models.UserCashback)
 transaction_crud = RepositoryTransaction(models.Transaction)
 category_limit_crud = RepositoryCategoryLimit(models.CategotyLimit)
+category_cache_crud = RepositoryCategoryCache(models.CategoryCache)
+spending_crud = RepositoryAccountMonthSpending(models.AccountMonthSpending)
+terminal_snapshot_crud = RepositoryTerminalSnapshot(models.TerminalSnapshot)
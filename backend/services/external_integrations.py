@@ -1,23 +1,31 @@
 import asyncio
 import json
+import logging
 import os
 from datetime import date, datetime, timedelta, timezone
-from typing import List
+from typing import Dict, List
 
 import aiohttp
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from cashbacker.casbacker import categorizer, cashbacker
-from core.config import BASE_DIR
-from .db import (account_crud, card_crud, cashback_crud, transaction_crud,
-                 user_cashback_crud)
+from core.config import BASE_DIR, app_settings
+from exceptions.api import UpstreamUnavailableException
+from .categories import cached_categorizer
+from .categorization_worker import categorization_worker
+from .db import (account_crud, card_crud, cashback_crud,
+                 terminal_snapshot_crud, transaction_crud, user_cashback_crud)
+from .forecasts import forecast_cache
+from .http_client import BANK, EBS, GOSUSLUGI, NSPK
+from .resilience import resilient_client
 from models import base as models
 from schemas import base as schemas
 
 
 load_dotenv(os.path.join(BASE_DIR, ".env"))
 
+logger = logging.getLogger(__name__)
+
 
 async def authenticate_user(
     username: str,
@@ -34,13 +42,12 @@ async def authenticate_user(
         'password': password
     }
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=data) as response:
-            if response.status == 200:
-                user_dict = json.loads(await response.text())
-                user_dict['gosuslugi_id'] = user_dict.get('id')
+    body = await resilient_client.fetch(GOSUSLUGI, 'POST', url, json=data)
+    if body is not None:
+        user_dict = json.loads(body)
+        user_dict['gosuslugi_id'] = user_dict.get('id')
 
-                return schemas.User(**user_dict)
+        return schemas.User(**user_dict)
     
     return None
 
@@ -55,13 +62,12 @@ async def get_user_by_photo(photo: bytes, photo_name: str)-> schemas.User:
     formdata = aiohttp.FormData()
     formdata.add_field('file_in', photo, filename=photo_name)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, data=formdata) as response:
-            if response.status == 200:
-                user_dict = json.loads(await response.text())
-                user_dict['gosuslugi_id'] = user_dict.get('id')
+    body = await resilient_client.fetch(EBS, 'POST', url, data=formdata)
+    if body is not None:
+        user_dict = json.loads(body)
+        user_dict['gosuslugi_id'] = user_dict.get('id')
 
-                return schemas.User(**user_dict)
+        return schemas.User(**user_dict)
     
     return None
 
@@ -75,14 +81,14 @@ async def get_accounts(gosuslugi_id: str) -> List[schemas.RawAccount] | None:
     url = os.getenv('GET_USER_ACOOUNTS_FROM_NSPK_LINK')
     url = f'{url}?user_id={gosuslugi_id}'
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                accounts = json.loads(await response.text())
-                return [
-                    schemas.RawAccount(**account)
-                    for account in accounts
-                ]
+    body = await resilient_client.fetch(
+        NSPK, 'GET', url, idempotent=True, hedge=True
+    )
+    if body is not None:
+        return [
+            schemas.RawAccount(**account)
+            for account in json.loads(body)
+        ]
     
     return None
 
@@ -98,70 +104,104 @@ async def get_account_cashbacks(
         'month': month.strftime('%Y-%m-%d')
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=data) as response:
-            if response.status == 200:
-                cashbacks_dict = json.loads(await response.text())
-                return schemas.RawAccountCashbacks(**cashbacks_dict)
+    # запрос только читает данные, его можно повторять
+    body = await resilient_client.fetch(
+        BANK, 'POST', url, json=data, idempotent=True, hedge=True
+    )
+    if body is not None:
+        return schemas.RawAccountCashbacks(**json.loads(body))
 
     return None
 
 
-async def create_or_update_account_in_db(
+async def save_accounts_sync(
     db: AsyncSession,
-    account: schemas.RawAccount,
     user_id: int,
-    month: date
-):  
-    account_in_db = await account_crud.get_or_create(
-        db=db,
-        obj_in=schemas.AccountCreate(
-            number=account.number,
-            bank=account.bank,
-            user_id=user_id
-        )
-    )
-    account_id: int = account_in_db.id
-    for card in account.cards:
-        await card_crud.get_or_create(
-            db=db,
-            obj_in=schemas.CardCreate.create_from_raw_card(
-                raw_card=card, account_id=account_id
+    month: date,
+    accounts: List[schemas.RawAccount],
+    cashbacks: Dict[str, List[schemas.RawCashback]]
+) -> None:
+    """
+        Счета, карты и кэшбеки на месяц (cashbacks - по номеру счёта)
+        одной транзакцией. Каждая таблица пишется одним INSERT ... ON
+        CONFLICT, поэтому число запросов не зависит от числа счетов
+    """
+    try:
+        account_ids = await account_crud.bulk_upsert(db, list({
+            account.number: schemas.AccountCreate(
+                number=account.number, bank=account.bank, user_id=user_id
             )
-        )
-    
-
-    account_cashbacks_info: schemas.RawAccountCashbacks | None = None
-
-    account_cashbacks_info = await get_account_cashbacks(
-        account_number=account.number,
-        month=month
-    )
-
-    if not account_cashbacks_info:
-        return
-    
-    if account_cashbacks := account_cashbacks_info.cashbacks:
-        account_cashbacks_ids: List[int] = []
-        for cashback in account_cashbacks: 
-            cashback = await cashback_crud.get_or_create(
-                db,
-                schemas.CashbackCreate.create_from_raw_cashback(cashback)
+            for account in accounts
+        }.values()))
+        await card_crud.bulk_upsert(db, list({
+            card.card_number: schemas.CardCreate.create_from_raw_card(
+                raw_card=card, account_id=account_ids[account.number]
             )
-            account_cashbacks_ids.append(cashback.id)
-            
-        raw_user_cashbacks = zip(account_cashbacks, account_cashbacks_ids)
-        user_cashbacks_in_db: List[models.UserCashback] = [
-            await user_cashback_crud.get_or_create(
-                db, schemas.UserCashbackCreate(
-                    account_id=account_id,
-                    cashback_id=raw_user_cashback[1],
+            for account in accounts
+            for card in account.cards
+        }.values()))
+        cashback_ids = await cashback_crud.bulk_get_or_create(
+            db,
+            [
+                cashback.product_type
+                for account_cashbacks in cashbacks.values()
+                for cashback in account_cashbacks
+            ],
+            commit=False
+        )
+        user_cashbacks = {}
+        for number, account_cashbacks in cashbacks.items():
+            for cashback in account_cashbacks:
+                user_cashback = schemas.UserCashbackCreate(
+                    account_id=account_ids[number],
+                    cashback_id=cashback_ids[cashback.product_type],
                     month=month,
-                    value=raw_user_cashback[0].value,
+                    value=cashback.value,
                     status=True
                 )
-            ) for raw_user_cashback in raw_user_cashbacks
-        ]
+                key = (user_cashback.account_id, user_cashback.cashback_id)
+                user_cashbacks[key] = user_cashback
+        await user_cashback_crud.bulk_upsert(db, list(user_cashbacks.values()))
+        # карты и кэшбеки для /terminal
+        await terminal_snapshot_crud.rebuild(db, user_id, month, commit=False)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def fetch_accounts_cashbacks(
+    accounts: List[schemas.RawAccount],
+    month: date
+) -> Dict[str, List[schemas.RawCashback]]:
+    """
+        Кэшбеки всех счетов у банков одновременно, не больше
+        LOGIN_SYNC_CONCURRENCY запросов сразу
+    """
+    semaphore = asyncio.Semaphore(app_settings.login_sync_concurrency)
+
+    async def fetch(account: schemas.RawAccount) -> List[schemas.RawCashback] | None:
+        async with semaphore:
+            try:
+                account_cashbacks_info = await get_account_cashbacks(
+                    account_number=account.number,
+                    month=month
+                )
+            except UpstreamUnavailableException:
+                # банк недоступен: счёт и карты сохраняем, кэшбеки
+                # подтянутся при следующей синхронизации
+                logger.warning(
+                    'Cashbacks of account %s are unavailable', account.number
+                )
+                return None
+        return account_cashbacks_info.cashbacks if account_cashbacks_info else None
+
+    results = await asyncio.gather(*[fetch(account) for account in accounts])
+    return {
+        account.number: account_cashbacks
+        for account, account_cashbacks in zip(accounts, results)
+        if account_cashbacks
+    }
 
 
 async def create_or_update_accounts_in_db(
@@ -170,25 +210,33 @@ async def create_or_update_accounts_in_db(
     user_id: int,
     month: date
 ):
-    for account in accounts:
-        await create_or_update_account_in_db(
-            db=db,
-            account=account,
-            user_id=user_id,
-            month=month
-        )
+    # сначала все запросы к банкам, затем одна запись в базу: вход
+    # ждёт самый медленный банк, а не сумму всех
+    cashbacks = await fetch_accounts_cashbacks(accounts, month)
+    await save_accounts_sync(db, user_id, month, accounts, cashbacks)
+
+
+def is_stale(
+    last_update: datetime | None, now: datetime, freshness: timedelta
+) -> bool:
+    return last_update is None or now - last_update >= freshness
 
 
 async def update_account_transactions(
-    db: AsyncSession, account: models.Account
-) -> None:
-    # Будем обновлять не чаще чем раз в 30 минут
+    db: AsyncSession,
+    account: models.Account,
+    freshness: timedelta = timedelta(minutes=30)
+) -> bool:
+    """
+        Новые транзакции счёта из банка, если с прошлой синхронизации
+        прошло не меньше freshness. True - счёт синхронизирован
+    """
     await db.refresh(account)
     last_update: datetime | None = account.transations_update_time
-    now = datetime.now().replace(tzinfo=timezone.utc)
-    
-    if last_update and (now - last_update > timedelta(minutes=30)):
-        return
+    now = datetime.now(timezone.utc)
+
+    if not is_stale(last_update, now, freshness):
+        return False
     
     account_id = account.id
     account_number = account.number
@@ -201,61 +249,72 @@ async def update_account_transactions(
         'account_number': account_number,
         'start_datetime': last_transation_time
     }
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=data) as response:
-            if response.status == 200:
-                # обновляем время последнего обновления транзакций
-                account = await account_crud.update(
-                    db=db,
-                    obj_in=schemas.AccountUpdate(
-                        id=account_id,
-                        transations_update_time=datetime.utcnow()
-                    )
-                )
-                _dict = json.loads(await response.text())
-                # Если нет новых транзакций, то прекращаем работу функции
-                if _dict.get('transactions') == []:
-                    return
-                raw_account_transactions = schemas.RawAccountTransactions(**_dict)
-                
-                transactions_categories = await categorizer.get_topics_name(
-                    product_names=[
-                        transaction.name
-                        for transaction in raw_account_transactions.transactions
-                    ]
-                )
-                transactions_info = zip(raw_account_transactions.transactions, transactions_categories)
-                transactions = [
-                    schemas.TransactionCreate(
-                        time=transaction[0].time,
-                        bank_id=transaction[0].id,
-                        name=transaction[0].name,
-                        value=transaction[0].value,
-                        account_id=account_id,
-                        category=transaction[1]
-                    )
-                    for transaction in transactions_info
-                ]
-                if len(transactions) > 0:
-                    await transaction_crud.bulk_create(
-                        db=db, objs_in=transactions
-                    )
-
-                    last_transation_time = raw_account_transactions \
-                        .transactions[-1].time.replace(tzinfo=timezone.utc)
-                    account = await account_crud.update(
-                        db=db,
-                        obj_in=schemas.AccountUpdate(
-                            id=account_id,
-                            last_transation_time=last_transation_time
-                        )
-                    )
-
-                
-async def update_user_transactions(db: AsyncSession, user_id: int):
-    accounts: List[models.Account] = await account_crud.filter_by(
-        db=db, user_id=user_id
+    body = await resilient_client.fetch(BANK, 'POST', url, json=data, idempotent=True)
+    if body is None:
+        return False
+    _dict = json.loads(body)
+
+    # обновляем время последнего обновления транзакций и запоминаем,
+    # насколько устарели данные счёта к этой синхронизации
+    account = await account_crud.update(
+        db=db,
+        obj_in=schemas.AccountUpdate(
+            id=account_id,
+            transations_update_time=now,
+            sync_lag_seconds=(
+                int((now - last_update).total_seconds()) if last_update else None
+            ),
+            sync_failures=0
+        )
     )
-
-    for account in accounts:
-        await update_account_transactions(db=db, account=account)
+    # Если нет новых транзакций, то прекращаем работу функции
+    if _dict.get('transactions') == []:
+        return True
+    raw_account_transactions = schemas.RawAccountTransactions(**_dict)
+
+    product_names = [
+        transaction.name
+        for transaction in raw_account_transactions.transactions
+    ]
+    deferred = app_settings.transactions_categorization_mode == 'deferred'
+    if deferred:
+        # категории проставит categorization_worker
+        transactions_categories = [None] * len(product_names)
+    else:
+        # кэш категорий сохраняется вместе с транзакциями счёта
+        transactions_categories = await cached_categorizer.get_topics_name(
+            db=db,
+            product_names=product_names,
+            commit=False
+        )
+    transactions_info = zip(raw_account_transactions.transactions, transactions_categories)
+    transactions = [
+        schemas.TransactionCreate(
+            time=transaction[0].time,
+            bank_id=transaction[0].id,
+            name=transaction[0].name,
+            value=transaction[0].value,
+            account_id=account_id,
+            category=transaction[1]
+        )
+        for transaction in transactions_info
+    ]
+    if len(transactions) > 0:
+        await transaction_crud.bulk_create(
+            db=db, objs_in=transactions
+        )
+        # траты счёта изменились, старый прогноз не нужен
+        forecast_cache.invalidate(account_id)
+        if deferred:
+            categorization_worker.notify()
+
+        last_transation_time = raw_account_transactions \
+            .transactions[-1].time.replace(tzinfo=timezone.utc)
+        account = await account_crud.update(
+            db=db,
+            obj_in=schemas.AccountUpdate(
+                id=account_id,
+                last_transation_time=last_transation_time
+            )
+        )
+    return True
@@ -0,0 +1,102 @@
+import hashlib
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from cashbacker.aggregation import pad_history
+from cashbacker.casbacker import best_look_back, cashbacker
+from core.cache import LRUCache
+from core.config import app_settings
+from schemas import base as schemas
+from services.inference import cashbacks_for_matrices
+
+
+def to_cashbacks(cashbacks: pd.DataFrame) -> List[schemas.Cashback]:
+    return [
+        schemas.Cashback(
+            product_type=row['topics'],
+            value=row['percent']
+        )
+        for _, row in cashbacks.iterrows()
+    ]
+
+
+def fingerprint(history: np.ndarray) -> str:
+    """
+        Хэш помесячных трат счёта (месяцы x категории)
+    """
+    history = np.ascontiguousarray(history, dtype=np.float64)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(history.shape).encode())
+    digest.update(history.tobytes())
+    return digest.hexdigest()
+
+
+class ForecastCache:
+    """
+        Кэш прогнозов кэшбека по ключу (account_id, месяц, хэш трат,
+        версия модели). Прогноз зависит только от помесячных трат,
+        поэтому при тех же тратах модель повторно не вызывается.
+        Кэш свой у каждого процесса, запись для счёта сбрасывается
+        при загрузке его транзакций.
+    """
+
+    def __init__(self, model_version: str, maxsize: int, ttl: float):
+        self.model_version = model_version
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def key(self, account_id: int, month: date, history: np.ndarray) -> tuple:
+        return account_id, month, fingerprint(history), self.model_version
+
+    async def get_cashbacks(
+        self, month: date, spendings: Dict[int, pd.DataFrame]
+    ) -> Dict[int, List[schemas.Cashback]]:
+        """
+            Кэшбеки на month по тратам счетов {account_id: траты в
+            формате Cashbacker.cashbaks_for_user}. Промахи считаются
+            одним батчем
+        """
+        histories = {
+            account_id: cashbacker.get_history(data)
+            for account_id, data in spendings.items()
+        }
+        keys = {
+            account_id: self.key(account_id, month, history)
+            for account_id, history in histories.items()
+        }
+        cashbacks: Dict[int, List[schemas.Cashback]] = {}
+        for account_id, key in keys.items():
+            cached = self.memory.get(key)
+            if cached is not None:
+                cashbacks[account_id] = cached
+
+        missed = [account_id for account_id in keys if account_id not in cashbacks]
+        if missed:
+            forecasts = await cashbacks_for_matrices(
+                [
+                    pad_history(histories[account_id], best_look_back)
+                    for account_id in missed
+                ]
+            )
+            for account_id, forecast in zip(missed, forecasts):
+                cashbacks[account_id] = to_cashbacks(forecast)
+                self.memory.set(keys[account_id], cashbacks[account_id])
+
+        return {account_id: cashbacks[account_id] for account_id in keys}
+
+    def invalidate(self, account_id: int) -> None:
+        for key in self.memory.keys():
+            if key[0] == account_id:
+                self.memory.pop(key)
+
+    def stats(self) -> dict:
+        return self.memory.stats()
+
+
+forecast_cache = ForecastCache(
+    model_version=app_settings.cashback_model_version,
+    maxsize=app_settings.forecast_cache_size,
+    ttl=app_settings.forecast_cache_ttl
+)
@@ -1,35 +1,46 @@
 from datetime import date
-from typing import List
-from langchain.schema import HumanMessage, SystemMessage
-from langchain.chat_models.gigachat import GigaChat
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import app_settings
+from core.registry import model_registry
 from cashbacker.casbacker import CATEGORIES
-from schemas import base as schemas
-from services.db import account_crud, category_limit_crud
+from services.db import category_limit_crud, spending_crud
 
 
-chat = GigaChat(
-    credentials='MDdhZGNhNDktNTAxMC00N2YyLWEzYWUtZDc5N2I0MDViOGIzOjM4YTE3ZTM2LThkMmMtNDEzZC1hOGQ2LTYyMmRmMWFhZGVlMg==',
-    scope='GIGACHAT_API_PERS',
-    verify_ssl_certs=False,
-    max_tokens=200,
-    temperature=0.25
+def create_chat(credentials: str):
+    # langchain импортируется долго, поэтому только при первом запросе
+    from langchain.chat_models.gigachat import GigaChat
+
+    return GigaChat(
+        credentials=credentials,
+        scope='GIGACHAT_API_PERS',
+        verify_ssl_certs=False,
+        max_tokens=200,
+        temperature=0.25
+    )
+
+
+model_registry.register(
+    'gigachat',
+    lambda: create_chat(
+        'MDdhZGNhNDktNTAxMC00N2YyLWEzYWUtZDc5N2I0MDViOGIzOjM4YTE3ZTM2LThkMmMtNDEzZC1hOGQ2LTYyMmRmMWFhZGVlMg=='
+    )
 )
 
 
 class FinancialAnalyst:
     def __init__(self):
-        self.chat = GigaChat(
-            credentials=app_settings.giga_chat_token,
-            scope='GIGACHAT_API_PERS',
-            verify_ssl_certs=False,
-            max_tokens=200,
-            temperature=0.25
-        )
+        self._chat = None
+
+    @property
+    def chat(self):
+        if self._chat is None:
+            self._chat = create_chat(app_settings.giga_chat_token)
+        return self._chat
 
     async def limit_analysis(self, db: AsyncSession, user_id: int):
+        from langchain.schema import HumanMessage, SystemMessage
+
         limits_in_db = await category_limit_crud.filter_by(
             db=db, user_id=user_id
         )
@@ -42,17 +53,13 @@ class FinancialAnalyst:
         today = date.today()
         # МЕСЯЦ ЗАХОРДКОРЕН ДЛЯ ДЕМОНСТРАЦИИ!
         month = date(year=today.year, month=11, day=1)
-        accounts = await account_crud.get_user_accounts_with_transactions(
-            db=db, user_id=user_id, month=month
+        # транзакции, ещё не прошедшие категоризацию, в агрегаты не входят
+        spendings.update(
+            await spending_crud.get_user_month_spendings(
+                db=db, user_id=user_id, month=month
+            )
         )
 
-        transactions: List[schemas.Transaction] = []
-        for account in accounts:
-            transactions += account.transactions
-
-        for transaction in transactions:
-            spendings[transaction.category] += transaction.value
-
         limits_info: dict = {}
         for category, value in limits.items():
             spending = spendings.get(category)
@@ -80,27 +87,25 @@ class FinancialAnalyst:
                     'Не больше 200 слов в сумме')
 
         messages.append(HumanMessage(content=question))
-        res = chat(messages)
+        res = model_registry.get('gigachat')(messages)
         return res.content
 
     async def spendings_analysis(self, db: AsyncSession, user_id: int):
+        from langchain.schema import HumanMessage, SystemMessage
+
         today = date.today()
         # МЕСЯЦ ЗАХОРДКОРЕН ДЛЯ ДЕМОНСТРАЦИИ!
         month = date(year=today.year, month=11, day=1)
-        accounts = await account_crud.get_user_accounts_with_transactions(
+        month_spendings = await spending_crud.get_user_month_spendings(
             db=db, user_id=user_id, month=month
         )
 
-        transactions: List[schemas.Transaction] = []
-        for account in accounts:
-            transactions += account.transactions
-
-        if transactions == []:
+        if month_spendings == {}:
             return None
 
-        spendings = 'Покупка  Цена \n'
-        for transaction in transactions:
-            spendings += f'{transaction.name}   {transaction.value} рублей. \n'
+        spendings = 'Категория  Сумма \n'
+        for category, value in month_spendings.items():
+            spendings += f'{category}   {value} рублей. \n'
 
         messages = [
             SystemMessage(
@@ -109,10 +114,10 @@ class FinancialAnalyst:
         ]
 
         question = (f'Проанализируй в 3 предложениях траты за прошлый месяц'
-                    f'Дан список покупок на прошлый месяц {spendings}'
+                    f'Дан список трат по категориям на прошлый месяц {spendings}'
                     'Дай совет о тратах на текущий месяц на основании трат в прошлом')
         messages.append(HumanMessage(content=question))
-        res = chat(messages)
+        res = model_registry.get('gigachat')(messages)
 
         return res.content
     
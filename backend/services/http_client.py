@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+import aiohttp
+
+from core.config import app_settings
+
+logger = logging.getLogger(__name__)
+
+# внешние сервисы (upstream), у каждого свой лимит одновременных запросов
+GOSUSLUGI = 'gosuslugi'
+EBS = 'ebs'
+NSPK = 'nspk'
+BANK = 'bank'
+UPSTREAMS = (GOSUSLUGI, EBS, NSPK, BANK)
+
+
+class IntegrationsClient:
+    """
+        Общий HTTP-клиент внешних интеграций (services.external_integrations).
+
+        Одна aiohttp.ClientSession на процесс: пул соединений с
+        keep-alive и кэшем DNS, поэтому повторные запросы к тому же
+        сервису не платят за TCP/TLS-рукопожатие и DNS. Запросы к
+        каждому upstream ограничены своим семафором - медленный сервис
+        не занимает весь пул. Сессию открывает startup и закрывает
+        shutdown приложения; вне приложения (скрипты, тесты) она
+        создаётся при первом запросе.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 100,
+        limit_per_upstream: int = 20,
+        keepalive_timeout: float = 30,
+        dns_ttl: int = 300,
+        connect_timeout: float = 3,
+        read_timeout: float = 10
+    ):
+        self.pool_size = pool_size
+        self.limit_per_upstream = limit_per_upstream
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.upstreams = {
+            upstream: {'requests': 0, 'in_flight': 0, 'errors': 0, 'timeouts': 0}
+            for upstream in UPSTREAMS
+        }
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.dns_cache_misses += 1
+
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    async def start(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session and not self._session.closed and self._loop is loop:
+            return self._session
+        # сессия привязана к event loop (актуально для тестов)
+        self._loop = loop
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_ttl
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            trace_configs=[self._trace_config()]
+        )
+        self._semaphores = {
+            upstream: asyncio.Semaphore(self.limit_per_upstream)
+            for upstream in UPSTREAMS
+        }
+        return self._session
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @asynccontextmanager
+    async def request(
+        self, upstream: str, method: str, url: str, **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        session = await self.start()
+        stats = self.upstreams[upstream]
+        async with self._semaphores[upstream]:
+            stats['requests'] += 1
+            stats['in_flight'] += 1
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    yield response
+            except asyncio.TimeoutError:
+                stats['timeouts'] += 1
+                raise
+            except aiohttp.ClientError:
+                stats['errors'] += 1
+                raise
+            finally:
+                stats['in_flight'] -= 1
+
+    def get(self, upstream: str, url: str, **kwargs):
+        return self.request(upstream, 'GET', url, **kwargs)
+
+    def post(self, upstream: str, url: str, **kwargs):
+        return self.request(upstream, 'POST', url, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            'pool_size': self.pool_size,
+            'limit_per_upstream': self.limit_per_upstream,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'dns_cache_hits': self.dns_cache_hits,
+            'dns_cache_misses': self.dns_cache_misses,
+            'upstreams': self.upstreams
+        }
+
+
+integrations_client = IntegrationsClient(
+    pool_size=app_settings.integrations_pool_size,
+    limit_per_upstream=app_settings.integrations_limit_per_upstream,
+    keepalive_timeout=app_settings.integrations_keepalive_sec,
+    dns_ttl=app_settings.integrations_dns_ttl_sec,
+    connect_timeout=app_settings.integrations_connect_timeout,
+    read_timeout=app_settings.integrations_read_timeout
+)
@@ -0,0 +1,75 @@
+"""
+    Подготовка фото с терминала для модели антиспуфинга.
+
+    decode_into декодирует JPEG сразу в уменьшенном масштабе (draft:
+    libjpeg масштабирует на этапе IDCT в 1/2, 1/4 или 1/8), приводит к
+    IMG_SHAPE и пишет результат в масштабе mobilenet_v2 ([-1, 1]) прямо
+    в переданный float32-буфер. decode_tf - прежний путь через
+    tensorflow, оставлен для сравнения (ANTISPOOFING_DECODER=tf).
+"""
+import io
+import os
+import threading
+from typing import List
+
+import numpy as np
+from PIL import Image
+
+IMG_SHAPE = (256, 256, 3)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+_buffers = threading.local()
+
+
+def batch_buffer(size: int) -> np.ndarray:
+    """
+        Переиспользуемый буфер (size, *IMG_SHAPE) своего для каждого
+        потока. Содержимое действительно до следующего вызова в этом
+        потоке
+    """
+    buffer = getattr(_buffers, 'buffer', None)
+    if buffer is None or len(buffer) < size:
+        buffer = np.empty((size, *IMG_SHAPE), dtype=np.float32)
+        _buffers.buffer = buffer
+    return buffer[:size]
+
+
+def decode_into(image: bytes, out: np.ndarray) -> np.ndarray:
+    height, width = IMG_SHAPE[:2]
+    with Image.open(io.BytesIO(image)) as img:
+        img.draft('RGB', (width, height))
+        img = img.convert('RGB')
+        if img.size != (width, height):
+            img = img.resize((width, height), Image.BILINEAR)
+        pixels = np.asarray(img)
+    # preprocess_input mobilenet_v2: x / 127.5 - 1
+    np.multiply(pixels, np.float32(1 / 127.5), out=out, dtype=np.float32)
+    out -= 1
+    return out
+
+
+def decode_tf(image: bytes, out: np.ndarray) -> np.ndarray:
+    import tensorflow as tf
+
+    image = tf.image.decode_image(image, channels=3, expand_animations=False)
+    image = tf.image.resize(image, IMG_SHAPE[:2])
+    out[...] = tf.keras.applications.mobilenet_v2.preprocess_input(image).numpy()
+    return out
+
+
+def list_images(images_dir: str, limit: int | None = None) -> List[str]:
+    """
+        Фото из локальной папки (калибровка и сравнение моделей)
+    """
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(images_dir)
+        for name in names if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return paths[:limit]
+
+
+DECODERS = {
+    'pil': decode_into,
+    'tf': decode_tf
+}
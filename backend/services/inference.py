@@ -0,0 +1,85 @@
+"""
+    Вызовы моделей из API.
+
+    Если задан MODEL_SERVER_SOCKET, модели считаются в общем процессе
+    services.model_server, а воркер их не загружает. Без сокета, а
+    также при недоступном сервере с MODEL_SERVER_FALLBACK=True модели
+    считаются в этом процессе (режим для разработки).
+"""
+import asyncio
+import base64
+import logging
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from cashbacker.casbacker import cashbacker, categorizer_queue
+from core.config import app_settings
+from core.registry import model_registry
+from schemas import base as schemas
+from services.model_client import ModelServerUnavailable, model_client
+from services.validation import antispoofing_queue
+
+logger = logging.getLogger(__name__)
+
+
+def check_fallback(method: str, error: ModelServerUnavailable) -> None:
+    if not app_settings.model_server_fallback:
+        raise error
+    logger.warning('Model server is unavailable (%s), %s runs in-process', error, method)
+
+
+async def category_scores(product_names: List[str]) -> List[np.ndarray]:
+    """
+        Строки softmax-оценок категоризатора для каждого названия
+    """
+    if model_client.enabled:
+        try:
+            scores = await model_client.call('category_scores', names=product_names)
+            return list(np.asarray(scores, dtype=np.float32))
+        except ModelServerUnavailable as e:
+            check_fallback('category_scores', e)
+    return await categorizer_queue.submit_many(product_names)
+
+
+async def cashbacks_for_matrices(matrices: List[np.ndarray]) -> List[pd.DataFrame]:
+    """
+        Cashbacker.cashbacks_for_matrices
+    """
+    if model_client.enabled:
+        try:
+            forecasts = await model_client.call(
+                'cashbacks', matrices=[np.ascontiguousarray(matrix) for matrix in matrices]
+            )
+            return [pd.DataFrame(forecast) for forecast in forecasts]
+        except ModelServerUnavailable as e:
+            check_fallback('cashbacks', e)
+    return await asyncio.to_thread(cashbacker.cashbacks_for_matrices, matrices)
+
+
+async def antispoofing_score(image: bytes) -> float | None:
+    """
+        Оценка модели антиспуфинга для фото (больше 0.5 - живое лицо),
+        None - фото не удалось декодировать
+    """
+    if model_client.enabled:
+        try:
+            return await model_client.call(
+                'antispoofing', image=base64.b64encode(image).decode()
+            )
+        except ModelServerUnavailable as e:
+            check_fallback('antispoofing', e)
+    return await antispoofing_queue.submit(image)
+
+
+async def readiness() -> schemas.Readiness:
+    if model_client.enabled:
+        try:
+            return schemas.Readiness(**await model_client.call('status'))
+        except ModelServerUnavailable:
+            return schemas.Readiness(ready=False, models={})
+    return schemas.Readiness(
+        ready=model_registry.ready,
+        models=model_registry.status()
+    )
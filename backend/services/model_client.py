@@ -0,0 +1,127 @@
+import asyncio
+import itertools
+import logging
+from typing import Any, Dict
+
+from core.config import app_settings
+from core.ipc import MessageTooLarge, read_message, write_message
+
+logger = logging.getLogger(__name__)
+
+
+class ModelServerUnavailable(Exception):
+    """
+        Нет соединения с сервером моделей
+    """
+
+
+class ModelServerError(Exception):
+    """
+        Сервер моделей вернул ошибку
+    """
+
+
+class ModelClient:
+    """
+        Клиент services.model_server. На процесс одно соединение с
+        Unix-сокетом: запросы разных корутин идут по нему одновременно
+        и сопоставляются с ответами по id. После разрыва соединение
+        восстанавливается при следующем запросе.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._read_task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.socket_path)
+
+    async def _connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # соединение привязано к event loop (актуально для тестов)
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._writer = None
+        async with self._lock:
+            if self._writer and not self._writer.is_closing():
+                return
+            try:
+                reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.socket_path),
+                    self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                raise ModelServerUnavailable(
+                    f'{self.socket_path}: {e!r}'
+                ) from e
+            self._read_task = loop.create_task(
+                self._read_responses(reader, self._writer)
+            )
+
+    async def _read_responses(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                message = await read_message(reader)
+                future = self._pending.pop(message['id'], None)
+                if future is None or future.done():
+                    continue
+                if 'error' in message:
+                    future.set_exception(ModelServerError(message['error']))
+                else:
+                    future.set_result(message['result'])
+        except (asyncio.IncompleteReadError, OSError, MessageTooLarge) as e:
+            logger.warning('Model server connection lost: %r', e)
+        finally:
+            writer.close()
+            self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(
+                    ModelServerUnavailable('connection lost')
+                )
+
+    async def call(self, method: str, **params) -> Any:
+        await self._connect()
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        try:
+            try:
+                await write_message(
+                    self._writer,
+                    {'id': request_id, 'method': method, 'params': params}
+                )
+            except OSError as e:
+                raise ModelServerUnavailable(repr(e)) from e
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def close(self) -> None:
+        if self._read_task:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+        self._read_task = None
+        self._writer = None
+
+
+model_client = ModelClient(
+    socket_path=app_settings.model_server_socket,
+    timeout=app_settings.model_server_timeout
+)
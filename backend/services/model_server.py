@@ -0,0 +1,135 @@
+"""
+    Общий сервер моделей для всех воркеров gunicorn.
+
+    Категоризатор, модель кэшбеков и модель антиспуфинга загружаются
+    один раз в этом процессе, а воркеры API обращаются к нему через
+    Unix-сокет (протокол - core.ipc, клиент - services.model_client).
+    Запросы всех воркеров попадают в общие очереди микробатчинга.
+
+    Запуск из папки backend:
+        python -m services.model_server
+        python -m services.model_server --socket /tmp/models.sock
+"""
+import argparse
+import asyncio
+import base64
+import logging
+import os
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from cashbacker.casbacker import cashbacker, categorizer_queue
+from core.batching import MicroBatcher
+from core.config import app_settings
+from core.ipc import MessageTooLarge, read_message, write_message
+from core.registry import model_registry
+from services.validation import antispoofing_queue
+
+logger = logging.getLogger(__name__)
+
+
+class ModelServer:
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.cashback_queue = MicroBatcher(
+            cashbacker.cashbacks_for_matrices,
+            max_batch_size=app_settings.categorizer_batch_size,
+            max_wait=app_settings.categorizer_batch_wait_ms / 1000,
+            name='cashbacker'
+        )
+        self.methods: Dict[str, Callable[..., Any]] = {
+            'category_scores': self.category_scores,
+            'cashbacks': self.cashbacks,
+            'antispoofing': self.antispoofing,
+            'status': self.status,
+        }
+
+    async def category_scores(self, names: List[str]) -> np.ndarray:
+        scores = await categorizer_queue.submit_many(names)
+        return np.stack(scores) if scores else []
+
+    async def cashbacks(self, matrices: List[List[List[float]]]) -> List[dict]:
+        forecasts = await self.cashback_queue.submit_many(
+            [np.asarray(matrix, dtype=np.float64) for matrix in matrices]
+        )
+        return [
+            {
+                'topics': forecast['topics'].tolist(),
+                'percent': forecast['percent'].tolist()
+            }
+            for forecast in forecasts
+        ]
+
+    async def antispoofing(self, image: str) -> float | None:
+        return await antispoofing_queue.submit(base64.b64decode(image))
+
+    async def status(self) -> dict:
+        return {
+            'ready': model_registry.ready,
+            'models': model_registry.status()
+        }
+
+    async def dispatch(self, message: dict, writer: asyncio.StreamWriter) -> None:
+        try:
+            method = self.methods[message['method']]
+            response = {
+                'id': message['id'],
+                'result': await method(**message.get('params', {}))
+            }
+        except Exception as e:
+            logger.exception('Model server method %s failed', message.get('method'))
+            response = {'id': message.get('id'), 'error': f'{type(e).__name__}: {e}'}
+        try:
+            await write_message(writer, response)
+        except (OSError, MessageTooLarge):
+            logger.warning('Failed to send response %s', message.get('id'))
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        tasks = set()
+        try:
+            while True:
+                message = await read_message(reader)
+                task = asyncio.create_task(self.dispatch(message, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, OSError, MessageTooLarge):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def start(self) -> asyncio.AbstractServer:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        return await asyncio.start_unix_server(self.handle, path=self.socket_path)
+
+    async def serve(self, warmup_models: List[str]) -> None:
+        server = await self.start()
+        logger.info('Model server is listening on %s', self.socket_path)
+        load_times = await asyncio.to_thread(model_registry.warmup, warmup_models)
+        logger.info('Models are ready: %s', load_times)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--socket', default=app_settings.model_server_socket or '/tmp/models.sock'
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        ModelServer(args.socket).serve(
+            [name for name in app_settings.warmup_models.split(',') if name]
+        )
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+    Устойчивые вызовы внешних сервисов (Госуслуги, ЕБС, НСПК, банк).
+
+    Поверх общего пула (services.http_client) на каждый upstream:
+    - таймаут попытки;
+    - для идемпотентных запросов - ограниченные повторы с джиттером
+      (таймаут, ошибка соединения, 5xx и 429);
+    - circuit breaker: после серии сбоев запросы к сервису сразу
+      падают с UpstreamUnavailableException, пока не пройдёт пауза;
+    - для hedge=True - второй такой же запрос, если первый не ответил
+      за hedge_delay, берётся ответ, пришедший первым.
+    Ответ 4xx - штатный (например, пользователь не найден): fetch
+    возвращает None. Исходы считаются в stats().
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict
+
+import aiohttp
+
+from core.config import app_settings
+from exceptions.api import UpstreamUnavailableException
+from services.http_client import (UPSTREAMS, IntegrationsClient,
+                                  integrations_client)
+
+logger = logging.getLogger(__name__)
+
+
+class RetryableStatus(Exception):
+    """
+        Ответ 5xx или 429
+    """
+
+    def __init__(self, status: int):
+        super().__init__(f'HTTP {status}')
+        self.status = status
+
+
+@dataclass
+class UpstreamPolicy:
+    timeout: float = 5
+    retries: int = 2
+    backoff: float = 0.1
+    max_backoff: float = 2
+    # 0 - без hedged-запросов
+    hedge_delay: float = 0
+
+    def backoff_delay(self, attempt: int) -> float:
+        # full jitter: случайная пауза до экспоненциальной границы
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+        closed -> open после failure_threshold сбоев подряд; через
+        reset_timeout пропускается один пробный запрос (half-open): успех
+        закрывает breaker, сбой снова открывает
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        timer: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._timer = timer
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probe = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self._timer() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self._probe:
+            self._probe = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probe or self.failures >= self.failure_threshold:
+            self.opened_at = self._timer()
+        self._probe = False
+
+    def release(self) -> None:
+        """
+            Запрос прерван без ответа (отменён вызывающим): исход
+            не учитывается, следующий запрос снова может стать пробным
+        """
+        self._probe = False
+
+
+class ResilientClient:
+
+    def __init__(
+        self,
+        client: IntegrationsClient,
+        policies: Dict[str, UpstreamPolicy],
+        failure_threshold: int = 5,
+        reset_timeout: float = 30
+    ):
+        self.client = client
+        self.policies = policies
+        self.breakers = {
+            upstream: CircuitBreaker(failure_threshold, reset_timeout)
+            for upstream in policies
+        }
+        self.counters: Dict[str, Counter] = {
+            upstream: Counter() for upstream in policies
+        }
+
+    async def _attempt(
+        self, upstream: str, method: str, url: str, **kwargs
+    ) -> str | None:
+        async with self.client.request(upstream, method, url, **kwargs) as response:
+            if response.status == 200:
+                return await response.text()
+            if response.status == 429 or response.status >= 500:
+                raise RetryableStatus(response.status)
+            self.counters[upstream]['client_error'] += 1
+            return None
+
+    async def _timed_attempt(self, upstream: str, *args, **kwargs) -> str | None:
+        return await asyncio.wait_for(
+            self._attempt(upstream, *args, **kwargs),
+            self.policies[upstream].timeout
+        )
+
+    async def _hedged_attempt(self, upstream: str, *args, **kwargs) -> str | None:
+        counters = self.counters[upstream]
+        primary = asyncio.create_task(self._timed_attempt(upstream, *args, **kwargs))
+        done, _ = await asyncio.wait(
+            {primary}, timeout=self.policies[upstream].hedge_delay
+        )
+        if done:
+            return primary.result()
+
+        counters['hedged'] += 1
+        hedge = asyncio.create_task(self._timed_attempt(upstream, *args, **kwargs))
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            counters['hedge_won'] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch(
+        self,
+        upstream: str,
+        method: str,
+        url: str,
+        idempotent: bool = False,
+        hedge: bool = False,
+        **kwargs
+    ) -> str | None:
+        """
+            Тело ответа 200, None для 4xx. Если сервис недоступен
+            (повторы исчерпаны или breaker открыт) -
+            UpstreamUnavailableException
+        """
+        policy = self.policies[upstream]
+        breaker = self.breakers[upstream]
+        counters = self.counters[upstream]
+        attempts = 1 + (policy.retries if idempotent else 0)
+        hedged = hedge and idempotent and policy.hedge_delay > 0
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                counters['short_circuited'] += 1
+                raise UpstreamUnavailableException(detail=f'{upstream} is unavailable')
+            if attempt:
+                counters['retries'] += 1
+            try:
+                if hedged:
+                    body = await self._hedged_attempt(upstream, method, url, **kwargs)
+                else:
+                    body = await self._timed_attempt(upstream, method, url, **kwargs)
+            except asyncio.TimeoutError:
+                outcome = 'timeout'
+            except RetryableStatus:
+                outcome = 'server_error'
+            except aiohttp.ClientError:
+                outcome = 'connection_error'
+            except asyncio.CancelledError:
+                # иначе отменённый пробный запрос навсегда оставит
+                # breaker в half_open
+                breaker.release()
+                raise
+            except Exception:
+                counters['error'] += 1
+                breaker.record_failure()
+                raise
+            else:
+                breaker.record_success()
+                if body is not None:
+                    counters['success'] += 1
+                return body
+
+            counters[outcome] += 1
+            breaker.record_failure()
+            logger.warning(
+                '%s %s failed (%s), attempt %d of %d',
+                method, upstream, outcome, attempt + 1, attempts
+            )
+            if attempt + 1 < attempts:
+                await asyncio.sleep(policy.backoff_delay(attempt))
+
+        counters['failed'] += 1
+        raise UpstreamUnavailableException(detail=f'{upstream} is unavailable')
+
+    def stats(self) -> dict:
+        return {
+            upstream: {
+                'breaker': self.breakers[upstream].state,
+                **self.counters[upstream]
+            }
+            for upstream in self.policies
+        }
+
+
+def parse_timeouts(value: str) -> Dict[str, float]:
+    """
+        'gosuslugi=5,nspk=2' -> {'gosuslugi': 5.0, 'nspk': 2.0}
+    """
+    timeouts = {}
+    for item in value.split(','):
+        if item.strip():
+            upstream, timeout = item.split('=')
+            timeouts[upstream.strip()] = float(timeout)
+    return timeouts
+
+
+upstream_timeouts = parse_timeouts(app_settings.integrations_timeouts)
+resilient_client = ResilientClient(
+    integrations_client,
+    policies={
+        upstream: UpstreamPolicy(
+            timeout=upstream_timeouts.get(upstream, 5),
+            retries=app_settings.integrations_retries,
+            backoff=app_settings.integrations_backoff_ms / 1000,
+            hedge_delay=app_settings.integrations_hedge_delay_ms / 1000
+        )
+        for upstream in UPSTREAMS
+    },
+    failure_threshold=app_settings.integrations_breaker_failures,
+    reset_timeout=app_settings.integrations_breaker_reset_sec
+)
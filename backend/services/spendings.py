@@ -0,0 +1,96 @@
+"""
+    Помесячные агрегаты трат (account_month_spendings).
+
+    Агрегаты обновляются в transaction_crud вместе с сохранением
+    транзакций и проставлением категорий. Пересчитать их целиком
+    по таблице transactions (из папки backend):
+        python -m services.spendings
+        python -m services.spendings --account-id 1 2
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Tuple
+
+import pandas as pd
+
+from models import base as models
+from schemas import base as schemas
+
+
+def month_of(time: datetime) -> date:
+    """
+        Первое число месяца транзакции по UTC
+    """
+    if time.tzinfo is not None:
+        time = time.astimezone(timezone.utc)
+    return date(year=time.year, month=time.month, day=1)
+
+
+def aggregate_spendings(
+    rows: Iterable[Tuple[int, datetime, str | None, int]]
+) -> List[schemas.AccountMonthSpendingCreate]:
+    """
+        Суммы и количества по (account_id, month, category) для строк
+        (account_id, time, category, value). Строки без категории
+        пропускаются
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for account_id, time, category, value in rows:
+        if category is None or time is None:
+            continue
+        total = totals[(account_id, month_of(time), category)]
+        total[0] += value
+        total[1] += 1
+
+    return [
+        schemas.AccountMonthSpendingCreate(
+            account_id=account_id,
+            month=month,
+            category=category,
+            total=total,
+            count=count
+        )
+        for (account_id, month, category), (total, count) in totals.items()
+    ]
+
+
+def spendings_dataframe(
+    spendings: List[models.AccountMonthSpending]
+) -> pd.DataFrame:
+    """
+        Агрегаты в формате Cashbacker.cashbaks_for_user: одна строка
+        на месяц и категорию
+    """
+    return pd.DataFrame(
+        [
+            (pd.Timestamp(spending.month), 'клиент', spending.category, spending.total)
+            for spending in spendings
+        ],
+        columns=['date', 'client', 'topic', 'price']
+    )
+
+
+async def backfill(account_ids: List[int] | None = None) -> int:
+    from db.db import async_session
+    from services.db import spending_crud
+
+    async with async_session() as db:
+        return await spending_crud.rebuild(db=db, account_ids=account_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--account-id', type=int, nargs='+',
+        help='пересчитать только эти счета, по умолчанию все'
+    )
+    args = parser.parse_args()
+
+    rows = asyncio.run(backfill(account_ids=args.account_id))
+    print(f'Rebuilt {rows} monthly spending rows')
+
+
+if __name__ == '__main__':
+    main()
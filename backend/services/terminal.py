@@ -0,0 +1,208 @@
+"""
+    Ответ терминала: пользователь по фото, его счета и кэшбеки.
+
+    После поиска пользователя ответ обычно берётся из снимка
+    (TerminalSnapshot) одним запросом к базе. Снимок пересобирается при
+    синхронизации счетов на входе и при выборе кэшбека; если он старше
+    TERMINAL_SNAPSHOT_MAX_AGE_SEC, после ответа запускается фоновое
+    обновление. Без снимка на текущий месяц счета и кэшбеки
+    запрашиваются у НСПК и банков.
+
+    Внешние вызовы укладываются в общий дедлайн TERMINAL_DEADLINE_MS:
+    на поиск пользователя в ЕБС и на список счетов в НСПК выделяются
+    доли бюджета, остаток уходит на кэшбеки счетов, которые
+    запрашиваются одновременно. Если первые два этапа не успели, запрос
+    завершается 504; счёт, банк которого не ответил вовремя, приходит с
+    cashbacks=None.
+
+    Для демонстрационного банка DEMO_BANK на обоих путях отдаются
+    DEMO_CASHBACKS.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import app_settings
+from core.deadline import Deadline
+from db.db import async_session
+from exceptions import api as api_exceptions
+from schemas import base as schemas
+from services.db import terminal_snapshot_crud, user_crud
+from services.external_integrations import (create_or_update_accounts_in_db,
+                                            get_account_cashbacks,
+                                            get_accounts, get_user_by_photo)
+
+logger = logging.getLogger(__name__)
+
+# доли общего бюджета на поиск пользователя и на список счетов
+IDENTIFY_SHARE = 0.4
+ACCOUNTS_SHARE = 0.25
+
+# Нужно только для демонстрации на стенде: у этого банка кэшбеки
+# терминала фиксированные. В боевом варианте убрать
+DEMO_BANK = 'Центр-инвест'
+DEMO_CASHBACKS = [
+    schemas.RawCashback(product_type='продукты питания', value=5),
+    schemas.RawCashback(product_type='одежда', value=7),
+    schemas.RawCashback(product_type='электроника', value=3)
+]
+
+
+def current_month() -> date:
+    today = date.today()
+    return date(year=today.year, month=today.month, day=1)
+
+
+class SnapshotRefresher:
+    """
+        Фоновое обновление снимков: повторная синхронизация счетов
+        пользователя, как при входе, которая и пересобирает снимок. Для
+        одного пользователя одновременно идёт не больше одного обновления
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def schedule(self, user_info: schemas.User) -> None:
+        gosuslugi_id = user_info.gosuslugi_id
+        if gosuslugi_id in self._tasks:
+            return
+        task = asyncio.create_task(self.refresh(user_info))
+        self._tasks[gosuslugi_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(gosuslugi_id, None))
+
+    async def refresh(self, user_info: schemas.User) -> None:
+        try:
+            async with async_session() as db:
+                user = await user_crud.get_or_create(db, user_info)
+                accounts = await get_accounts(user_info.gosuslugi_id)
+                if accounts:
+                    await create_or_update_accounts_in_db(
+                        db, accounts, user.id, current_month()
+                    )
+        except Exception:
+            logger.exception('Terminal snapshot refresh failed')
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def account_cashbacks(
+    account: schemas.RawAccount,
+    month: date
+) -> List[schemas.RawCashback] | None:
+    if account.bank == DEMO_BANK:
+        return DEMO_CASHBACKS
+    cashbacks = await get_account_cashbacks(
+        account_number=account.number,
+        month=month
+    )
+    return cashbacks.cashbacks if cashbacks else None
+
+
+async def accounts_cashbacks(
+    accounts: List[schemas.RawAccount],
+    month: date,
+    timeout: float
+) -> List[List[schemas.RawCashback] | None]:
+    """
+        Кэшбеки всех счетов одновременно. Для счетов, которые не
+        уложились в timeout или упали, - None
+    """
+    tasks = [
+        asyncio.create_task(account_cashbacks(account, month))
+        for account in accounts
+    ]
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+    results = []
+    for account, task in zip(accounts, tasks):
+        if task in pending:
+            logger.warning('Cashbacks of %s account timed out', account.bank)
+            results.append(None)
+        elif task.exception() is not None:
+            logger.warning(
+                'Cashbacks of %s account failed: %r', account.bank, task.exception()
+            )
+            results.append(None)
+        else:
+            results.append(task.result())
+    return results
+
+
+async def terminal_response(
+    db: AsyncSession,
+    photo: bytes,
+    photo_name: str,
+    deadline: Deadline | None = None
+) -> schemas.TerminalResponse | None:
+    """
+        None - пользователь не найден или у него нет счетов
+    """
+    if deadline is None:
+        deadline = Deadline(app_settings.terminal_deadline_ms / 1000)
+    try:
+        user_info = await asyncio.wait_for(
+            get_user_by_photo(photo, photo_name), deadline.stage(IDENTIFY_SHARE)
+        )
+    except asyncio.TimeoutError:
+        raise api_exceptions.UpstreamTimeoutException()
+    if not user_info:
+        return None
+
+    month = current_month()
+    snapshot = await terminal_snapshot_crud.get_by_gosuslugi_id(
+        db, user_info.gosuslugi_id
+    )
+    if snapshot and snapshot.month == month and snapshot.cards:
+        age = datetime.now(timezone.utc) - snapshot.updated_at
+        if age > timedelta(seconds=app_settings.terminal_snapshot_max_age_sec):
+            snapshot_refresher.schedule(user_info)
+        cards = [schemas.CardWithCashback(**card) for card in snapshot.cards]
+        for card in cards:
+            if card.bank == DEMO_BANK:
+                card.cashbacks = DEMO_CASHBACKS
+        return schemas.TerminalResponse(
+            name=user_info.first_name,
+            surname=user_info.surname,
+            cards=cards
+        )
+    # снимка нет или он за прошлый месяц: отвечаем по данным банков и
+    # заодно собираем снимок для следующих визитов
+    snapshot_refresher.schedule(user_info)
+
+    try:
+        accounts = await asyncio.wait_for(
+            get_accounts(user_info.gosuslugi_id), deadline.stage(ACCOUNTS_SHARE)
+        )
+    except asyncio.TimeoutError:
+        raise api_exceptions.UpstreamTimeoutException()
+    if not accounts:
+        return None
+
+    cashbacks = await accounts_cashbacks(accounts, month, deadline.remaining())
+
+    return schemas.TerminalResponse(
+        name=user_info.first_name,
+        surname=user_info.surname,
+        cards=[
+            schemas.CardWithCashback(
+                bank=account.bank,
+                last_four_digits=card.card_number[-4:],
+                cashbacks=account_cashbacks
+            )
+            for account, account_cashbacks in zip(accounts, cashbacks)
+            for card in account.cards
+        ]
+    )
+
+
+snapshot_refresher = SnapshotRefresher()
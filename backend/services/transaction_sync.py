@@ -0,0 +1,209 @@
+"""
+    Фоновая синхронизация транзакций из банков.
+
+    Раньше транзакции подтягивались внутри запросов пользователя
+    (/transactions/, /get_cashback_for_choose/); теперь обработчики
+    только читают базу (кроме выбора кэшбека по счёту, который ещё ни
+    разу не синхронизировался), а планировщик держит счета активных
+    пользователей (запросы за последние TRANSACTION_SYNC_ACTIVE_DAYS) не
+    старше TRANSACTION_SYNC_FRESHNESS_MIN. Первыми обновляются счета
+    недавно активных пользователей, запросы к банкам разнесены
+    случайной задержкой и ограничены по числу одновременных. Насколько
+    устарели данные к синхронизации, пишется в accounts.sync_lag_seconds.
+    Счёт, который не удалось синхронизировать, откладывается до
+    accounts.sync_retry_at с экспоненциальной паузой, чтобы недоступный
+    банк не занимал каждый батч.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import func, select
+
+from core.config import app_settings
+from db.db import async_session, engine
+from models import base as models
+from services.db import account_crud
+from services.external_integrations import (is_stale,
+                                            update_account_transactions)
+
+logger = logging.getLogger(__name__)
+
+# ключ pg_advisory_lock: при нескольких воркерах gunicorn счета
+# синхронизирует только один процесс
+TRANSACTION_SYNC_LOCK_KEY = 20230025
+
+
+class TransactionSyncScheduler:
+
+    def __init__(
+        self,
+        freshness: timedelta = timedelta(minutes=30),
+        active_window: timedelta = timedelta(days=7),
+        concurrency: int = 4,
+        batch_size: int = 100,
+        interval: float = 60,
+        jitter: float = 5,
+        retry_base: float = 60,
+        retry_max: float = 3600
+    ):
+        self.freshness = freshness
+        self.active_window = active_window
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.synced = 0
+        self.failed = 0
+        self._event: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def notify(self) -> None:
+        """
+            Разбудить планировщик, например после входа пользователя
+        """
+        if self._event:
+            self._event.set()
+
+    async def stale_accounts(self) -> List[int]:
+        now = datetime.now(timezone.utc)
+        async with async_session() as db:
+            return await account_crud.get_stale_accounts(
+                db=db,
+                now=now,
+                synced_before=now - self.freshness,
+                active_since=now - self.active_window,
+                limit=self.batch_size
+            )
+
+    def retry_delay(self, failures: int) -> timedelta:
+        """
+            Пауза после failures неудач подряд: экспоненциальная, со
+            случайной составляющей, чтобы счета одного банка не
+            возвращались в работу одновременно
+        """
+        delay = min(self.retry_max, self.retry_base * 2 ** (failures - 1))
+        return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+    async def sync_account(self, account_id: int) -> bool:
+        now = datetime.now(timezone.utc)
+        async with async_session() as db:
+            account = await db.get(models.Account, account_id)
+            if account is None or not is_stale(
+                account.transations_update_time, now, self.freshness
+            ):
+                return False
+            failures = (account.sync_failures or 0) + 1
+            try:
+                # False - банк отказал (ответ 4xx)
+                synced = await update_account_transactions(
+                    db=db, account=account, freshness=self.freshness
+                )
+            except Exception:
+                await db.rollback()
+                await account_crud.record_sync_failure(
+                    db, account_id, failures, now + self.retry_delay(failures)
+                )
+                raise
+            if not synced:
+                self.failed += 1
+                await account_crud.record_sync_failure(
+                    db, account_id, failures, now + self.retry_delay(failures)
+                )
+            return synced
+
+    async def run_once(self) -> int:
+        """
+            Синхронизирует один батч устаревших счетов, возвращает число
+            обновлённых
+        """
+        account_ids = await self.stale_accounts()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def sync(account_id: int) -> bool:
+            # разносим запросы к банкам во времени
+            await asyncio.sleep(random.uniform(0, self.jitter))
+            async with semaphore:
+                try:
+                    return await self.sync_account(account_id)
+                except Exception:
+                    logger.exception('Transaction sync of account %s failed', account_id)
+                    self.failed += 1
+                    return False
+
+        results = await asyncio.gather(*[sync(account_id) for account_id in account_ids])
+        synced = sum(results)
+        self.synced += synced
+        return synced
+
+    async def run_locked(self) -> int:
+        async with engine.connect() as lock_connection:
+            locked = await lock_connection.scalar(
+                select(func.pg_try_advisory_lock(TRANSACTION_SYNC_LOCK_KEY))
+            )
+            if not locked:
+                return 0
+            try:
+                return await self.run_once()
+            finally:
+                await lock_connection.scalar(
+                    select(func.pg_advisory_unlock(TRANSACTION_SYNC_LOCK_KEY))
+                )
+
+    async def _run(self) -> None:
+        while True:
+            # до синхронизации: notify() во время неё не потеряется
+            self._event.clear()
+            try:
+                synced = await self.run_locked()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Transaction sync failed')
+                synced = 0
+            if synced:
+                logger.info('Transaction sync: %s accounts updated', synced)
+            if synced >= self.batch_size:
+                # не все устаревшие счета уместились в батч
+                continue
+            try:
+                await asyncio.wait_for(
+                    self._event.wait(),
+                    self.interval + random.uniform(0, self.jitter)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {'synced': self.synced, 'failed': self.failed}
+
+
+transaction_sync_scheduler = TransactionSyncScheduler(
+    freshness=timedelta(minutes=app_settings.transaction_sync_freshness_min),
+    active_window=timedelta(days=app_settings.transaction_sync_active_days),
+    concurrency=app_settings.transaction_sync_concurrency,
+    batch_size=app_settings.transaction_sync_batch_size,
+    interval=app_settings.transaction_sync_interval_sec,
+    jitter=app_settings.transaction_sync_jitter_sec,
+    retry_base=app_settings.transaction_sync_retry_base_sec,
+    retry_max=app_settings.transaction_sync_retry_max_sec
+)
@@ -1,75 +1,84 @@
-import os
+from typing import List
 
-import tensorflow as tf
-from keras import layers
-from keras.applications import MobileNetV2
+import numpy as np
 
-IMG_SHAPE = (256, 256, 3)
+from core.batching import MicroBatcher
+from core.config import app_settings
+from core.registry import model_registry
+from services.image_preprocessing import DECODERS, IMG_SHAPE, batch_buffer
 
+ANTISPOOFING_LOADERS = {
+    'keras': 'services.antispoofing_model:load_inference_model',
+    # int8-модель, см. services.antispoofing_export
+    'tflite': 'services.antispoofing_runtime:load_tflite_model'
+}
 
-class RevisitResNet50Inference(tf.keras.Model):
-    def __init__(self, name="revisit_resnet50", **kwargs):
-        super(RevisitResNet50Inference, self).__init__()
-        self.backbone = MobileNetV2(input_shape=IMG_SHAPE, include_top=False, weights='imagenet')
-        self.b2 = layers.Conv2D(1280, 2, strides=(1, 1), padding="same", activation='relu', input_shape=IMG_SHAPE[1:])
-        self.avgpool_8 = layers.AveragePooling2D(pool_size=(1, 1), strides=1, padding='valid', data_format=None)
-        self.theta_8 = layers.Conv2D(1, (1, 1), activation='sigmoid')
-        self.avgpool_4 = layers.AveragePooling2D(pool_size=(2, 2), strides=2, padding='valid', data_format=None)
-        self.theta_4 = layers.Conv2D(1, (1, 1), activation='sigmoid')
-        self.avgpool_2 = layers.AveragePooling2D(pool_size=(4, 4), strides=4, padding='valid', data_format=None)
-        self.theta_2 = layers.Conv2D(1, (1, 1), activation='sigmoid')
-        self.avgpool_1 = layers.AveragePooling2D(pool_size=(8, 8), strides=8, padding='valid', data_format=None)
-        self.theta_1 = layers.Conv2D(1, (1, 1), activation='sigmoid')
-        self.fc = layers.Dense(1, activation='sigmoid')
-
-    def call(self, input_img):
-        F = self.backbone(input_img)
-        F = self.b2(F)
+# модель и tensorflow загружаются только при первом обращении
+model_registry.register(
+    'antispoofing', ANTISPOOFING_LOADERS[app_settings.antispoofing_backend]
+)
 
-        x = self.avgpool_8(F)
-        M8 = self.theta_8(x)
 
-        x = self.avgpool_4(F)
-        M4 = self.theta_4(x)
+def preprocess_image(image: bytes) -> np.ndarray:
+    decode = DECODERS[app_settings.antispoofing_decoder]
+    return decode(image, np.empty(IMG_SHAPE, dtype=np.float32))
 
-        x = self.avgpool_2(F)
-        M2 = self.theta_2(x)
 
-        x = self.avgpool_1(F)
-        M1 = self.theta_1(x)
+def infer_images(images: List[bytes]) -> List[float | None]:
+    """
+        Оценки модели антиспуфинга для батча фото одним вызовом модели.
+        Фото декодируются прямо в переиспользуемый буфер батча. Для
+        файлов, которые не удалось декодировать, - None
+    """
+    decode = DECODERS[app_settings.antispoofing_decoder]
+    batch = batch_buffer(len(images))
+    decoded = []
+    # удачно декодированные фото идут в буфер подряд, без пропусков
+    size = 0
+    for image in images:
+        try:
+            decode(image, batch[size])
+        except Exception:
+            decoded.append(False)
+            continue
+        decoded.append(True)
+        size += 1
 
-        x = layers.Concatenate(axis=1)(
-            [layers.Flatten()(M8), layers.Flatten()(M4), layers.Flatten()(M2), layers.Flatten()(M1)])
-        y_pred = self.fc(x)
+    if not size:
+        return [None] * len(images)
 
-        return y_pred
+    inference_model = model_registry.get('antispoofing')
+    if app_settings.antispoofing_backend == 'tflite':
+        predictions = inference_model.call(batch[:size])
+    else:
+        import tensorflow as tf
 
+        predictions = inference_model.call(tf.convert_to_tensor(batch[:size]))
+    predictions = np.asarray(predictions)[:, 0]
 
-# Создаём экземпляр модели RevisitResNet50
-inference_model = RevisitResNet50Inference()
-
-# Загружаем веса из файлов cp.ckpt.index и cp.ckpt.data-00000-of-00001
-checkpoint_path = os.path.join(
-    os.path.dirname(os.path.realpath(__file__)), 'mobilenetv2/cp.ckpt.index'
-)
-ckpt = tf.train.Checkpoint(model=inference_model)
-ckpt.restore(checkpoint_path).expect_partial()
+    scores = iter(predictions.tolist())
+    return [next(scores) if ok else None for ok in decoded]
 
 
 # Функция для инференса на бинарных данных изображения
 def infer_image(image):
-    image = tf.image.decode_image(image)
-    image = tf.image.resize(image, IMG_SHAPE[:2])
-    image = tf.keras.applications.mobilenet_v2.preprocess_input(image)
-    image = tf.expand_dims(image, axis=0)
-
-    predictions = inference_model.call(image)
-
-    return predictions.numpy()[0][0]
+    return infer_images([image])[0]
 
 
 def validate_photo(image: bytes) -> bool:
     predictions = infer_image(image)
-    if predictions > 0.5:
+    if predictions is not None and predictions > 0.5:
         return True
     return False
+
+
+# Фото с терминалов, пришедшие одновременно, считаются одним батчем.
+# Очередь ограничена: при перегрузке запрос сразу получает отказ, а
+# не ждёт дольше своего дедлайна (см. services.antispoofing)
+antispoofing_queue = MicroBatcher(
+    infer_images,
+    max_batch_size=app_settings.antispoofing_batch_size,
+    max_wait=app_settings.antispoofing_batch_wait_ms / 1000,
+    name='antispoofing',
+    max_queue_size=app_settings.antispoofing_queue_size
+)
@@ -0,0 +1,123 @@
+import asyncio
+import itertools
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.dml import Insert
+
+from schemas import base as schemas
+from services.external_integrations import save_accounts_sync
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def scalars(self):
+        return self
+
+
+class RecordingSession:
+    """
+        Записывает запросы вместо базы; на INSERT ... RETURNING по
+        счетам и на выборку id кэшбеков отвечает выдуманными id
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+        self.ids = itertools.count(1)
+
+    async def execute(self, statement, *args, **kwargs):
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.statements.append(str(compiled))
+        if isinstance(statement, Insert) and statement.table.name == 'accounts':
+            return Result([
+                (value, next(self.ids))
+                for key, value in compiled.params.items()
+                if key.startswith('number')
+            ])
+        if not isinstance(statement, Insert) and 'FROM cashbacks' in str(compiled):
+            product_types = next(iter(compiled.params.values()))
+            return Result([(product_type, next(self.ids)) for product_type in product_types])
+        return Result([])
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+def sync(accounts_count):
+    accounts = [
+        schemas.RawAccount(
+            bank='Альфа', number=f'4080{i}',
+            cards=[{'card_number': f'2200{i}{j}'} for j in range(2)]
+        )
+        for i in range(accounts_count)
+    ]
+    cashbacks = {
+        account.number: [
+            schemas.RawCashback(product_type='одежда', value=5),
+            schemas.RawCashback(product_type='кафе', value=3)
+        ]
+        for account in accounts
+    }
+    db = RecordingSession()
+    asyncio.run(save_accounts_sync(db, 1, date(2023, 10, 1), accounts, cashbacks))
+    return db
+
+
+def test_login_sync_statement_count():
+    one, many = sync(1), sync(4)
+    # счета, карты, кэшбеки (insert + select), кэшбеки счетов и снимок
+    # терминала (2 select + upsert) - независимо от числа счетов
+    assert len(one.statements) == len(many.statements) == 8
+    assert one.commits == many.commits == 1
+    assert sum('ON CONFLICT' in sql for sql in many.statements) == 5
+
+
+def test_cashbacks_fetched_concurrently(monkeypatch):
+    import time
+
+    from core.config import app_settings
+    from exceptions.api import UpstreamUnavailableException
+    from services import external_integrations
+
+    active = []
+    peak = []
+
+    async def get_account_cashbacks(account_number, month):
+        active.append(account_number)
+        peak.append(len(active))
+        await asyncio.sleep(0.1)
+        active.remove(account_number)
+        if account_number == '40803':
+            raise UpstreamUnavailableException()
+        return schemas.RawAccountCashbacks(
+            month=month,
+            cashbacks=[schemas.RawCashback(product_type='одежда', value=5)]
+        )
+
+    monkeypatch.setattr(
+        external_integrations, 'get_account_cashbacks', get_account_cashbacks
+    )
+    monkeypatch.setattr(app_settings, 'login_sync_concurrency', 3)
+    accounts = [
+        schemas.RawAccount(bank='Альфа', number=f'4080{i}', cards=[])
+        for i in range(6)
+    ]
+
+    start = time.perf_counter()
+    cashbacks = asyncio.run(
+        external_integrations.fetch_accounts_cashbacks(accounts, date(2023, 10, 1))
+    )
+    # 6 счетов по 0.1 с при 3 одновременных - два «круга»
+    assert time.perf_counter() - start < 0.35
+    assert max(peak) == 3
+    # недоступный банк не ломает вход
+    assert set(cashbacks) == {'40800', '40801', '40802', '40804', '40805'}
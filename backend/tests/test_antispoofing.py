@@ -0,0 +1,110 @@
+import asyncio
+import io
+
+import numpy as np
+from PIL import Image
+
+from core.batching import BatcherOverloaded
+from core.config import app_settings
+from core.registry import model_registry
+from services import validation
+from services.antispoofing import AntiSpoofingService
+from services.image_preprocessing import IMG_SHAPE, batch_buffer, decode_into
+
+
+def score_fn(score=None, delay=0.0, error=None):
+    async def score_image(image):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return score
+    return score_image
+
+
+def jpeg_bytes(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=95)
+    return buffer.getvalue()
+
+
+def test_antispoofing_threshold():
+    service = AntiSpoofingService(score_fn=score_fn(score=0.9))
+    assert asyncio.run(service.validate(b'photo'))
+    service = AntiSpoofingService(score_fn=score_fn(score=0.1))
+    assert not asyncio.run(service.validate(b'photo'))
+    # не удалось декодировать
+    service = AntiSpoofingService(score_fn=score_fn(score=None))
+    assert not asyncio.run(service.validate(b'photo'))
+
+
+def test_antispoofing_deadline_policy():
+    slow = score_fn(score=0.9, delay=1)
+    closed = AntiSpoofingService(deadline=0.05, fail_open=False, score_fn=slow)
+    assert not asyncio.run(closed.validate(b'photo'))
+    opened = AntiSpoofingService(deadline=0.05, fail_open=True, score_fn=slow)
+    assert asyncio.run(opened.validate(b'photo'))
+    assert opened.stats()['failures'] == 1
+
+
+def test_antispoofing_overload_policy():
+    overloaded = score_fn(error=BatcherOverloaded('antispoofing: queue is full'))
+    service = AntiSpoofingService(fail_open=True, score_fn=overloaded)
+    assert asyncio.run(service.validate(b'photo'))
+
+
+def test_antispoofing_disabled():
+    service = AntiSpoofingService(enabled=False, score_fn=score_fn(score=0.0))
+    assert asyncio.run(service.validate(b'photo'))
+
+
+def test_decode_into_buffer():
+    pixels = np.full((1200, 1600, 3), 255, dtype=np.uint8)
+    pixels[..., 1] = 0
+    image = jpeg_bytes(Image.fromarray(pixels))
+
+    batch = batch_buffer(2)
+    assert batch.shape == (2, *IMG_SHAPE) and batch.dtype == np.float32
+    out = decode_into(image, batch[1])
+    assert np.shares_memory(out, batch)
+    # масштаб mobilenet_v2: 255 -> 1, 0 -> -1
+    assert np.allclose(batch[1, ..., 0], 1, atol=0.05)
+    assert np.allclose(batch[1, ..., 1], -1, atol=0.05)
+    # буфер переиспользуется
+    assert np.shares_memory(batch_buffer(1), batch)
+
+
+def test_infer_images_tflite_backend(monkeypatch):
+    class FakeModel:
+        def call(self, images):
+            # без tensorflow: int8-модель получает numpy-батч
+            assert isinstance(images, np.ndarray)
+            return np.full((len(images), 1), 0.75, dtype=np.float32)
+
+    monkeypatch.setattr(app_settings, 'antispoofing_backend', 'tflite')
+    monkeypatch.setattr(model_registry, 'get', lambda name: FakeModel())
+
+    image = jpeg_bytes(Image.new('RGB', (640, 480)))
+    scores = validation.infer_images([image, b'not an image'])
+    assert scores == [0.75, None]
+    scores = validation.infer_images([b'not an image', image])
+    assert scores == [None, 0.75]
+
+
+def test_infer_images_skips_undecodable(monkeypatch):
+    class MeanModel:
+        def call(self, images):
+            # белое фото -> 1, чёрное -> 0
+            images = np.asarray(images)
+            return ((images.mean(axis=(1, 2, 3)) + 1) / 2)[:, None]
+
+    monkeypatch.setattr(app_settings, 'antispoofing_backend', 'tflite')
+    monkeypatch.setattr(model_registry, 'get', lambda name: MeanModel())
+
+    black = jpeg_bytes(Image.new('RGB', (64, 64), 'black'))
+    white = jpeg_bytes(Image.new('RGB', (64, 64), 'white'))
+    # в буфере остаётся чёрное фото прошлого батча
+    validation.infer_images([black, black])
+    scores = validation.infer_images([b'not an image', white])
+    assert scores[0] is None and abs(scores[1] - 1) < 0.05
+    scores = validation.infer_images([black, b'not an image', white])
+    assert abs(scores[0]) < 0.05 and scores[1] is None and abs(scores[2] - 1) < 0.05
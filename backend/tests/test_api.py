@@ -43,3 +43,49 @@ def test_choose_cashback(get_client, get_client_credentials, get_account_number,
     }
     response = get_client.post(app.url_path_for('choose_card_cashback'), json=json_data, headers=headers)
     assert response.status_code == 200
+
+
+def test_get_category_uses_cache(get_client):
+    json_data = {'name': 'Молоко Простоквашино 3,2%'}
+    first = get_client.post(app.url_path_for('get_category'), json=json_data)
+    assert first.status_code == 200
+    second = get_client.post(app.url_path_for('get_category'), json=json_data)
+    assert second.json() == first.json()
+
+    response = get_client.get(app.url_path_for('get_category_stats'))
+    assert response.status_code == 200
+    assert response.json()['memory_hits'] >= 1
+
+
+def test_get_categories_bulk(get_client):
+    names = ['Молоко 1л', 'Coca-Cola 0.5л', 'Футболка мужская']
+    response = get_client.post(
+        app.url_path_for('get_categories'),
+        json={'names': names, 'top_k': 2}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert [item['name'] for item in result] == names
+    for item in result:
+        assert len(item['scores']) == 2
+        assert item['scores'][0]['category'] == item['category']
+        assert item['scores'][0]['score'] >= item['scores'][1]['score']
+
+
+def test_get_categories_bulk_streaming(get_client):
+    names = [f'Товар {index}' for index in range(600)]
+    response = get_client.post(
+        app.url_path_for('get_categories'),
+        json={'names': names, 'top_k': 1}
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == len(names)
+
+
+def test_get_transactions_pending_flag(get_client, get_client_credentials):
+    headers = {"Authorization": f"Bearer {get_client_credentials}"}
+    response = get_client.get(app.url_path_for('get_transactions'), headers=headers)
+    assert response.status_code == 200
+    for account in response.json():
+        for transaction in account['transactions']:
+            assert transaction['pending'] == (transaction['category'] is None)
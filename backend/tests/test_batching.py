@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from core.batching import BatcherOverloaded, MicroBatcher
+
+
+def test_micro_batcher_merges_concurrent_requests():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait=0.05)
+
+    async def run():
+        results = await asyncio.gather(
+            batcher.submit_many([1, 2, 3]),
+            batcher.submit(4),
+            batcher.submit_many([5, 6])
+        )
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert results == [[2, 4, 6], 8, [10, 12]]
+    assert len(batches) == 1
+
+
+def test_micro_batcher_respects_max_batch_size():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(len(items))
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait=0.01)
+
+    async def run():
+        results = await batcher.submit_many(list(range(10)))
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == list(range(10))
+    assert batches == [4, 4, 2]
+
+
+def test_micro_batcher_rejects_when_queue_is_full():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=2, max_wait=0.01, max_queue_size=3)
+
+    async def run():
+        with pytest.raises(BatcherOverloaded):
+            await batcher.submit_many([1, 2, 3, 4])
+        results = await batcher.submit_many([1, 2, 3])
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == [1, 2, 3]
+
+
+def test_micro_batcher_fails_missing_results():
+    batcher = MicroBatcher(lambda items: items[:1], max_batch_size=4, max_wait=0.01)
+
+    async def run():
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                batcher.submit(1), batcher.submit(2), return_exceptions=True
+            ),
+            timeout=1
+        )
+        await batcher.stop()
+        return results
+
+    first, second = asyncio.run(run())
+    assert first == 1
+    assert isinstance(second, RuntimeError)
@@ -0,0 +1,68 @@
+from core.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_lru_cache_stats():
+    cache = LRUCache(maxsize=10)
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('b')
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_lru_cache_ttl():
+    now = [0.0]
+    cache = LRUCache(maxsize=10, ttl=60, timer=lambda: now[0])
+    cache.set('a', 1)
+    now[0] = 59
+    assert cache.get('a') == 1
+    now[0] = 60
+    assert 'a' not in cache
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_category_cache_commit_left_to_caller(monkeypatch):
+    import asyncio
+
+    import numpy as np
+
+    from services import categories
+
+    class Session:
+        commits = 0
+
+        async def execute(self, statement, *args, **kwargs):
+            return None
+
+        async def commit(self):
+            self.commits += 1
+
+    async def bulk_get(db, names, model_version):
+        return []
+
+    async def category_scores(names):
+        return [np.eye(len(categories.CATEGORIES))[0] for _ in names]
+
+    monkeypatch.setattr(categories.category_cache_crud, 'bulk_get', bulk_get)
+    monkeypatch.setattr(categories, 'category_scores', category_scores)
+
+    cached = categories.CachedCategorizer(model_version='test', maxsize=10)
+    session = Session()
+    asyncio.run(cached.get_topics_name(session, ['Молоко'], commit=False))
+    assert session.commits == 0
+    asyncio.run(cached.get_topics_name(session, ['Хлеб']))
+    assert session.commits == 1
@@ -0,0 +1,17 @@
+from datetime import date, datetime
+
+from services.cashback_precompute import (CashbackPrecomputeScheduler,
+                                          month_start, next_month)
+
+
+def test_next_month():
+    assert next_month(date(2023, 11, 15)) == date(2023, 12, 1)
+    assert next_month(date(2023, 12, 31)) == date(2024, 1, 1)
+    assert month_start(date(2024, 2, 29)) == date(2024, 2, 1)
+
+
+def test_scheduler_waits_for_next_run():
+    scheduler = CashbackPrecomputeScheduler(hour=3)
+    assert scheduler.seconds_until_run(datetime(2023, 11, 15, 1, 0)) == 2 * 3600
+    assert scheduler.seconds_until_run(datetime(2023, 11, 15, 3, 0)) == 24 * 3600
+    assert scheduler.seconds_until_run(datetime(2023, 11, 15, 4, 30)) == 22.5 * 3600
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 
@@ -29,3 +30,53 @@ def test_cashbaks_for_user(get_cashbacker):
     })
     cashbacks = get_cashbacker.cashbaks_for_user(data)
     assert cashbacks.shape == (5, 2)
+
+
+def test_get_matrix_matches_dataframe(get_cashbacker):
+    data = pd.DataFrame({
+        'date': ['2022-11-03', '2022-11-20', '2022-12-01', '2023-01-15',
+                 '2023-01-15', '2023-01-20', '2023-03-02', '2023-03-05'],
+        'client': ['client1', 'client2', 'client1', 'client1',
+                   'client2', 'client2', 'client1', 'client2'],
+        'topic': ['напитки', 'напитки', 'одежда', 'уборка',
+                  'уборка', None, 'topic1', 'электроника'],
+        'price': [100, 300, 250, 40, 60, 500, 70, 90],
+    })
+    matrix = get_cashbacker.get_matrix(data.copy())
+    expected = get_cashbacker.get_dataframe(data.copy()).values
+    assert matrix.shape == (22, 10)
+    assert np.allclose(matrix, expected)
+
+
+def test_offer_percents(get_cashbacker):
+    predictions = np.array([
+        [1., 9., 5., 3., 7., 0., 2., 4., 6., 8.],
+        [5., 5., 5., 5., 5., 5., 5., 5., 5., 5.],
+    ])
+    order, percents = get_cashbacker.offer_percents(predictions)
+    assert order[0].tolist() == [1, 9, 4, 8, 2]
+    assert percents[0].tolist() == [10, 8, 6, 5, 3]
+    assert order[1].tolist() == [0, 1, 2, 3, 4]
+    assert percents[1].tolist() == [10, 3, 3, 3, 3]
+
+
+def test_cashbacks_for_users(get_cashbacker):
+    first = pd.DataFrame({
+        'date': ['2023-01-01', '2023-01-01', '2023-02-01'],
+        'client': ['client1', 'client1', 'client1'],
+        'topic': ['напитки', 'одежда', 'напитки'],
+        'price': [100, 200, 150],
+    })
+    second = pd.DataFrame({
+        'date': ['2023-03-01', '2023-04-01'],
+        'client': ['client1', 'client1'],
+        'topic': ['уборка', 'электроника'],
+        'price': [300, 50],
+    })
+    cashbacks = get_cashbacker.cashbacks_for_users([first, second])
+    assert len(cashbacks) == 2
+    for user_data, user_cashbacks in zip([first, second], cashbacks):
+        assert user_cashbacks.shape == (5, 2)
+        single = get_cashbacker.cashbaks_for_user(user_data)
+        assert user_cashbacks['topics'].tolist() == single['topics'].tolist()
+    assert get_cashbacker.cashbacks_for_users([]) == []
@@ -1,5 +1,15 @@
 import asyncio
-from cashbacker.casbacker import get_n_most_frequent_strings
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.corpus import generate_corpus
+from cashbacker.casbacker import Categorizer, get_n_most_frequent_strings
+from cashbacker.language import route_language, script_language
+from cashbacker.runtime import (MAX_LENGTH, TFLITE_MODEL_PATH,
+                                TOKENIZER_JSON_PATH, LiteTokenizer,
+                                TFLiteTopicModel, pad_sequences)
 
 
 def test_get_n_most_frequent_strings():
@@ -23,3 +33,43 @@ def test_get_topics_name(get_categorizer):
     product_names = ["Sample product in English.", "Пример товара на русском языке."]
     topics = asyncio.run(get_categorizer.get_topics_name(product_names))
     assert len(topics) == len(product_names)
+
+
+def test_categories_tokenize_text_keeps_order(get_categorizer):
+    products = ["Молоко 3,2%", "Coca-Cola", "Молоко 3,2%", "Хлеб белый"]
+    padded_sequences = asyncio.run(get_categorizer.tokenize_text(products))
+    assert padded_sequences.shape == (len(products), 29)
+    assert (padded_sequences[0] == padded_sequences[2]).all()
+
+
+def test_route_language_by_script():
+    assert route_language("Молоко Простоквашино 3,2%") == 'ru'
+    assert route_language("Coca-Cola 0.5л") == 'en'
+    assert route_language("Wireless headphones") == 'en'
+    assert script_language("Шоколад Milka") is None
+    # единственная буква кириллическая - решает алфавит
+    assert route_language("0.5 л") == 'ru'
+    # букв нет: langdetect падает, выбирается русский пайплайн
+    assert route_language("12345") == 'ru'
+
+
+@pytest.mark.skipif(
+    not os.path.exists(TFLITE_MODEL_PATH),
+    reason='нужен экспорт: python -m cashbacker.export'
+)
+def test_tflite_backend_parity():
+    keras_categorizer = Categorizer(backend='keras')
+    lite_model = TFLiteTopicModel(TFLITE_MODEL_PATH)
+    lite_tokenizer = LiteTokenizer.load(TOKENIZER_JSON_PATH)
+
+    sentences = keras_categorizer.clean_sentences(generate_corpus(300, seed=7))
+    keras_tokens = keras_categorizer.preprocess_sentences(sentences, MAX_LENGTH)
+    lite_tokens = pad_sequences(
+        lite_tokenizer.texts_to_sequences(sentences), MAX_LENGTH
+    )
+    assert (keras_tokens == lite_tokens).all()
+
+    keras_predictions = np.asarray(keras_categorizer.topic_model(keras_tokens))
+    lite_predictions = lite_model(lite_tokens)
+    assert np.allclose(keras_predictions, lite_predictions, atol=1e-4)
+    assert (keras_predictions.argmax(axis=1) == lite_predictions.argmax(axis=1)).all()
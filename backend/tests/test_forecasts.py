@@ -0,0 +1,47 @@
+import asyncio
+from datetime import date
+
+import pandas as pd
+
+from cashbacker.casbacker import cashbacker
+from services.forecasts import ForecastCache
+
+MONTH = date(2023, 12, 1)
+
+
+def spendings(value: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'date': ['2023-10-01', '2023-11-01'],
+        'client': ['клиент', 'клиент'],
+        'topic': ['напитки', 'одежда'],
+        'price': [value, 300],
+    })
+
+
+def test_forecast_cache(monkeypatch):
+    calls = []
+
+    def cashbacks_for_matrices(matrices):
+        calls.append(len(matrices))
+        return [
+            pd.DataFrame({'topics': ['напитки'], 'percent': [10]})
+            for _ in matrices
+        ]
+
+    monkeypatch.setattr(cashbacker, 'cashbacks_for_matrices', cashbacks_for_matrices)
+    cache = ForecastCache(model_version='test', maxsize=10, ttl=60)
+
+    first = asyncio.run(cache.get_cashbacks(MONTH, {1: spendings(100), 2: spendings(200)}))
+    assert first[1][0].product_type == 'напитки'
+    assert calls == [2]
+
+    asyncio.run(cache.get_cashbacks(MONTH, {1: spendings(100), 2: spendings(200)}))
+    assert calls == [2]
+
+    # траты изменились - другой ключ
+    asyncio.run(cache.get_cashbacks(MONTH, {1: spendings(150)}))
+    assert calls == [2, 1]
+
+    cache.invalidate(2)
+    asyncio.run(cache.get_cashbacks(MONTH, {1: spendings(100), 2: spendings(200)}))
+    assert calls == [2, 1, 1]
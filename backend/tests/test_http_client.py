@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from services.http_client import BANK, NSPK, IntegrationsClient
+
+
+async def start_server(handler):
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}'
+
+
+def test_connections_are_reused():
+    async def handler(request):
+        return web.json_response([])
+
+    async def run():
+        runner, url = await start_server(handler)
+        client = IntegrationsClient()
+        try:
+            for _ in range(5):
+                async with client.get(NSPK, url) as response:
+                    assert await response.json() == []
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return client.stats()
+
+    stats = asyncio.run(run())
+    assert stats['connections_created'] == 1
+    assert stats['connections_reused'] == 4
+    assert stats['upstreams'][NSPK]['requests'] == 5
+    assert stats['upstreams'][NSPK]['in_flight'] == 0
+
+
+def test_limit_per_upstream_and_timeouts():
+    active = []
+    peak = []
+
+    async def handler(request):
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(float(request.query.get('delay', '0.05')))
+        active.pop()
+        return web.json_response({})
+
+    async def call(client, url):
+        async with client.post(BANK, url) as response:
+            return await response.json()
+
+    async def run():
+        runner, url = await start_server(handler)
+        client = IntegrationsClient(limit_per_upstream=2, read_timeout=0.1)
+        try:
+            await asyncio.gather(*[call(client, url) for _ in range(6)])
+            with pytest.raises(asyncio.TimeoutError):
+                await call(client, f'{url}?delay=1')
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return client.stats()
+
+    stats = asyncio.run(run())
+    assert max(peak) == 2
+    assert stats['upstreams'][BANK]['timeouts'] == 1
+    assert stats['upstreams'][BANK]['requests'] == 7
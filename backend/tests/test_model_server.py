@@ -0,0 +1,46 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from services.model_client import (ModelClient, ModelServerError,
+                                   ModelServerUnavailable)
+from services.model_server import ModelServer
+
+
+def test_model_server_roundtrip(tmp_path):
+    socket_path = str(tmp_path / 'models.sock')
+
+    async def scenario():
+        model_server = ModelServer(socket_path)
+
+        async def double(values):
+            await asyncio.sleep(0.01)
+            return np.asarray(values) * 2
+
+        model_server.methods['double'] = double
+        server = await model_server.start()
+        client = ModelClient(socket_path, timeout=5)
+        try:
+            results = await asyncio.gather(
+                *[client.call('double', values=[index, 1.5]) for index in range(20)]
+            )
+            assert results == [[index * 2, 3.0] for index in range(20)]
+
+            status = await client.call('status')
+            assert 'ready' in status
+
+            with pytest.raises(ModelServerError):
+                await client.call('unknown')
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(scenario())
+
+
+def test_model_client_without_server(tmp_path):
+    client = ModelClient(str(tmp_path / 'missing.sock'), timeout=1)
+    with pytest.raises(ModelServerUnavailable):
+        asyncio.run(client.call('status'))
@@ -0,0 +1,186 @@
+import asyncio
+import importlib.util
+import os
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from exceptions.api import UpstreamUnavailableException
+from services.http_client import BANK, NSPK, UPSTREAMS, IntegrationsClient
+from services.resilience import CircuitBreaker, ResilientClient, UpstreamPolicy
+
+FAULTS_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'mock_server', 'core', 'faults.py'
+)
+ACCOUNTS = '/api/v1/get_user_accounts/'
+CASHBACKS = '/api/v1/get_account_cashbacks/'
+
+
+def load_faults_module():
+    # у mock_server свои пакеты core/services, грузим только файл
+    spec = importlib.util.spec_from_file_location('mock_server_faults', FAULTS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def accounts(request):
+    return JSONResponse([])
+
+
+async def cashbacks(request):
+    return JSONResponse({'month': '2023-10-01', 'cashbacks': []})
+
+
+@asynccontextmanager
+async def mock_server():
+    faults = load_faults_module()
+    app = faults.FaultInjectionMiddleware(
+        Starlette(routes=[
+            Route(ACCOUNTS, accounts),
+            Route(CASHBACKS, cashbacks, methods=['POST'])
+        ]),
+        rules=[]
+    )
+    server = uvicorn.Server(
+        uvicorn.Config(app, host='127.0.0.1', port=0, log_level='warning')
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        server.should_exit = True
+        await task
+
+
+def make_client(**policy):
+    policy = {'timeout': 1, 'retries': 2, 'backoff': 0.01, **policy}
+    failure_threshold = policy.pop('failure_threshold', 5)
+    reset_timeout = policy.pop('reset_timeout', 30)
+    return ResilientClient(
+        IntegrationsClient(),
+        policies={upstream: UpstreamPolicy(**policy) for upstream in UPSTREAMS},
+        failure_threshold=failure_threshold,
+        reset_timeout=reset_timeout
+    )
+
+
+async def set_faults(client, url, rules):
+    async with client.client.request(NSPK, 'PUT', f'{url}/_faults', json=rules) as response:
+        assert response.status == 200
+
+
+def run(scenario, **policy):
+    async def wrapper():
+        async with mock_server() as url:
+            client = make_client(**policy)
+            try:
+                return await scenario(client, url)
+            finally:
+                await client.client.close()
+    return asyncio.run(wrapper())
+
+
+def test_circuit_breaker_states():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, timer=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    now[0] = 11
+    # half-open: один пробный запрос
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_retries_idempotent_get():
+    async def check(client, url):
+        await set_faults(client, url, [{'path': ACCOUNTS, 'status': 503, 'count': 2}])
+        body = await client.fetch(NSPK, 'GET', url + ACCOUNTS, idempotent=True)
+        assert body == '[]'
+        return client.stats()[NSPK]
+
+    stats = run(check)
+    assert stats['server_error'] == 2
+    assert stats['retries'] == 2
+    assert stats['success'] == 1
+
+
+def test_no_retries_for_post():
+    async def check(client, url):
+        await set_faults(client, url, [{'path': CASHBACKS, 'status': 500, 'count': 1}])
+        with pytest.raises(UpstreamUnavailableException):
+            await client.fetch(BANK, 'POST', url + CASHBACKS, json={})
+        return client.stats()[BANK]
+
+    stats = run(check)
+    assert stats['failed'] == 1
+    assert 'retries' not in stats
+
+
+def test_breaker_fails_fast_and_timeouts():
+    async def check(client, url):
+        await set_faults(client, url, [{'path': ACCOUNTS, 'delay_ms': 500}])
+        for _ in range(2):
+            with pytest.raises(UpstreamUnavailableException):
+                await client.fetch(NSPK, 'GET', url + ACCOUNTS, idempotent=True)
+        start = time.perf_counter()
+        with pytest.raises(UpstreamUnavailableException):
+            await client.fetch(NSPK, 'GET', url + ACCOUNTS, idempotent=True)
+        assert time.perf_counter() - start < 0.05
+        return client.stats()[NSPK]
+
+    stats = run(check, retries=0, timeout=0.1, failure_threshold=2)
+    assert stats['timeout'] == 2
+    assert stats['short_circuited'] == 1
+    assert stats['breaker'] == 'open'
+
+
+def test_cancelled_probe_releases_breaker():
+    async def check(client, url):
+        await set_faults(client, url, [{'path': ACCOUNTS, 'delay_ms': 500}])
+        with pytest.raises(UpstreamUnavailableException):
+            await client.fetch(NSPK, 'GET', url + ACCOUNTS, idempotent=True)
+        await asyncio.sleep(0.15)
+        # пробный запрос half-open отменяется вызывающим
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                client.fetch(NSPK, 'GET', url + ACCOUNTS, idempotent=True), 0.02
+            )
+        await set_faults(client, url, [])
+        assert await client.fetch(NSPK, 'GET', url + ACCOUNTS, idempotent=True) == '[]'
+        return client.stats()[NSPK]
+
+    stats = run(check, retries=0, timeout=0.1, failure_threshold=1, reset_timeout=0.1)
+    assert stats['breaker'] == 'closed'
+
+
+def test_hedged_request_cuts_tail():
+    async def check(client, url):
+        # медленный только первый запрос
+        await set_faults(client, url, [{'path': CASHBACKS, 'delay_ms': 800, 'count': 1}])
+        start = time.perf_counter()
+        body = await client.fetch(
+            BANK, 'POST', url + CASHBACKS, json={}, idempotent=True, hedge=True
+        )
+        assert time.perf_counter() - start < 0.5
+        assert 'cashbacks' in body
+        return client.stats()[BANK]
+
+    stats = run(check, hedge_delay=0.05)
+    assert stats['hedged'] == 1
+    assert stats['hedge_won'] == 1
@@ -0,0 +1,51 @@
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from models import base as models
+from services.spendings import aggregate_spendings, month_of, spendings_dataframe
+
+MSK = timezone(timedelta(hours=3))
+ROWS = [
+    (1, datetime(2023, 10, 3, 12, tzinfo=timezone.utc), 'напитки', 100),
+    (1, datetime(2023, 10, 20, 9, tzinfo=timezone.utc), 'напитки', 250),
+    (1, datetime(2023, 11, 1, 1, tzinfo=MSK), 'одежда', 1000),
+    (1, datetime(2023, 11, 5, tzinfo=timezone.utc), None, 70),
+    (1, datetime(2023, 11, 6, tzinfo=timezone.utc), 'уборка', 40),
+    (2, datetime(2023, 11, 6, tzinfo=timezone.utc), 'уборка', 500),
+]
+
+
+def test_month_of_uses_utc():
+    assert month_of(datetime(2023, 11, 1, 1, tzinfo=MSK)) == date(2023, 10, 1)
+    assert month_of(datetime(2023, 11, 30, 23)) == date(2023, 11, 1)
+
+
+def test_aggregate_spendings():
+    spendings = {
+        (item.account_id, item.month, item.category): (item.total, item.count)
+        for item in aggregate_spendings(ROWS)
+    }
+    assert spendings == {
+        (1, date(2023, 10, 1), 'напитки'): (350, 2),
+        (1, date(2023, 10, 1), 'одежда'): (1000, 1),
+        (1, date(2023, 11, 1), 'уборка'): (40, 1),
+        (2, date(2023, 11, 1), 'уборка'): (500, 1),
+    }
+
+
+def test_spendings_match_transactions(get_cashbacker):
+    rows = [row for row in ROWS if row[0] == 1]
+    transactions = pd.DataFrame(
+        [(time, 'клиент', category, value) for _, time, category, value in rows],
+        columns=['date', 'client', 'topic', 'price']
+    )
+    spendings = [
+        models.AccountMonthSpending(**item.dict())
+        for item in aggregate_spendings(rows)
+    ]
+    assert np.allclose(
+        get_cashbacker.get_matrix(transactions),
+        get_cashbacker.get_matrix(spendings_dataframe(spendings))
+    )
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# бюджет на импорт приложения (без прогрева моделей), секунды
+STARTUP_BUDGET = float(os.getenv('STARTUP_BUDGET_SECONDS', '5'))
+
+
+def run_python(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_import_time_within_budget():
+    elapsed = float(run_python(
+        'import time\n'
+        'start = time.perf_counter()\n'
+        'import main\n'
+        'print(time.perf_counter() - start)'
+    ))
+    assert elapsed < STARTUP_BUDGET, f'startup took {elapsed:.2f}s'
+
+
+def test_import_does_not_load_models():
+    output = run_python(
+        'import sys\n'
+        'import main\n'
+        'from core.registry import model_registry\n'
+        'heavy = {"tensorflow", "keras", "spacy", "langchain"} & set(sys.modules)\n'
+        'print(any(model_registry.status().values()) or bool(heavy))'
+    )
+    assert output == 'False'
@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from core.deadline import Deadline
+from exceptions.api import UpstreamTimeoutException
+from schemas import base as schemas
+from services import terminal
+
+
+def make_account(bank, number, card_number):
+    return schemas.RawAccount(
+        bank=bank, number=number, cards=[{'card_number': card_number}]
+    )
+
+
+USER = schemas.User(
+    first_name='Иван', surname='Иванов', gosuslugi_id='1', ebs=True
+)
+
+
+def patch_upstreams(monkeypatch, accounts, delays, identify_delay=0.0,
+                    snapshot=None):
+    refreshed = []
+
+    async def get_by_gosuslugi_id(db, gosuslugi_id):
+        return snapshot
+
+    async def get_user_by_photo(photo, photo_name):
+        await asyncio.sleep(identify_delay)
+        return USER
+
+    async def get_accounts(gosuslugi_id):
+        return accounts
+
+    async def get_account_cashbacks(account_number, month):
+        await asyncio.sleep(delays[account_number])
+        return schemas.RawAccountCashbacks(
+            month=month,
+            cashbacks=[schemas.RawCashback(product_type='одежда', value=5)]
+        )
+
+    monkeypatch.setattr(terminal, 'get_user_by_photo', get_user_by_photo)
+    monkeypatch.setattr(terminal, 'get_accounts', get_accounts)
+    monkeypatch.setattr(terminal, 'get_account_cashbacks', get_account_cashbacks)
+    monkeypatch.setattr(
+        terminal.terminal_snapshot_crud, 'get_by_gosuslugi_id', get_by_gosuslugi_id
+    )
+    monkeypatch.setattr(terminal.snapshot_refresher, 'schedule', refreshed.append)
+    return refreshed
+
+
+def test_deadline_stages():
+    now = [0.0]
+    deadline = Deadline(1.0, timer=lambda: now[0])
+    assert deadline.stage(0.4) == 0.4
+    now[0] = 0.9
+    assert deadline.stage(0.4) == pytest.approx(0.1)
+    now[0] = 2
+    assert deadline.remaining() == 0
+
+
+def test_terminal_cashbacks_concurrent_with_deadline(monkeypatch):
+    accounts = [
+        make_account('Альфа', '1', '0000111122223333'),
+        make_account('Бета', '2', '0000111122224444'),
+        make_account('Гамма', '3', '0000111122225555')
+    ]
+    refreshed = patch_upstreams(monkeypatch, accounts, {'1': 0.2, '2': 0.2, '3': 5})
+
+    response = asyncio.run(
+        terminal.terminal_response(None, b'photo', 'photo.jpg', Deadline(0.5))
+    )
+
+    cashbacks = {card.last_four_digits: card.cashbacks for card in response.cards}
+    # два счёта по 0.2 с уложились в 0.5 с только параллельно
+    assert cashbacks['3333'][0].value == 5
+    assert cashbacks['4444'][0].value == 5
+    assert cashbacks['5555'] is None
+    # снимка не было - собирается в фоне
+    assert refreshed == [USER]
+
+
+def test_terminal_identify_timeout(monkeypatch):
+    patch_upstreams(monkeypatch, [], {}, identify_delay=1)
+    with pytest.raises(UpstreamTimeoutException):
+        asyncio.run(
+            terminal.terminal_response(None, b'photo', 'photo.jpg', Deadline(0.2))
+        )
+
+
+def test_terminal_snapshot(monkeypatch):
+    cards = [{
+        'bank': 'Альфа', 'last_four_digits': '3333',
+        'cashbacks': [{'product_type': 'одежда', 'value': 5}]
+    }]
+    snapshot = SimpleNamespace(
+        month=terminal.current_month(), cards=cards,
+        updated_at=datetime.now(timezone.utc)
+    )
+    # НСПК и банки не опрашиваются
+    refreshed = patch_upstreams(monkeypatch, None, {}, snapshot=snapshot)
+    response = asyncio.run(terminal.terminal_response(None, b'photo', 'photo.jpg'))
+    assert response.cards[0].cashbacks[0].value == 5
+    assert refreshed == []
+
+    snapshot.updated_at -= timedelta(days=1)
+    response = asyncio.run(terminal.terminal_response(None, b'photo', 'photo.jpg'))
+    assert response.cards[0].last_four_digits == '3333'
+    assert refreshed == [USER]
+
+
+def test_terminal_demo_bank_same_on_both_paths(monkeypatch):
+    accounts = [make_account(terminal.DEMO_BANK, '1', '0000111122223333')]
+    patch_upstreams(monkeypatch, accounts, {})
+    live = asyncio.run(terminal.terminal_response(None, b'photo', 'photo.jpg'))
+
+    snapshot = SimpleNamespace(
+        month=terminal.current_month(),
+        cards=[{
+            'bank': terminal.DEMO_BANK, 'last_four_digits': '3333',
+            'cashbacks': [{'product_type': 'одежда', 'value': 1}]
+        }],
+        updated_at=datetime.now(timezone.utc)
+    )
+    patch_upstreams(monkeypatch, None, {}, snapshot=snapshot)
+    cached = asyncio.run(terminal.terminal_response(None, b'photo', 'photo.jpg'))
+
+    assert live.cards[0].cashbacks == cached.cards[0].cashbacks == terminal.DEMO_CASHBACKS
+
+
+def test_snapshot_build_cards():
+    from services.db import terminal_snapshot_crud
+
+    accounts = [
+        SimpleNamespace(id=2, bank='Бета', cards=[
+            SimpleNamespace(id=3, card_number='0000111122224444')
+        ]),
+        SimpleNamespace(id=1, bank='Альфа', cards=[
+            SimpleNamespace(id=2, card_number='0000111122223333'),
+            SimpleNamespace(id=1, card_number='0000111122225555')
+        ])
+    ]
+    user_cashbacks = [
+        SimpleNamespace(
+            account_id=1, value=5,
+            cashback=SimpleNamespace(product_type='одежда')
+        )
+    ]
+    cards = terminal_snapshot_crud.build_cards(accounts, user_cashbacks)
+    assert [card.last_four_digits for card in cards] == ['5555', '3333', '4444']
+    assert cards[0].cashbacks[0].product_type == 'одежда'
+    assert cards[2].cashbacks is None
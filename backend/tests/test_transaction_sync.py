@@ -0,0 +1,152 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.external_integrations import is_stale
+from services.transaction_sync import TransactionSyncScheduler
+
+
+def test_is_stale():
+    now = datetime(2023, 10, 1, 12, tzinfo=timezone.utc)
+    freshness = timedelta(minutes=30)
+
+    assert is_stale(None, now, freshness)
+    assert is_stale(now - timedelta(hours=1), now, freshness)
+    assert not is_stale(now - timedelta(minutes=5), now, freshness)
+
+
+def test_run_once_limits_concurrency(monkeypatch):
+    scheduler = TransactionSyncScheduler(concurrency=2, jitter=0)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def stale_accounts():
+        return list(range(6))
+
+    async def sync_account(account_id):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if account_id == 3:
+            raise RuntimeError('bank is down')
+        return account_id != 5
+
+    monkeypatch.setattr(scheduler, 'stale_accounts', stale_accounts)
+    monkeypatch.setattr(scheduler, 'sync_account', sync_account)
+
+    synced = asyncio.run(scheduler.run_once())
+
+    assert max_in_flight == 2
+    assert synced == 4
+    assert scheduler.stats() == {'synced': 4, 'failed': 1}
+
+
+def test_failed_sync_is_postponed(monkeypatch):
+    from types import SimpleNamespace
+
+    from services import transaction_sync
+
+    scheduler = TransactionSyncScheduler(retry_base=60, retry_max=600)
+    account = SimpleNamespace(transations_update_time=None, sync_failures=2)
+    failures = []
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def get(self, model, account_id):
+            return account
+
+        async def rollback(self):
+            pass
+
+    async def update_account_transactions(db, account, freshness):
+        raise RuntimeError('bank is down')
+
+    async def record_sync_failure(db, account_id, failures_count, retry_at):
+        failures.append((account_id, failures_count, retry_at))
+
+    monkeypatch.setattr(transaction_sync, 'async_session', Session)
+    monkeypatch.setattr(
+        transaction_sync, 'update_account_transactions', update_account_transactions
+    )
+    monkeypatch.setattr(
+        transaction_sync.account_crud, 'record_sync_failure', record_sync_failure
+    )
+
+    before = datetime.now(timezone.utc)
+    with pytest.raises(RuntimeError):
+        asyncio.run(scheduler.sync_account(7))
+    [(account_id, count, retry_at)] = failures
+    # третья неудача подряд: пауза 60 * 2 ** 2 с джиттером 0.5-1
+    assert account_id == 7 and count == 3
+    assert timedelta(seconds=120) <= retry_at - before <= timedelta(seconds=241)
+    assert scheduler.retry_delay(10) <= timedelta(seconds=600)
+
+
+def test_notify_during_run_is_not_lost(monkeypatch):
+    scheduler = TransactionSyncScheduler(interval=60, jitter=0)
+    runs = []
+
+    async def run_locked():
+        runs.append(len(runs))
+        if len(runs) == 1:
+            # вход пользователя во время синхронизации
+            scheduler.notify()
+        return 0
+
+    monkeypatch.setattr(scheduler, 'run_locked', run_locked)
+
+    async def check():
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+
+    asyncio.run(check())
+    assert len(runs) == 2
+
+
+def test_choose_cashback_syncs_never_synced_account(monkeypatch):
+    from types import SimpleNamespace
+
+    from exceptions.api import TransactionsNotSyncedException
+    from services import cashback, db, external_integrations
+
+    month = datetime(2023, 10, 1).date()
+    synced_accounts = []
+    bank_answers = [False, True]
+
+    async def update_account_transactions(db, account):
+        synced_accounts.append(account.id)
+        return bank_answers.pop(0)
+
+    async def get_accounts_spendings(db, account_ids, start_month):
+        return []
+
+    async def get_cashbacks(month, spendings):
+        return {account_id: ['forecast'] for account_id in spendings}
+
+    monkeypatch.setattr(
+        external_integrations, 'update_account_transactions', update_account_transactions
+    )
+    monkeypatch.setattr(db.spending_crud, 'get_accounts_spendings', get_accounts_spendings)
+    monkeypatch.setattr(cashback.forecast_cache, 'get_cashbacks', get_cashbacks)
+
+    account = SimpleNamespace(id=1, transations_update_time=None)
+    # банк не отдал транзакции - прогноз по пустым тратам не строим
+    with pytest.raises(TransactionsNotSyncedException):
+        asyncio.run(cashback.get_card_choose_cashback(None, account, month))
+    assert asyncio.run(
+        cashback.get_card_choose_cashback(None, account, month)
+    ) == ['forecast']
+
+    # уже синхронизированный счёт к банку не ходит
+    account.transations_update_time = datetime.now(timezone.utc)
+    asyncio.run(cashback.get_card_choose_cashback(None, account, month))
+    assert synced_accounts == [1, 1]
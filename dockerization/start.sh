@@ -1,4 +1,8 @@
 #!/bin/bash
 
 alembic upgrade head
-gunicorn main:app --keep-alive 30 --timeout 60 --workers 3 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
\ No newline at end of file
+# общий сервер моделей для всех воркеров (см. services/model_server.py)
+if [ -n "$MODEL_SERVER_SOCKET" ]; then
+    python -m services.model_server --socket "$MODEL_SERVER_SOCKET" &
+fi
+gunicorn main:app --keep-alive 30 --timeout 60 --workers 3 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
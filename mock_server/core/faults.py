@@ -0,0 +1,93 @@
+"""
+    Внедрение сбоев для проверки устойчивости бэкенда к медленным и
+    недоступным внешним сервисам.
+
+    Правила задаются переменной окружения FAULTS (JSON-список) или на
+    лету запросом PUT /_faults (тот же JSON, пустой список - отключить),
+    текущие правила - GET /_faults. Правило:
+        {
+            "path": "/api/v1/get_user_accounts/",  # префикс пути
+            "delay_ms": 500,  # задержка перед ответом
+            "status": 503,    # вместо ответа вернуть этот код
+            "rate": 0.3,      # вероятность применить правило (по умолчанию 1)
+            "count": 2        # применить только к N ближайшим запросам
+        }
+    Для одного запроса то же можно задать заголовками X-Fault-Delay-Ms
+    и X-Fault-Status.
+"""
+import asyncio
+import json
+import os
+import random
+from typing import List
+
+CONTROL_PATH = '/_faults'
+
+
+class FaultInjectionMiddleware:
+
+    def __init__(self, app, rules: List[dict] | None = None):
+        self.app = app
+        if rules is None:
+            rules = json.loads(os.getenv('FAULTS', '[]'))
+        self.rules = rules
+
+    def match(self, path: str) -> dict | None:
+        for rule in self.rules:
+            if not path.startswith(rule.get('path', '/')):
+                continue
+            if rule.get('count') == 0:
+                continue
+            if random.random() >= rule.get('rate', 1):
+                continue
+            if 'count' in rule:
+                rule['count'] -= 1
+            return rule
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        if scope['path'] == CONTROL_PATH:
+            return await self.control(scope, receive, send)
+
+        headers = {
+            key.decode().lower(): value.decode()
+            for key, value in scope['headers']
+        }
+        rule = dict(self.match(scope['path']) or {})
+        if 'x-fault-delay-ms' in headers:
+            rule['delay_ms'] = int(headers['x-fault-delay-ms'])
+        if 'x-fault-status' in headers:
+            rule['status'] = int(headers['x-fault-status'])
+
+        if rule.get('delay_ms'):
+            await asyncio.sleep(rule['delay_ms'] / 1000)
+        if rule.get('status'):
+            return await self.respond(send, rule['status'], {'detail': 'Injected fault'})
+        return await self.app(scope, receive, send)
+
+    async def control(self, scope, receive, send):
+        if scope['method'] == 'PUT':
+            body = b''
+            while True:
+                message = await receive()
+                body += message.get('body', b'')
+                if not message.get('more_body'):
+                    break
+            self.rules = json.loads(body or b'[]')
+        return await self.respond(send, 200, self.rules)
+
+    @staticmethod
+    async def respond(send, status: int, content) -> None:
+        body = json.dumps(content).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode())
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': body})
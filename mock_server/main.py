@@ -4,6 +4,7 @@ from fastapi.responses import ORJSONResponse
 
 from api.v1 import base as api
 from core.config import settings
+from core.faults import FaultInjectionMiddleware
 
 app = FastAPI(
     title=settings.app_title,
@@ -12,6 +13,9 @@ app = FastAPI(
 
 app.include_router(api.router, prefix=settings.api_v1_prefix)
 
+# сбои для проверки устойчивости бэкенда (см. core.faults)
+app.add_middleware(FaultInjectionMiddleware)
+
 if __name__ == "__main__":
     uvicorn.run(
         'main:app',